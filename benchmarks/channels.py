@@ -0,0 +1,131 @@
+import json
+import random
+
+
+###----------------------------------------------------------------------------
+
+
+# The words that titles, descriptions and tags are made of.
+_WORDS = ("sublime text plugin package python api build syntax snippet macro "
+          "command palette key binding settings theme color scheme project "
+          "window view selection region completion hover tooltip panel "
+          "phantom annotation minihtml json yaml regex lsp git diff debug "
+          "tutorial tips tricks quick basics advanced series episode live "
+          "stream question answer review walkthrough setup install").split()
+
+# The number of distinct tags used across a channel.
+_TAG_COUNT = 250
+
+
+###----------------------------------------------------------------------------
+
+
+def _sentence(rng, count):
+    return " ".join(rng.choice(_WORDS) for _ in range(count))
+
+
+def make_tags(rng, count=_TAG_COUNT):
+    """
+    Make the given number of tags for videos to pick from, in the same form as
+    the tags used in the channels made by make_channel().
+    """
+    return ["{0} {1}".format(rng.choice(_WORDS), rng.choice(_WORDS))
+            for _ in range(count)]
+
+
+def _table_of_contents(rng):
+    """
+    Make the text of a table of contents in the form that YouTube recognizes,
+    starting at 0:00 and with chapters in ascending order.
+    """
+    lines = []
+    seconds = 0
+    for _ in range(rng.randint(3, 12)):
+        lines.append("{0}:{1:02d} {2}".format(seconds // 60, seconds % 60,
+                                               _sentence(rng, 3).title()))
+        seconds += rng.randint(15, 300)
+
+    return "\n".join(lines)
+
+
+def make_video(index, rng, tags):
+    """
+    Make the details of a single synthetic video, with all of the parts that
+    the package fetches; about two thirds of the videos have a table of
+    contents in their description.
+    """
+    description = [_sentence(rng, rng.randint(20, 60)), ""]
+    if rng.random() < 0.66:
+        description.extend([_table_of_contents(rng), ""])
+    description.append(_sentence(rng, rng.randint(10, 30)))
+
+    return {
+        "kind": "youtube#video",
+        "etag": "etag-{0}".format(index),
+        "id": "video{0:07d}".format(index),
+        "snippet": {
+            "publishedAt": "20{0:02d}-{1:02d}-{2:02d}T{3:02d}:00:00Z".format(
+                rng.randint(10, 24), rng.randint(1, 12), rng.randint(1, 28),
+                rng.randint(0, 23)),
+            "title": "{0} #{1}".format(_sentence(rng, rng.randint(3, 8)).title(), index),
+            "description": "\n".join(description),
+            "tags": rng.sample(tags, rng.randint(3, 15)),
+            "categoryId": "28",
+            "defaultLanguage": "en"
+        },
+        "status": {
+            "privacyStatus": rng.choice(["public", "public", "public", "unlisted", "private"]),
+            "embeddable": True,
+            "publicStatsViewable": True,
+            "selfDeclaredMadeForKids": False
+        },
+        "statistics": {
+            "viewCount": str(rng.randint(0, 500000)),
+            "likeCount": str(rng.randint(0, 20000)),
+            "dislikeCount": "0",
+            "favoriteCount": "0",
+            "commentCount": str(rng.randint(0, 1000))
+        },
+        "contentDetails": {
+            "duration": "PT{0}M{1}S".format(rng.randint(1, 59), rng.randint(0, 59))
+        }
+    }
+
+
+def make_channel(count, seed=0):
+    """
+    Make a synthetic channel with the given number of videos, returning back
+    the data cache as the network thread would hold it after the contents of
+    the uploads playlist have been fetched; all of the dictionaries in it are
+    dotty dictionaries, as they are when the cache is loaded from disk.
+
+    The same count and seed always make the same channel.
+    """
+    from YouTubeEditor.lib import dotty
+    from YouTubeEditor.lib.networking import _CACHE_VERSION
+
+    rng = random.Random(seed)
+    tags = make_tags(rng)
+
+    videos = [make_video(index, rng, tags) for index in range(count)]
+    video_ids = [video["id"] for video in videos]
+
+    playlist_id = "UUsynthetic"
+    cache = {
+        "version": _CACHE_VERSION,
+        "channel_list": [],
+        "channel_details": {},
+        "playlist_list": {},
+        "playlist_contents": {playlist_id: video_ids},
+        "video_playlists": {vid: [playlist_id] for vid in video_ids},
+        "videos": {video["id"]: video for video in videos},
+        "video_parts": {vid: {part: 0 for part in ("snippet", "status",
+                                                   "statistics", "contentDetails")}
+                        for vid in video_ids},
+        "video_toc": {}
+    }
+
+    return json.loads(json.dumps(cache), object_hook=dotty.dotty)
+
+
+###----------------------------------------------------------------------------
@@ -0,0 +1,372 @@
+"""
+A local stand in for the parts of the YouTube Data API that the package uses,
+for running the network thread against a large channel offline; point the
+api_endpoint setting of the package at it.
+
+    python benchmarks/fake_api.py --videos 10000 --latency 50 --error-rate 0.01
+
+The account can own several channels (as with brand accounts), and the
+videos and playlists are split between them. The list endpoints for channels,
+playlists, playlistItems and videos and the
+videos update endpoint are emulated, with paging, etags (including 304
+responses for a matching If-None-Match), quota costs and the error responses
+that the real API gives when the quota runs out or a backend fails. Latency
+and errors are injected from a seeded random number generator, so a run with
+the same options and the same requests behaves the same way.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlsplit, parse_qs
+
+from channels import make_video, make_tags
+
+
+###----------------------------------------------------------------------------
+
+
+# The quota cost of each kind of request, as the real API charges them.
+_LIST_COST = 1
+_UPDATE_COST = 50
+
+# The largest page that a list request can ask for, and the page size when
+# none is given.
+_MAX_RESULTS = 50
+_DEFAULT_RESULTS = 5
+
+# The parts of a video that can be updated.
+_UPDATABLE_PARTS = {"snippet", "status", "localizations", "recordingDetails"}
+
+
+###----------------------------------------------------------------------------
+
+
+class ApiError(Exception):
+    """
+    An error response from the API, with the status code, reason and message
+    that the real API uses for it.
+    """
+    def __init__(self, code, reason, message, domain="youtube"):
+        super().__init__(message)
+        self.code = code
+        self.reason = reason
+        self.domain = domain
+
+    def payload(self):
+        return {"error": {
+            "code": self.code,
+            "message": str(self),
+            "errors": [{"message": str(self), "domain": self.domain,
+                        "reason": self.reason}]
+        }}
+
+
+def _etag(data):
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class FakeYouTube():
+    """
+    The state of the stand in API; one or more channels, each with an uploads
+    playlist that holds its share of the videos and some other playlists that
+    each hold some of them.
+    """
+    def __init__(self, videos=1000, playlists=10, seed=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, quota=None, channels=1):
+        rng = random.Random(seed)
+        tags = make_tags(rng)
+
+        self.videos = {}
+        for index in range(videos):
+            video = make_video(index, rng, tags)
+            self.videos[video["id"]] = video
+        all_ids = list(self.videos)
+
+        self.channels = []
+        self.playlist_items = {}
+        self.playlists = []
+        for number in range(channels):
+            # The first channel keeps the plain names, so that a single
+            # channel looks the same as it always has.
+            suffix = str(number) if number else ""
+            video_ids = all_ids[number::channels]
+
+            channel = {
+                "kind": "youtube#channel",
+                "id": "UCfakechannel" + suffix,
+                "snippet": {"title": "Fake Channel " + suffix,
+                            "description": "A stand in channel"},
+                "brandingSettings": {"channel": {"title": "Fake Channel " + suffix}},
+                "contentDetails": {"relatedPlaylists": {"uploads": "UUfakechannel" + suffix,
+                                                        "likes": ""}},
+                "statistics": {"videoCount": str(len(video_ids))},
+                "status": {"privacyStatus": "public"}
+            }
+            self.channels.append(channel)
+            self.playlist_items["UUfakechannel" + suffix] = video_ids
+
+            for index in range(playlists):
+                playlist_id = "PLfake{0}{1:04d}".format(suffix, index)
+                self.playlist_items[playlist_id] = sorted(
+                    rng.sample(video_ids, min(len(video_ids), rng.randint(5, 200))))
+                self.playlists.append({
+                    "kind": "youtube#playlist",
+                    "id": playlist_id,
+                    "snippet": {"title": "Playlist {0}".format(index),
+                                "channelId": channel["id"]},
+                    "status": {"privacyStatus": "public"},
+                    "contentDetails": {"itemCount": len(self.playlist_items[playlist_id])}
+                })
+
+        for resource in self.channels + self.playlists + list(self.videos.values()):
+            resource["etag"] = _etag(resource)
+
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.quota = quota
+        self.quota_used = 0
+        self.requests = 0
+
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def _charge(self, cost):
+        """
+        Inject latency and errors as configured, and charge the quota for a
+        request, raising ApiError if the request fails.
+        """
+        with self.lock:
+            self.requests += 1
+            delay = self.latency + self.rng.random() * self.jitter
+            failed = self.rng.random() < self.error_rate
+
+            if not failed:
+                if self.quota is not None and self.quota_used + cost > self.quota:
+                    raise ApiError(403, "quotaExceeded",
+                                   "The request cannot be completed because you have exceeded your quota.")
+                self.quota_used += cost
+
+        if delay:
+            time.sleep(delay)
+
+        if failed:
+            raise ApiError(503, "backendError", "Backend Error", domain="global")
+
+    def _page(self, kind, items, query):
+        """
+        Return back the page of the given list of items that the query asks
+        for, as a list response of the given kind.
+        """
+        count = min(int(query.get("maxResults", _DEFAULT_RESULTS)), _MAX_RESULTS)
+        start = int(query.get("pageToken") or 0)
+
+        response = {
+            "kind": kind,
+            "pageInfo": {"totalResults": len(items), "resultsPerPage": count},
+            "items": items[start:start + count]
+        }
+        if start + count < len(items):
+            response["nextPageToken"] = str(start + count)
+
+        response["etag"] = _etag([i.get("etag") for i in response["items"]] + [start])
+        return response
+
+    def _parts(self, resource, query):
+        """
+        Return back the given resource with only the parts that the query asks
+        for.
+        """
+        parts = {p.strip() for p in query.get("part", "").split(",") if p.strip()}
+        if not parts:
+            raise ApiError(400, "required", "Required parameter: part", domain="global")
+
+        return {k: v for k, v in resource.items()
+                if k in parts or k in ("kind", "etag", "id")}
+
+    def list(self, resource, query):
+        """
+        Handle a list request for the given kind of resource.
+        """
+        self._charge(_LIST_COST)
+
+        if resource == "channels":
+            items = [self._parts(c, query) for c in self.channels]
+            return self._page("youtube#channelListResponse", items, query)
+
+        if resource == "playlists":
+            items = [self._parts(p, query) for p in self.playlists
+                     if query.get("channelId") in (None, p["snippet"]["channelId"])]
+            return self._page("youtube#playlistListResponse", items, query)
+
+        if resource == "playlistItems":
+            video_ids = self.playlist_items.get(query.get("playlistId"))
+            if video_ids is None:
+                raise ApiError(404, "playlistNotFound", "The playlist cannot be found.")
+
+            items = [{"kind": "youtube#playlistItem", "etag": vid,
+                      "id": "{0}.{1}".format(query["playlistId"], vid),
+                      "contentDetails": {"videoId": vid}} for vid in video_ids]
+            return self._page("youtube#playlistItemListResponse", items, query)
+
+        if resource == "videos":
+            ids = [vid for vid in query.get("id", "").split(",") if vid]
+            if len(ids) > _MAX_RESULTS:
+                raise ApiError(400, "invalidParameter", "Too many video ids", domain="global")
+
+            with self.lock:
+                items = [self._parts(self.videos[vid], query)
+                         for vid in ids if vid in self.videos]
+            return self._page("youtube#videoListResponse", items, {"maxResults": _MAX_RESULTS})
+
+        raise ApiError(404, "notFound", "Unknown resource " + resource, domain="global")
+
+    def update_video(self, query, body):
+        """
+        Handle an update of a video, returning back the updated video with the
+        parts that were updated.
+        """
+        self._charge(_UPDATE_COST)
+
+        parts = {p.strip() for p in query.get("part", "").split(",") if p.strip()}
+        if not parts or not parts <= _UPDATABLE_PARTS:
+            raise ApiError(400, "invalidPart", "Invalid part", domain="global")
+
+        if "snippet" in parts:
+            snippet = body.get("snippet", {})
+            if not snippet.get("title") or not snippet.get("categoryId"):
+                raise ApiError(400, "invalidTitle", "The request must include a title and category")
+
+        with self.lock:
+            video = self.videos.get(body.get("id"))
+            if video is None:
+                raise ApiError(404, "videoNotFound", "The video cannot be found.")
+
+            # Parts that are sent replace the stored part entirely, except for
+            # the read only fields in them.
+            for part in parts:
+                updated = dict(body.get(part, {}))
+                if part == "snippet":
+                    updated["publishedAt"] = video["snippet"]["publishedAt"]
+                video[part] = updated
+
+            video["etag"] = None
+            video["etag"] = _etag(video)
+
+            return self._parts(video, {"part": ",".join(parts)})
+
+
+###----------------------------------------------------------------------------
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _respond(self, status, payload=None, etag=None):
+        data = b"" if payload is None else json.dumps(payload).encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self, handler):
+        url = urlsplit(self.path)
+        # Parameters that take a list (such as the video ID's) can be given
+        # either as a comma separated list or by repeating the parameter.
+        query = {k: ",".join(v) for k, v in parse_qs(url.query).items()}
+        resource = url.path.rstrip("/").split("/")[-1]
+
+        try:
+            response = handler(resource, query)
+        except ApiError as err:
+            return self._respond(err.code, err.payload())
+
+        if response.get("etag") and self.headers.get("If-None-Match") == response["etag"]:
+            return self._respond(304, etag=response["etag"])
+
+        self._respond(200, response, response.get("etag"))
+
+    def do_GET(self):
+        self._handle(self.server.api.list)
+
+    def do_PUT(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+
+        def update(resource, query):
+            if resource != "videos":
+                raise ApiError(404, "notFound", "Unknown resource " + resource, domain="global")
+            return self.server.api.update_video(query, body)
+
+        self._handle(update)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def serve(api, host="127.0.0.1", port=0, verbose=False):
+    """
+    Start serving the given FakeYouTube on the given host and port (0 picks a
+    free port) in a background thread, returning back the server; its
+    endpoint attribute is the value to use for the api_endpoint setting, and
+    shutdown() stops it.
+    """
+    server = _Server((host, port), _Handler)
+    server.api = api
+    server.verbose = verbose
+    server.endpoint = "http://{0}:{1}/".format(*server.server_address)
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    return server
+
+
+###----------------------------------------------------------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a stand in YouTube Data API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8123)
+    parser.add_argument("--videos", type=int, default=1000, help="videos across all channels")
+    parser.add_argument("--playlists", type=int, default=10, help="playlists on each channel")
+    parser.add_argument("--channels", type=int, default=1, help="channels on the account")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the channel and injected faults")
+    parser.add_argument("--latency", type=float, default=0, help="latency of each request in ms")
+    parser.add_argument("--jitter", type=float, default=0, help="extra random latency in ms")
+    parser.add_argument("--error-rate", type=float, default=0,
+                        help="fraction of requests that fail with a 503")
+    parser.add_argument("--quota", type=int, help="quota units before requests fail with quotaExceeded")
+    parser.add_argument("--verbose", action="store_true", help="log each request")
+    args = parser.parse_args()
+
+    api = FakeYouTube(args.videos, args.playlists, args.seed, args.latency / 1000,
+                      args.jitter / 1000, args.error_rate, args.quota, args.channels)
+    server = serve(api, args.host, args.port, args.verbose)
+
+    print("Serving {0} channel(s) of {1} videos at {2}".format(args.channels, args.videos,
+                                                              server.endpoint))
+    print("Set the api_endpoint setting of the package to this to use it")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+An end to end load test of the network thread against the stand in YouTube
+Data API in fake_api.py; the package is pointed at the stand in with the
+api_endpoint setting and driven through the NetworkManager as the commands
+would drive it, so that paging, caching, concurrent updates and the retrying
+of failed updates can be exercised against a large channel offline.
+
+    python benchmarks/load_test.py --videos 10000 --latency 20 --updates 200
+    python benchmarks/load_test.py --error-rate 0.05 --quota 500
+    python benchmarks/load_test.py --channels 4 --videos 20000
+
+At the end, the latency report of the requests that were made and the
+number of API requests and quota units that were used are displayed.
+"""
+import argparse
+import sys
+import time
+
+from stubs import install, run_main_thread
+from fake_api import FakeYouTube, serve
+
+
+###----------------------------------------------------------------------------
+
+
+def request(manager, name, timeout, **kwargs):
+    """
+    Make a request of the network thread and wait for the result, running the
+    main thread callbacks while waiting; the return value is the success of
+    the request and its result.
+    """
+    from YouTubeEditor.lib import Request
+
+    outcome = []
+    manager.request(Request(name, **kwargs),
+                    lambda request, success, result: outcome.append((success, result)))
+
+    deadline = time.time() + timeout
+    while not outcome:
+        if time.time() > deadline:
+            raise RuntimeError("request {0} took longer than {1}s".format(name, timeout))
+        run_main_thread(0.1)
+
+    return outcome[0]
+
+
+def step(title, manager, name, timeout, **kwargs):
+    start = time.time()
+    success, result = request(manager, name, timeout, **kwargs)
+
+    if not success:
+        summary = "FAILED: {0}".format(result.get("error.message"))
+    elif isinstance(result, list):
+        summary = "{0} results".format(len(result))
+    elif name == "channel_contents":
+        summary = "{0} channels, {1} videos".format(
+            len(result), sum(len(c["videos"]) for c in result.values()))
+    else:
+        summary = result
+
+    print("{0:<34} {1:>8.2f}s  {2}".format(title, time.time() - start, summary))
+    return result
+
+
+###----------------------------------------------------------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the network thread offline")
+    parser.add_argument("--videos", type=int, default=5000, help="videos across all channels")
+    parser.add_argument("--channels", type=int, default=1, help="channels on the account")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the channel and injected faults")
+    parser.add_argument("--latency", type=float, default=10, help="latency of each request in ms")
+    parser.add_argument("--jitter", type=float, default=10, help="extra random latency in ms")
+    parser.add_argument("--error-rate", type=float, default=0,
+                        help="fraction of requests that fail with a 503")
+    parser.add_argument("--quota", type=int, help="quota units before requests fail with quotaExceeded")
+    parser.add_argument("--updates", type=int, default=100, help="videos to update in a bulk update")
+    parser.add_argument("--workers", type=int, default=4, help="threads sending updates")
+    parser.add_argument("--channel-workers", type=int, default=4,
+                        help="threads fetching channels at the same time")
+    parser.add_argument("--rate", type=float, default=50, help="updates per second")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds to wait for each request")
+    args = parser.parse_args()
+
+    api = FakeYouTube(args.videos, seed=args.seed, latency=args.latency / 1000,
+                      jitter=args.jitter / 1000, error_rate=args.error_rate, quota=args.quota,
+                      channels=args.channels)
+    server = serve(api)
+
+    with install({
+        "api_endpoint": server.endpoint,
+        "cache_downloaded_data": False,
+        "bulk_update_workers": args.workers,
+        "channel_fetch_workers": args.channel_workers,
+        "bulk_update_rate": args.rate,
+        "update_retry_interval": 60
+    }):
+        from YouTubeEditor.lib import NetworkManager, make_bulk_details
+
+        manager = NetworkManager()
+        try:
+            step("authorize", manager, "authorize", args.timeout)
+            channel = step("channel_list", manager, "channel_list", args.timeout)[0]
+            uploads = channel["contentDetails.relatedPlaylists.uploads"]
+
+            step("playlist_list", manager, "playlist_list", args.timeout,
+                 channel_id=channel["id"])
+            contents = [
+                step("playlist_contents (cold)", manager, "playlist_contents",
+                     args.timeout, playlist_id=uploads),
+                step("playlist_contents (cached)", manager, "playlist_contents",
+                     args.timeout, playlist_id=uploads),
+                step("playlist_contents (query)", manager, "playlist_contents", args.timeout,
+                     playlist_id=uploads, query="privacy:unlisted views<100000", order=["-views"]),
+                step("playlist_contents (refresh)", manager, "playlist_contents",
+                     args.timeout, playlist_id=uploads, refresh=True)
+            ]
+
+            # With injected errors, some of the requests for the contents can fail;
+            # the updates are made to the videos from any one that worked.
+            if args.channels > 1:
+                step("channel_contents (cold)", manager, "channel_contents", args.timeout)
+                step("channel_contents (cached)", manager, "channel_contents", args.timeout)
+                step("channel_contents (refresh)", manager, "channel_contents",
+                     args.timeout, refresh=True)
+
+            videos = next((c for c in contents if isinstance(c, list) and c), None)
+            if videos and args.updates:
+                updates = [(video["id"], make_bulk_details(video, "title",
+                                                           video["snippet.title"] + " (edited)"))
+                           for video in videos[:args.updates]]
+                step("bulk_update", manager, "bulk_update", args.timeout, updates=updates)
+
+            print("\n" + "\n".join(manager.latency_report()))
+            print("API requests: {0}, quota used: {1}".format(api.requests, api.quota_used))
+        finally:
+            manager.shutdown()
+            server.shutdown()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
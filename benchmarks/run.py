@@ -0,0 +1,256 @@
+"""
+Offline benchmarks for the YouTubeEditor package.
+
+These run outside of Sublime Text, using stand ins for the sublime and
+sublime_plugin modules (see stubs.py) and synthetic channels of videos (see
+channels.py), so no YouTube account or network access is needed. The Python
+dependencies of the package (those in dependencies.json) have to be
+importable.
+
+    python benchmarks/run.py                         run at 100, 10k and 100k videos
+    python benchmarks/run.py --sizes 100,10000       run at the given sizes
+    python benchmarks/run.py --only sort,tags        run only matching benchmarks
+    python benchmarks/run.py --save base.json        record the results
+    python benchmarks/run.py --compare base.json     compare with recorded results
+
+When comparing, any benchmark that is slower than the recorded result by more
+than the threshold is reported as a regression, and the exit status is 1.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from stubs import install
+
+# The stubs have to be in place before anything from the package is imported.
+_cache_dir = install({"cache_downloaded_data": True, "encrypt_cache": False})
+
+from channels import make_channel
+
+from YouTubeEditor.lib import yte_setting, video_sort, select_tag
+from YouTubeEditor.lib import get_table_of_contents
+from YouTubeEditor.lib.utils import cache_table_of_contents
+from YouTubeEditor.lib.networking import load_cached_request_data
+from YouTubeEditor.lib.networking import save_cached_request_data
+from YouTubeEditor.lib.networking import filter_new_video_details
+
+
+###----------------------------------------------------------------------------
+
+
+# The channel sizes that are benchmarked by default.
+_DEFAULT_SIZES = [100, 10000, 100000]
+
+# The encryption of the cache is done in pure Python, so encrypting a large
+# channel takes minutes; the encrypted cache benchmarks only run on channels
+# up to this size unless asked to run on all sizes.
+_ENCRYPTED_MAX_SIZE = 10000
+
+# How many times each benchmark runs; the fastest run is the result.
+_REPEAT = 3
+
+# How much slower than the recorded result a benchmark can be before it's
+# reported as a regression.
+_DEFAULT_THRESHOLD = 1.25
+
+
+###----------------------------------------------------------------------------
+
+
+def _cache_benchmark(encrypt, load):
+    """
+    Make a benchmark that saves or loads the cache for a channel, with or
+    without encryption.
+    """
+    def setup(cache):
+        yte_setting.obj["encrypt_cache"] = encrypt
+        if load:
+            save_cached_request_data(cache)
+
+    def run(cache):
+        yte_setting.obj["encrypt_cache"] = encrypt
+        if load:
+            load_cached_request_data()
+        else:
+            save_cached_request_data(cache)
+
+    return setup, run
+
+
+def _dotty_lookups(cache):
+    for video in cache["videos"].values():
+        video['snippet.title']
+        video['statistics.viewCount']
+        video['status.privacyStatus']
+        video.get('contentDetails.definition')
+
+
+def _video_sort(cache):
+    video_sort(list(cache["videos"].values()), 'snippet.title')
+
+
+def _select_tag(cache):
+    select_tag(list(cache["videos"].values()), lambda tag, tags: None)
+
+
+def _toc_parse_setup(cache):
+    get_table_of_contents.cache = {}
+
+
+def _toc_parse(cache):
+    get_table_of_contents.cache = {}
+    for video in cache["videos"].values():
+        get_table_of_contents(video)
+
+
+def _toc_cached_setup(cache):
+    get_table_of_contents.cache = {}
+    for video in cache["videos"].values():
+        cache_table_of_contents(video)
+
+
+def _toc_cached(cache):
+    for video in cache["videos"].values():
+        get_table_of_contents(video)
+
+
+def _filter_details(cache):
+    for video in cache["videos"].values():
+        filter_new_video_details(video)
+
+
+# The benchmarks; each has a name, a setup function and a function to time,
+# both of which are given the cache of the channel, and the largest channel
+# size to run on by default (None for all sizes).
+_BENCHMARKS = [
+    ("cache_save_plain",) + _cache_benchmark(False, False) + (None,),
+    ("cache_load_plain",) + _cache_benchmark(False, True) + (None,),
+    ("cache_save_encrypted",) + _cache_benchmark(True, False) + (_ENCRYPTED_MAX_SIZE,),
+    ("cache_load_encrypted",) + _cache_benchmark(True, True) + (_ENCRYPTED_MAX_SIZE,),
+    ("dotty_lookups", None, _dotty_lookups, None),
+    ("video_sort", None, _video_sort, None),
+    ("select_tag", None, _select_tag, None),
+    ("toc_parse", _toc_parse_setup, _toc_parse, None),
+    ("toc_cached", _toc_cached_setup, _toc_cached, None),
+    ("filter_new_video_details", None, _filter_details, None),
+]
+
+
+###----------------------------------------------------------------------------
+
+
+def run_benchmarks(sizes, only=None, all_sizes=False, repeat=_REPEAT):
+    """
+    Run the benchmarks on channels of each of the given sizes, returning back
+    a dictionary keyed on benchmark name whose values are dictionaries of the
+    best time in seconds for each channel size (as a string, so that it's the
+    same once saved as JSON).
+    """
+    results = {}
+    for size in sizes:
+        start = time.perf_counter()
+        cache = make_channel(size)
+        print("channel of {0} videos: generated in {1:.2f}s".format(
+              size, time.perf_counter() - start))
+
+        for name, setup, bench, max_size in _BENCHMARKS:
+            if only and not any(word in name for word in only):
+                continue
+
+            if max_size is not None and size > max_size and not all_sizes:
+                continue
+
+            if setup is not None:
+                setup(cache)
+
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                bench(cache)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+
+            results.setdefault(name, {})[str(size)] = best
+            print("  {0:<26} {1:>10.4f}s".format(name, best))
+
+    return results
+
+
+def compare_results(results, baseline, threshold):
+    """
+    Compare the given results with recorded ones, printing the ratio of each
+    benchmark that was recorded; the return value is a list of the benchmarks
+    (and sizes) that were slower than the recorded result by more than the
+    threshold.
+    """
+    regressions = []
+
+    print("\ncompared with the recorded results (new / old):")
+    for name in sorted(results):
+        for size, elapsed in sorted(results[name].items(), key=lambda i: int(i[0])):
+            old = baseline.get(name, {}).get(size)
+            if not old:
+                continue
+
+            ratio = elapsed / old
+            flag = ""
+            if ratio > threshold:
+                flag = "  REGRESSION"
+                regressions.append((name, size))
+
+            print("  {0:<26} {1:>7} {2:>7.2f}x{3}".format(name, size, ratio, flag))
+
+    return regressions
+
+
+###----------------------------------------------------------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline YouTubeEditor benchmarks")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in _DEFAULT_SIZES),
+                        help="comma separated channel sizes (default: %(default)s)")
+    parser.add_argument("--only", help="comma separated words; only run benchmarks "
+                        "whose name contains one of them")
+    parser.add_argument("--all-sizes", action="store_true",
+                        help="run the slow encrypted cache benchmarks at every size")
+    parser.add_argument("--repeat", type=int, default=_REPEAT,
+                        help="runs of each benchmark; the fastest is kept (default: %(default)s)")
+    parser.add_argument("--save", metavar="FILE", help="record the results in FILE")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="compare the results with those recorded in FILE")
+    parser.add_argument("--threshold", type=float, default=_DEFAULT_THRESHOLD,
+                        help="slowdown that counts as a regression (default: %(default)s)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    only = args.only.split(",") if args.only else None
+
+    results = run_benchmarks(sizes, only, args.all_sizes, args.repeat)
+
+    if args.save:
+        with open(args.save, "w") as handle:
+            json.dump({
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "results": results
+            }, handle, indent=2, sort_keys=True)
+        print("\nresults recorded in {0}".format(args.save))
+
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)["results"]
+
+        if compare_results(results, baseline, args.threshold):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    with _cache_dir:
+        status = main()
+    sys.exit(status)
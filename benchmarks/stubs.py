@@ -0,0 +1,152 @@
+import os
+import queue
+import sys
+import tempfile
+import types
+
+
+###----------------------------------------------------------------------------
+
+
+# The root of the package, which is the parent of the folder we're in.
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The name that the package is imported as; this is the name that Sublime
+# would load it as.
+PACKAGE_NAME = "YouTubeEditor"
+
+# The callbacks that have been handed to set_timeout() to run in the main
+# thread; see run_main_thread().
+_main_thread = queue.Queue()
+
+
+###----------------------------------------------------------------------------
+
+
+class QuickPanelItem():
+    def __init__(self, trigger, details="", annotation="", kind=None):
+        self.trigger = trigger
+        self.details = details
+        self.annotation = annotation
+        self.kind = kind
+
+
+class Window():
+    """
+    A window that ignores everything it's asked to do; quick panels are not
+    displayed, so the code that builds them can be timed on its own.
+    """
+    def id(self):
+        return 1
+
+    def active_view(self):
+        return None
+
+    def show_quick_panel(self, items, on_select, **kwargs):
+        pass
+
+    def find_output_panel(self, name):
+        return None
+
+
+def _make_sublime(cache_path):
+    """
+    Create a stand in for the sublime module that has just enough of the API
+    for the package's lib modules to import and run outside of Sublime.
+    """
+    sublime = types.ModuleType("sublime")
+
+    sublime.KIND_ID_SNIPPET = 1
+    sublime.KIND_ID_NAVIGATION = 2
+    sublime.KIND_ID_FUNCTION = 3
+    sublime.KIND_ID_NAMESPACE = 4
+    sublime.QuickPanelItem = QuickPanelItem
+
+    window = Window()
+    sublime.active_window = lambda: window
+    sublime.windows = lambda: []
+    sublime.cache_path = lambda: cache_path
+    sublime.load_settings = lambda name: {}
+
+    # Callbacks for the main thread are held until run_main_thread() is
+    # called, and there is no status bar or dialog to display anything in.
+    sublime.set_timeout = lambda callback, delay=0: _main_thread.put(callback)
+    sublime.set_timeout_async = lambda callback, delay=0: _main_thread.put(callback)
+    sublime.status_message = lambda msg: None
+    sublime.message_dialog = lambda msg: None
+    sublime.error_message = lambda msg: None
+    sublime.set_clipboard = lambda text: None
+
+    return sublime
+
+
+def _make_sublime_plugin():
+    sublime_plugin = types.ModuleType("sublime_plugin")
+    for name in ("ApplicationCommand", "WindowCommand", "TextCommand",
+                 "EventListener", "ViewEventListener", "TextChangeListener",
+                 "ListInputHandler", "TextInputHandler"):
+        setattr(sublime_plugin, name, type(name, (), {}))
+
+    return sublime_plugin
+
+
+###----------------------------------------------------------------------------
+
+
+def run_main_thread(timeout=None):
+    """
+    Run the callbacks that have been handed to set_timeout(), as Sublime would
+    in its main thread. This waits up to timeout seconds for the first one if
+    there are none yet, and returns back how many were run.
+
+    Callbacks that are added while this is running (such as the next tick of
+    a status bar spinner) are left for the next call.
+    """
+    try:
+        callbacks = [_main_thread.get(timeout=timeout) if timeout else _main_thread.get_nowait()]
+    except queue.Empty:
+        return 0
+
+    for _ in range(_main_thread.qsize()):
+        callbacks.append(_main_thread.get_nowait())
+
+    for callback in callbacks:
+        callback()
+
+    return len(callbacks)
+
+
+def install(settings=None):
+    """
+    Install stand ins for the sublime and sublime_plugin modules, and make the
+    package importable under its Sublime name, so that the lib modules can be
+    imported and run outside of Sublime. The given settings are used in place
+    of the package settings.
+
+    The cache folder is a new temporary folder; the TemporaryDirectory for it
+    is returned, which callers should use as a context manager so that the
+    folder is removed when they're done.
+    """
+    cache_dir = tempfile.TemporaryDirectory(prefix="yte-bench-")
+
+    sys.modules["sublime"] = _make_sublime(cache_dir.name)
+    sys.modules["sublime_plugin"] = _make_sublime_plugin()
+
+    # The package reloads its modules through the editor module when Sublime
+    # reloads the plugin, which isn't needed here.
+    package = types.ModuleType(PACKAGE_NAME)
+    package.__path__ = [PACKAGE_ROOT]
+    sys.modules[PACKAGE_NAME] = package
+
+    editor = types.ModuleType(PACKAGE_NAME + ".editor")
+    editor.reload = lambda prefix, modules=[""]: None
+    sys.modules[PACKAGE_NAME + ".editor"] = editor
+
+    from YouTubeEditor.lib import yte_setting
+    yte_setting.obj = dict(settings or {})
+    yte_setting.default = {}
+
+    return cache_dir
+
+
+###----------------------------------------------------------------------------
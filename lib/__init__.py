@@ -1,21 +1,41 @@
 from ..editor import reload
 
-reload("lib", ["logging", "utils", "request", "networking", "manager", "dotty"])
+# The handoff, dotty and registry modules are not reloaded; the network thread
+# hands its cache off to the next generation of the modules when the plugin
+# reloads (see handoff.py), the cache is made of dotty objects that would
+# otherwise no longer be instances of the reloaded Dotty class, and the state
+# of open views and windows in the registry needs to outlive the reload.
+reload("lib", ["logging", "indexes", "stats", "utils", "request", "bulk",
+              "query", "tracing", "networking", "manager", "audit",
+              "thumbnails"])
 
 from .utils import select_playlist, select_tag, select_video, select_timecode
+from .utils import select_channel
 from .utils import yte_syntax, yte_setting, get_video_timecode, make_video_link
 from .utils import get_window_link, make_studio_edit_link, BusySpinner
-from .utils import undotty_data, get_report_view, add_report_text
-from .utils import get_table_of_contents, video_sort
-from .logging import log, setup_log_panel, copy_video_link
+from .utils import undotty_data, clone_data, get_report_view, add_report_text
+from .utils import get_table_of_contents, video_sort, content_digest
+from .utils import cache_generation
+from .logging import log, setup_log_panel, clear_log, copy_video_link
 from .request import Request
+from .indexes import TagIndex, SearchIndex
+from .stats import VideoStats
+from .query import VideoQuery, compile_query
 from .manager import NetworkManager
-from .networking import stored_credentials_path
+from .audit import AuditEngine, audit_rule, audit_rules
+from .bulk import BulkEditPlanner, bulk_edit_fields, make_bulk_transform
+from .bulk import make_bulk_details
+from .thumbnails import ThumbnailCache
+from .registry import view_state, window_state
+from .registry import discard_view_state, discard_window_state
+from .networking import stored_credentials_path, changed_video_parts
 from . import dotty
 
 __all__ = [
     "video_sort",
     "get_table_of_contents",
+    "content_digest",
+    "cache_generation",
     "get_video_timecode",
     "make_video_link",
     "make_studio_edit_link",
@@ -24,17 +44,38 @@ __all__ = [
     "select_tag",
     "select_video",
     "select_timecode",
+    "select_channel",
     "yte_syntax",
     "yte_setting",
     "log",
     "undotty_data",
+    "clone_data",
     "copy_video_link",
     "setup_log_panel",
+    "clear_log",
     "get_report_view",
     "add_report_text",
     "Request",
+    "TagIndex",
+    "SearchIndex",
+    "VideoStats",
+    "VideoQuery",
+    "compile_query",
     "NetworkManager",
+    "AuditEngine",
+    "audit_rule",
+    "audit_rules",
+    "BulkEditPlanner",
+    "bulk_edit_fields",
+    "make_bulk_transform",
+    "make_bulk_details",
+    "ThumbnailCache",
+    "view_state",
+    "window_state",
+    "discard_view_state",
+    "discard_window_state",
     "stored_credentials_path",
+    "changed_video_parts",
     "dotty",
     "BusySpinner"
 ]
\ No newline at end of file
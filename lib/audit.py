@@ -0,0 +1,247 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+import hashlib
+
+from .utils import get_table_of_contents
+
+
+###----------------------------------------------------------------------------
+
+
+# The registered audit rules, in the order in which they were registered. Each
+# entry is a tuple of the rule name and the function that implements it.
+_rules = []
+
+# The maximum length of all of the tags on a video combined, and of any single
+# tag. Tags that contain spaces count as two characters longer than they are,
+# since YouTube wraps them in quotes, and the commas between tags also count.
+_MAX_TAGS_LENGTH = 500
+_MAX_TAG_LENGTH = 30
+
+# The chapter requirements; the first chapter must be at 0:00, there must be
+# at least this many of them, and each must be at least this many seconds
+# long.
+_MIN_CHAPTERS = 3
+_MIN_CHAPTER_SECONDS = 10
+
+# The number of characters of the description that are displayed before the
+# user has to expand it; keywords should appear in this part.
+_FOLD_LENGTH = 150
+
+
+###----------------------------------------------------------------------------
+
+
+def audit_rule(name):
+    """
+    Decorator that registers the decorated function as an audit rule with the
+    given name. The function is invoked with a video and its table of contents
+    and returns a list of the problems it found with the video, which is empty
+    if there are none.
+    """
+    def register(func):
+        _rules.append((name, func))
+        return func
+
+    return register
+
+
+def audit_rules():
+    """
+    Return back a list of the names of all of the registered audit rules.
+    """
+    return [name for name, func in _rules]
+
+
+def _content_hash(video):
+    """
+    Return back a hash of the parts of a video that the audit rules look at,
+    so that videos can be re-audited only when they change.
+    """
+    digest = hashlib.sha1()
+    for text in (video.get('snippet.title', ''),
+                 video.get('snippet.description', ''),
+                 "\0".join(video.get('snippet.tags', []))):
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\1")
+
+    return digest.hexdigest()
+
+
+###----------------------------------------------------------------------------
+
+
+@audit_rule("tags_length")
+def _check_tags_length(video, toc):
+    tags = video.get('snippet.tags', [])
+    length = sum(len(tag) + (2 if " " in tag else 0) for tag in tags)
+    length += max(len(tags) - 1, 0)
+
+    if length > _MAX_TAGS_LENGTH:
+        return ["tags are {0} characters long; the limit is {1}".format(
+                length, _MAX_TAGS_LENGTH)]
+
+    return []
+
+
+@audit_rule("tag_length")
+def _check_tag_length(video, toc):
+    return ["tag '{0}' is longer than {1} characters".format(tag, _MAX_TAG_LENGTH)
+            for tag in video.get('snippet.tags', []) if len(tag) > _MAX_TAG_LENGTH]
+
+
+@audit_rule("chapters")
+def _check_chapters(video, toc):
+    if not toc:
+        return ["description has no table of contents"]
+
+    problems = []
+    if toc[0][2] != 0:
+        problems.append("first chapter starts at {0}, not 0:00".format(toc[0][0]))
+
+    if len(toc) < _MIN_CHAPTERS:
+        problems.append("only {0} chapter(s); at least {1} are required".format(
+                        len(toc), _MIN_CHAPTERS))
+
+    for prev, entry in zip(toc, toc[1:]):
+        if entry[2] is None or prev[2] is None:
+            continue
+
+        if entry[2] <= prev[2]:
+            problems.append("chapter at {0} is not after the chapter at {1}".format(
+                            entry[0], prev[0]))
+        elif entry[2] - prev[2] < _MIN_CHAPTER_SECONDS:
+            problems.append("chapter at {0} is shorter than {1} seconds".format(
+                            prev[0], _MIN_CHAPTER_SECONDS))
+
+    return problems
+
+
+@audit_rule("keywords_above_fold")
+def _check_keywords(video, toc):
+    tags = video.get('snippet.tags', [])
+    if not tags:
+        return []
+
+    fold = video.get('snippet.description', '')[:_FOLD_LENGTH].lower()
+    if not any(tag.lower() in fold for tag in tags):
+        return ["no tag appears in the first {0} characters of the description".format(
+                _FOLD_LENGTH)]
+
+    return []
+
+
+###----------------------------------------------------------------------------
+
+
+class AuditEngine():
+    """
+    Run all of the registered audit rules over a list of videos, using a pool
+    of worker threads. The findings for each video are remembered along with a
+    hash of the video content, so that auditing the same videos again only
+    needs to run the rules for videos that have changed since.
+
+    There should be a single global instance of this class, so that the
+    findings are shared between audits.
+    """
+    # How many videos each worker audits at once.
+    chunk_size = 250
+
+    def __init__(self, workers=4):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.lock = Lock()
+
+        # Keys are video ID's, values are a tuple of the content hash of the
+        # video when it was audited and the findings.
+        self.findings = {}
+
+    def shutdown(self):
+        """
+        Shut down the worker pool; this should be called when the plugin is
+        unloaded.
+        """
+        self.executor.shutdown(wait=False)
+
+    def audit(self, videos, on_findings, on_done=None):
+        """
+        Audit the given list of videos, returning immediately. As each batch
+        of videos is audited, on_findings is invoked with a list of tuples of
+        the video and its findings, for only those videos that have findings.
+        Once all videos have been audited, on_done is invoked with the number
+        of videos audited and the number that actually needed the rules to be
+        run.
+
+        Findings are lists of tuples of rule name and problem description. The
+        callbacks are invoked from the worker threads.
+        """
+        chunks = [videos[i:i + self.chunk_size]
+                  for i in range(0, len(videos), self.chunk_size)]
+
+        state = {"pending": len(chunks), "audited": 0}
+        if not chunks:
+            return on_done and on_done(0, 0)
+
+        def finished(future):
+            results, audited = future.result()
+            on_findings(results)
+
+            with self.lock:
+                state["pending"] -= 1
+                state["audited"] += audited
+                done = state["pending"] == 0
+
+            if done and on_done is not None:
+                on_done(len(videos), state["audited"])
+
+        for chunk in chunks:
+            self.executor.submit(self._audit_chunk, chunk).add_done_callback(finished)
+
+    def _audit_chunk(self, videos):
+        """
+        Audit all of the videos in the given list, returning back a list of
+        the videos with findings along with the findings, and the number of
+        videos that had to have the rules run on them.
+        """
+        results = []
+        audited = 0
+
+        for video in videos:
+            digest = _content_hash(video)
+            cached = self.findings.get(video['id'])
+
+            if cached is not None and cached[0] == digest:
+                findings = cached[1]
+            else:
+                findings = self._audit_video(video)
+                self.findings[video['id']] = (digest, findings)
+                audited += 1
+
+            if findings:
+                results.append((video, findings))
+
+        return results, audited
+
+    def _audit_video(self, video):
+        """
+        Run all of the rules on a single video, returning back the findings.
+        Rules that fail are reported as a finding rather than stopping the
+        audit.
+        """
+        # This only reads the table of contents that the network thread parsed
+        # when it stored the video, so it's safe to do from the worker threads;
+        # the description is only parsed here if the video has been edited
+        # since and the network thread has yet to see the change.
+        toc = get_table_of_contents(video)
+
+        findings = []
+        for name, rule in _rules:
+            try:
+                findings.extend((name, problem) for problem in rule(video, toc))
+            except Exception as err:
+                findings.append((name, "rule failed: {0}".format(err)))
+
+        return findings
+
+
+###----------------------------------------------------------------------------
@@ -0,0 +1,354 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict
+from threading import Lock
+
+import difflib
+import json
+import os
+import re
+import time
+
+from .utils import clone_data
+
+
+###----------------------------------------------------------------------------
+
+
+# The fields of a video that can be bulk edited. The key is the name of the
+# field as the user gives it, and the value is a tuple of a function that gets
+# the field from a video as a string and a function that converts a string
+# back into the value that is stored in the snippet.
+_fields = {
+    "title": (lambda v: v.get('snippet.title', ''), lambda s: s.strip()),
+    "description": (lambda v: v.get('snippet.description', ''), lambda s: s),
+    "tags": (lambda v: ",".join(v.get('snippet.tags', [])),
+             lambda s: [t.strip() for t in s.split(",") if t.strip() != ''])
+}
+
+
+###----------------------------------------------------------------------------
+
+
+def bulk_edit_fields():
+    """
+    Return back a list of the names of the fields that can be bulk edited.
+    """
+    return sorted(_fields)
+
+
+def make_bulk_transform(field, find=None, replace=None, template=None):
+    """
+    Create and return a function that takes a video and returns back the new
+    text for the given field of that video, or None if the edit doesn't change
+    it.
+
+    When find is given, it is a regular expression and every match of it in
+    the field is replaced with replace, which can contain group references as
+    per re.sub(). Otherwise template is used to generate the new text via
+    str.format(), with {value} being the current text of the field, and {id},
+    {title}, {description} and {tags} being the respective parts of the video.
+
+    This raises ValueError if the field is not known or the regular expression
+    is not valid.
+    """
+    if field not in _fields:
+        raise ValueError("cannot bulk edit field '{0}'".format(field))
+
+    get_field = _fields[field][0]
+
+    if find is not None:
+        try:
+            regex = re.compile(find, re.MULTILINE)
+        except re.error as err:
+            raise ValueError("invalid regular expression: {0}".format(err))
+
+        def edit(video):
+            return regex.sub(replace or "", get_field(video))
+
+    elif template is not None:
+        def edit(video):
+            return template.format(
+                value=get_field(video),
+                id=video['id'],
+                title=_fields["title"][0](video),
+                description=_fields["description"][0](video),
+                tags=_fields["tags"][0](video))
+
+    else:
+        raise ValueError("a bulk edit requires either find or template")
+
+    def transform(video):
+        old_text = get_field(video)
+        new_text = edit(video)
+        return None if new_text == old_text else new_text
+
+    return transform
+
+
+def make_bulk_details(video, field, new_text):
+    """
+    Given a video, the name of a field and the new text for it, return back a
+    copy of the details of the video with that field changed, suitable for
+    use in a bulk_update request. The video itself is not modified.
+    """
+    details = clone_data(video)
+    details['snippet'][field] = _fields[field][1](new_text)
+
+    return details
+
+
+###----------------------------------------------------------------------------
+
+
+class BulkEditPlanner():
+    """
+    Work out the effect of a bulk edit over a list of videos without making any
+    changes, using a pool of worker threads. The result is a list of the videos
+    that the edit would change, along with a diff of the change.
+    """
+    # How many videos each worker plans at once.
+    chunk_size = 250
+
+    def __init__(self, workers=4):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.lock = Lock()
+
+    def shutdown(self):
+        """
+        Shut down the worker pool; this should be called when the plugin is
+        unloaded.
+        """
+        self.executor.shutdown(wait=False)
+
+    def plan(self, videos, field, transform, on_changes, on_done=None):
+        """
+        Plan the bulk edit of the given field of the given videos using the
+        transform (see make_bulk_transform()), returning immediately.
+
+        As each batch of videos is planned, on_changes is invoked with a list
+        of tuples of video, new text and the diff lines, for only those videos
+        that would change. Once all videos are planned, on_done is invoked
+        with a list of the errors that happened, if any. The callbacks are
+        invoked from the worker threads.
+        """
+        chunks = [videos[i:i + self.chunk_size]
+                  for i in range(0, len(videos), self.chunk_size)]
+
+        state = {"pending": len(chunks), "errors": []}
+        if not chunks:
+            return on_done and on_done([])
+
+        def finished(future):
+            changes, errors = future.result()
+            on_changes(changes)
+
+            with self.lock:
+                state["pending"] -= 1
+                state["errors"].extend(errors)
+                done = state["pending"] == 0
+
+            if done and on_done is not None:
+                on_done(state["errors"])
+
+        for chunk in chunks:
+            self.executor.submit(self._plan_chunk, chunk, field,
+                                 transform).add_done_callback(finished)
+
+    def _plan_chunk(self, videos, field, transform):
+        changes = []
+        errors = []
+
+        for video in videos:
+            try:
+                new_text = transform(video)
+            except Exception as err:
+                errors.append((video, str(err)))
+                continue
+
+            if new_text is not None:
+                old_text = _fields[field][0](video)
+                diff = difflib.unified_diff(old_text.splitlines(),
+                                            new_text.splitlines(),
+                                            "before", "after", lineterm="")
+                changes.append((video, new_text, list(diff)))
+
+        return changes, errors
+
+
+###----------------------------------------------------------------------------
+
+
+class UpdatesHalted(Exception):
+    """
+    Raised by the function that sends an update from an UpdateQueue to signal
+    that the update could not be sent and that no further updates should be
+    sent either, such as when the API quota has run out.
+    """
+    pass
+
+
+class UpdateQueue():
+    """
+    A queue of video updates that are waiting to be sent to YouTube. Updates
+    are sent concurrently by a pool of worker threads, but no faster than a
+    given rate. If sending stops part way through (for example because the
+    quota ran out or the network went away), the updates that were not sent
+    stay in the queue so that they can be sent later.
+
+    Each update is keyed by video ID; adding an update for a video that is
+    still queued merges the two, so that only one update is sent for it.
+
+    When a path is given, the queue is saved to that file every time it
+    changes and loaded from it when created, so that pending updates survive
+    a restart.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.pending = OrderedDict()
+
+        if path is not None:
+            self.load()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def __contains__(self, video_id):
+        return video_id in self.pending
+
+    def load(self):
+        """
+        Load the queue from its file, replacing its current contents; a queue
+        whose file does not exist yet is empty.
+        """
+        self.pending = OrderedDict()
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                for video_id, part, body in json.load(handle)["updates"]:
+                    self.pending[video_id] = (part, body)
+
+        except FileNotFoundError:
+            pass
+
+    def save(self):
+        """
+        Write the queue to its file, if it has one. The file is replaced in a
+        single step, so that a crash while saving can't lose the queue.
+        """
+        if self.path is None:
+            return
+
+        updates = [[video_id, part, body]
+                   for video_id, (part, body) in self.pending.items()]
+
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            json.dump({"updates": updates}, handle)
+
+        os.replace(temp_path, self.path)
+
+    def add(self, video_id, part, body):
+        """
+        Add an update for the video with the given ID to the queue. If there
+        is already an update queued for that video, the parts of this update
+        replace the same parts in that one and the rest are kept.
+        """
+        body = clone_data(body)
+
+        queued = self.pending.pop(video_id, None)
+        if queued is not None:
+            merged = dict(queued[1])
+            merged.update(body)
+
+            parts = set(queued[0].split(",")) | set(part.split(","))
+            part, body = ",".join(sorted(parts)), merged
+
+        self.pending[video_id] = (part, body)
+        self.save()
+
+    def drain(self, send, on_result, workers=4, rate=5.0, limit=None, only=None,
+              interrupt=None):
+        """
+        Send the updates in the queue. send is invoked from a worker thread
+        with the part and body of an update, and returns the result. It
+        should raise UpdatesHalted if no further updates should be sent.
+
+        on_result is invoked in the calling thread for each update as it
+        finishes, with the video ID, whether it was successful, and either the
+        result or the exception raised. Updates that fail are removed from the
+        queue unless send raised UpdatesHalted for them.
+
+        Updates are started at most rate times a second. When limit is given,
+        at most that many updates are sent, and when only is given, only the
+        updates for the video ID's in it are sent. The return value is True if
+        sending was halted.
+
+        When interrupt is given, it is invoked before each update is started;
+        if it returns True no more updates are started, and drain returns once
+        those already started are finished. The rest stay in the queue, but
+        this does not count as sending being halted.
+        """
+        interval = 1.0 / rate if rate else 0
+        stopped = False
+
+        updates = [(video_id, update) for video_id, update in self.pending.items()
+                   if only is None or video_id in only]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            last_start = 0
+
+            for video_id, (part, body) in updates[:limit]:
+                if stopped or (interrupt is not None and interrupt()):
+                    break
+
+                delay = last_start + interval - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                    if interrupt is not None and interrupt():
+                        break
+                last_start = time.time()
+
+                futures[executor.submit(send, part, body)] = (video_id, body)
+
+                # Handle any that finished while we were waiting, so that a
+                # stop is noticed as soon as possible.
+                for future in [f for f in futures if f.done()]:
+                    if self._finished(future, futures.pop(future), on_result):
+                        stopped = True
+
+            for future in as_completed(list(futures)):
+                if self._finished(future, futures.pop(future), on_result):
+                    stopped = True
+
+        return stopped
+
+    def _finished(self, future, info, on_result):
+        """
+        Handle the completion of a single update; returns True if updates
+        should stop being sent.
+        """
+        video_id, body = info
+
+        try:
+            result = future.result()
+        except UpdatesHalted as err:
+            on_result(video_id, False, err)
+            return True
+        except Exception as err:
+            self._discard(video_id, body)
+            on_result(video_id, False, err)
+            return False
+
+        self._discard(video_id, body)
+        on_result(video_id, True, result)
+        return False
+
+    def _discard(self, video_id, body):
+        # Only remove the update if it was not replaced by a newer one while
+        # it was being sent.
+        if video_id in self.pending and self.pending[video_id][1] is body:
+            del self.pending[video_id]
+            self.save()
+
+
+###----------------------------------------------------------------------------
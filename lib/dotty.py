@@ -32,8 +32,6 @@ try:
 except ImportError:
     from collections import Mapping
 
-from functools import lru_cache
-
 __author__ = 'Paweł Zadrożny'
 __copyright__ = 'Copyright (c) 2017, Paweł Zadrożny'
 
@@ -52,6 +50,19 @@ def dotty(dictionary=None, no_list=False):
     return Dotty(dictionary, separator='.', esc_char='\\', no_list=no_list)
 
 
+def _is_number(key):
+    """Check if a string key could be converted to a numeric key type.
+
+    :param key: Key to check
+    :return bool: True if the key is a numeric string
+    """
+    try:
+        float(key)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
 class Dotty:
     """Dictionary and dict-like objects wrapper.
 
@@ -154,7 +165,14 @@ class Dotty:
                 pass
         return item
 
-    @lru_cache(maxsize=32)
+    # NOTE: Upstream wraps this in an lru_cache, which hashes the entire wrapped
+    #       dictionary (via __str__) on every lookup; that makes each access
+    #       cost as much as the size of the record, so it has been removed.
+    #
+    #       Upstream also tries to convert every missing key to the type of the
+    #       other keys, which scans all of them; that makes a lookup of a
+    #       missing key in a large dictionary slow, so it's only done for keys
+    #       that could be converted to a number.
     def __getitem__(self, item):
         def get_from(items, data):
             """Recursively get value from dictionary deep key.
@@ -167,7 +185,7 @@ class Dotty:
             it = items.pop(0)
             if isinstance(data, list) and it.isdigit() and not self.no_list:
                 it = int(it)
-            elif it not in data and isinstance(data, dict):
+            elif it not in data and isinstance(data, dict) and _is_number(it):
                 it = self._find_data_type(it, data)
             elif isinstance(data, list) and ':' in it and not self.no_list:
                 list_slice = slice(*map(lambda x: None if x == '' else int(x), it.split(':')))
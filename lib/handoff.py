@@ -0,0 +1,94 @@
+import threading
+
+
+###----------------------------------------------------------------------------
+
+
+# The state that one generation of the package's modules has handed off to the
+# next; the keys are the names the state was handed off under, and the values
+# are tuples of the version of the state and the state itself.
+#
+# This module is deliberately left out of the list of modules that are
+# reloaded when the plugin is reloaded (see lib/__init__.py), so that what is
+# stored here survives the reload. For the same reason, it must not import
+# anything from the package.
+_handed_off = {}
+
+# The names that state is expected to be handed off under, but has not been
+# yet; the values are tuples of an event that is set once it has been and the
+# thread that is going to hand it off.
+_pending = {}
+
+
+###----------------------------------------------------------------------------
+
+
+def hand_off(name, version, state):
+    """
+    Hand off the given state under the given name, so that the next generation
+    of the package's modules can pick it up with take_over() after the plugin
+    is reloaded. The version is any value that can be compared with ==, which
+    says what layout the state has; state handed off earlier under the same
+    name is replaced.
+
+    A state of None hands off nothing, but still lets anything waiting to take
+    over state under this name carry on; see expect_hand_off().
+    """
+    if state is not None:
+        _handed_off[name] = (version, state)
+    else:
+        _handed_off.pop(name, None)
+
+    pending = _pending.pop(name, None)
+    if pending is not None:
+        pending[0].set()
+
+
+def expect_hand_off(name, thread):
+    """
+    Note that the given thread is going to hand off state under the given
+    name, but not right away; it can only do so once it gets to a point where
+    it's safe to, which may be after the plugin has already been loaded again.
+
+    Until the state is handed off or the thread dies, take_over() for the name
+    waits for it.
+    """
+    _pending.setdefault(name, (threading.Event(), thread))
+
+
+def hand_off_pending(name):
+    """
+    Return back an indication of whether state is expected to be handed off
+    under the given name but has not been yet; see expect_hand_off().
+    """
+    return name in _pending
+
+
+def take_over(name, version):
+    """
+    Take over the state that was handed off under the given name, if there is
+    any; the state is only returned if it was handed off with the given
+    version, and is otherwise thrown away. Either way, the state can only be
+    taken over once.
+
+    If the state is expected but has not been handed off yet, this waits for
+    it to be (see expect_hand_off()). Until then whatever is handing it off is
+    still using it, so nothing that it shares (such as files) can be used.
+
+    The return value is a tuple of the state (or None if there is none that
+    can be used) and the version it was handed off with (or None if nothing
+    was handed off).
+    """
+    pending = _pending.get(name)
+    if pending is not None:
+        event, thread = pending
+        while not event.wait(1.0):
+            if not thread.is_alive():
+                _pending.pop(name, None)
+                break
+
+    old_version, state = _handed_off.pop(name, (None, None))
+    return (state if old_version == version else None), old_version
+
+
+###----------------------------------------------------------------------------
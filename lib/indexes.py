@@ -0,0 +1,316 @@
+from bisect import bisect_left, insort
+
+import re
+
+
+###----------------------------------------------------------------------------
+
+
+class TagIndex():
+    """
+    An inverted index that maps the tags on a set of videos to the videos that
+    carry them. The index tracks the tag names in sorted order as well as the
+    videos for each tag, and is kept up to date incrementally as videos are
+    added, removed or have their tags changed, so that browsing by tag doesn't
+    need to scan every video.
+
+    For compatibility with code that expects a plain dictionary of tags, the
+    index can be subscripted with a tag to get the list of videos with that
+    tag.
+    """
+    def __init__(self, videos=None):
+        # Keys are tags, values are a dictionary of videos with that tag,
+        # keyed by video ID.
+        self._tags = {}
+
+        # The tags in the index, in sorted order.
+        self._sorted = []
+
+        # Keys are video ID's, values are the tags that the video had at the
+        # point where it was last indexed.
+        self._video_tags = {}
+
+        for video in videos or []:
+            self.add(video)
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def __contains__(self, tag):
+        return tag in self._tags
+
+    def __getitem__(self, tag):
+        return list(self._tags[tag].values())
+
+    def tags(self):
+        """
+        Return back a list of all of the tags in the index, in sorted order.
+        """
+        return list(self._sorted)
+
+    def count(self, tag):
+        """
+        Return back the number of videos that have the given tag.
+        """
+        return len(self._tags.get(tag, ()))
+
+    def add(self, video):
+        """
+        Add the given video to the index; if the video is already in the index,
+        it is updated to reflect its current tags instead.
+        """
+        video_id = video['id']
+        if video_id in self._video_tags:
+            self.remove(video_id)
+
+        tags = tuple(set(video.get('snippet.tags', [])))
+        self._video_tags[video_id] = tags
+
+        for tag in tags:
+            videos = self._tags.get(tag)
+            if videos is None:
+                videos = self._tags[tag] = {}
+                insort(self._sorted, tag)
+
+            videos[video_id] = video
+
+    def remove(self, video_id):
+        """
+        Remove the video with the given ID from the index, if it's present.
+        Tags that no longer apply to any videos are removed as well.
+        """
+        for tag in self._video_tags.pop(video_id, ()):
+            videos = self._tags[tag]
+            videos.pop(video_id, None)
+
+            if not videos:
+                del self._tags[tag]
+                del self._sorted[bisect_left(self._sorted, tag)]
+
+    def copy(self):
+        """
+        Return back a copy of the index, which is not affected by any changes
+        that are later made to this one; the videos themselves are shared.
+        """
+        index = TagIndex()
+        index._tags = {tag: dict(videos) for tag, videos in self._tags.items()}
+        index._sorted = list(self._sorted)
+        index._video_tags = dict(self._video_tags)
+
+        return index
+
+    def update(self, video):
+        """
+        Update the index for the given video if its tags have changed since it
+        was added; videos that are not in the index are ignored.
+        """
+        video_id = video['id']
+        if video_id not in self._video_tags:
+            return
+
+        if set(video.get('snippet.tags', [])) != set(self._video_tags[video_id]):
+            self.add(video)
+
+
+###----------------------------------------------------------------------------
+
+
+class SearchIndex():
+    """
+    A full text inverted index over the titles, descriptions, tags and table
+    of contents entries of a set of videos. Like the tag index, this is kept up
+    to date incrementally as videos are added, removed or changed.
+
+    Searches match each word of the query against the indexed words exactly,
+    by prefix, or (for longer words) with a single typo, with the results being
+    ranked by where in the video the words were found and how well they match.
+    """
+    # How much a match in each part of a video counts towards the rank of the
+    # video in the results.
+    field_weights = {
+        "title": 4.0,
+        "tags": 3.0,
+        "toc": 2.0,
+        "description": 1.0
+    }
+
+    # How much each kind of word match counts towards the rank of a video;
+    # typo matches are only tried for query words at least this long.
+    exact_weight = 1.0
+    prefix_weight = 0.75
+    fuzzy_weight = 0.5
+    fuzzy_min_length = 4
+
+    def __init__(self, videos=None, toc=None):
+        # A callable that takes a video and returns its table of contents as
+        # a list of (timecode, text) tuples; when not given, table of contents
+        # entries are not indexed separately.
+        self._toc = toc
+
+        # Keys are words, values are a dictionary whose keys are video ID's
+        # and whose values are the weight of that word in that video.
+        self._postings = {}
+
+        # The words in the index, in sorted order, for prefix lookups.
+        self._sorted = []
+
+        # Keys are the words in the index with one character deleted, values
+        # are the set of words that produce that key; used to find words
+        # that are a single edit away from a query word.
+        self._deletes = {}
+
+        # Keys are video ID's, values are the video itself and the words the
+        # video was indexed under.
+        self._videos = {}
+        self._video_words = {}
+
+        for video in videos or []:
+            self.add(video)
+
+    def __len__(self):
+        return len(self._videos)
+
+    def __contains__(self, video_id):
+        return video_id in self._videos
+
+    def add(self, video):
+        """
+        Add the given video to the index; if the video is already in the index,
+        it is re-indexed to reflect its current content instead.
+        """
+        video_id = video['id']
+        if video_id in self._videos:
+            self.remove(video_id)
+
+        weights = {}
+        for field, text in self._fields(video):
+            weight = self.field_weights[field]
+            for word in _tokenize(text):
+                weights[word] = weights.get(word, 0.0) + weight
+
+        self._videos[video_id] = video
+        self._video_words[video_id] = tuple(weights)
+
+        for word, weight in weights.items():
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = {}
+                insort(self._sorted, word)
+                for key in _deletes(word):
+                    self._deletes.setdefault(key, set()).add(word)
+
+            postings[video_id] = weight
+
+    def remove(self, video_id):
+        """
+        Remove the video with the given ID from the index, if it's present.
+        """
+        self._videos.pop(video_id, None)
+        for word in self._video_words.pop(video_id, ()):
+            postings = self._postings[word]
+            postings.pop(video_id, None)
+
+            if not postings:
+                del self._postings[word]
+                del self._sorted[bisect_left(self._sorted, word)]
+                for key in _deletes(word):
+                    words = self._deletes[key]
+                    words.discard(word)
+                    if not words:
+                        del self._deletes[key]
+
+    def search(self, query, limit=50):
+        """
+        Search the index for videos matching all of the words in the given
+        query, returning back a list of at most limit videos in rank order.
+        """
+        scores = None
+        for term in _tokenize(query):
+            term_scores = {}
+            for word, weight in self._matches(term):
+                for video_id, field_weight in self._postings[word].items():
+                    score = weight * field_weight
+                    if score > term_scores.get(video_id, 0.0):
+                        term_scores[video_id] = score
+
+            # Every word in the query has to match something in a video for it
+            # to be in the results.
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {vid: scores[vid] + term_scores[vid]
+                          for vid in scores if vid in term_scores}
+
+            if not scores:
+                return []
+
+        if not scores:
+            return []
+
+        ranked = sorted(scores, key=lambda vid: (-scores[vid],
+                        self._videos[vid].get('snippet.title', '')))
+        return [self._videos[vid] for vid in ranked[:limit]]
+
+    def _matches(self, term):
+        """
+        Yield the indexed words that the given query word matches, along with
+        the weight of that match.
+        """
+        if term in self._postings:
+            yield term, self.exact_weight
+
+        idx = bisect_left(self._sorted, term)
+        while idx < len(self._sorted) and self._sorted[idx].startswith(term):
+            if self._sorted[idx] != term:
+                yield self._sorted[idx], self.prefix_weight
+            idx += 1
+
+        if len(term) >= self.fuzzy_min_length:
+            candidates = set(self._deletes.get(term, ()))
+            for key in _deletes(term):
+                candidates.update(self._deletes.get(key, ()))
+                if key in self._postings:
+                    candidates.add(key)
+
+            for word in candidates:
+                if word != term and not word.startswith(term):
+                    yield word, self.fuzzy_weight
+
+    def _fields(self, video):
+        """
+        Yield the searchable text of the given video, along with the name of
+        the field that it came from.
+        """
+        yield "title", video.get('snippet.title', '')
+        yield "description", video.get('snippet.description', '')
+        yield "tags", " ".join(video.get('snippet.tags', []))
+
+        if self._toc is not None:
+            yield "toc", " ".join(entry[1] for entry in self._toc(video))
+
+
+###----------------------------------------------------------------------------
+
+
+def _tokenize(text):
+    """
+    Split the given text into the list of lower case words that it contains,
+    for indexing and searching.
+    """
+    return _word_regex.findall(text.lower())
+
+
+def _deletes(word):
+    """
+    Return back all of the variations of the given word that have a single
+    character deleted; two words are at most one edit apart when one of them
+    is a variation of the other or they share a variation.
+    """
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+# A regex that matches a single word for the purposes of the search index.
+_word_regex = re.compile(r'\w+')
+
+
+###----------------------------------------------------------------------------
@@ -1,5 +1,7 @@
 import sublime
 
+from collections import deque
+from threading import Lock
 import textwrap
 
 from .utils import yte_setting
@@ -8,6 +10,25 @@ from .utils import yte_setting
 ###----------------------------------------------------------------------------
 
 
+# The name of the output panel that log messages are displayed in.
+_LOG_PANEL = "YouTubeEditor Log"
+
+# How many of the most recent lines of the log are kept in memory; this is
+# what new windows are given in their log panel.
+_LOG_BUFFER_LINES = 2000
+
+# When the log panel in a window grows past this many lines, it's replaced
+# with the lines in the log buffer so that it doesn't grow forever.
+_LOG_PANEL_MAX_LINES = 2 * _LOG_BUFFER_LINES
+
+# How long in milliseconds log lines are gathered up before they're appended
+# to the log panels, so that a burst of log messages is one append per window.
+_LOG_FLUSH_DELAY = 100
+
+
+###----------------------------------------------------------------------------
+
+
 def log(msg, *args, dialog=False, error=False, panel=True, display=False, **kwargs):
     """
     Generate a log message to the console, and then also optionally to a dialog
@@ -19,6 +40,10 @@ def log(msg, *args, dialog=False, error=False, panel=True, display=False, **kwar
     Setting display to true will cause the output panel to open, but only when
     panel is also set; this allows the code to display informational messages
     to the panel and only display it when they might require user attention.
+
+    Messages sent to the panel are buffered and appended to the panels in all
+    windows in batches shortly afterwards, so this is safe to call often and
+    from any thread.
     """
     msg = textwrap.dedent(msg.format(*args, **kwargs)).strip()
 
@@ -38,16 +63,75 @@ def log(msg, *args, dialog=False, error=False, panel=True, display=False, **kwar
         sublime.message_dialog(msg)
 
     if panel:
-        # Output to the panel in all windows
-        for window in sublime.windows():
-            view = window.find_output_panel("YouTubeEditor Log")
+        state = log.state
+        with state["lock"]:
+            lines = msg.splitlines() or [""]
+            state["buffer"].extend(lines)
+            state["pending"].extend(lines)
+            state["display"] = state["display"] or display
+
+            if not state["scheduled"]:
+                state["scheduled"] = True
+                sublime.set_timeout(flush_log, _LOG_FLUSH_DELAY)
+
+log.state = {
+    "lock": Lock(),
+    "buffer": deque(maxlen=_LOG_BUFFER_LINES),
+    "pending": [],
+    "display": False,
+    "scheduled": False
+}
+
+
+def flush_log():
+    """
+    Append all of the log lines that have been logged since the last flush to
+    the log panel in all windows, displaying the panel if any of them asked
+    for it. Panels that have grown too large are replaced with the tail of the
+    log instead.
+    """
+    state = log.state
+    with state["lock"]:
+        text = "".join(line + "\n" for line in state["pending"])
+        count = len(state["pending"])
+        display = state["display"]
+
+        state["pending"] = []
+        state["display"] = False
+        state["scheduled"] = False
+
+    if not text:
+        return
+
+    for window in sublime.windows():
+        view = window.find_output_panel(_LOG_PANEL)
+        if view is None:
+            continue
+
+        if view.rowcol(view.size())[0] + count > _LOG_PANEL_MAX_LINES:
+            setup_log_panel(window, history=True)
+        else:
             view.run_command("append", {
-                "characters": msg + "\n",
+                "characters": text,
                 "force": True,
                 "scroll_to_end": True})
 
-        if display:
-            display_output_panel()
+    if display:
+        display_output_panel()
+
+
+def clear_log():
+    """
+    Throw away all of the lines in the log, including any that have not been
+    displayed yet, and empty out the log panel in all windows.
+    """
+    state = log.state
+    with state["lock"]:
+        state["buffer"].clear()
+        state["pending"] = []
+
+    for window in sublime.windows():
+        setup_log_panel(window)
 
 
 ###----------------------------------------------------------------------------
@@ -72,25 +156,31 @@ def copy_video_link(link_url, title=None):
 ###----------------------------------------------------------------------------
 
 
-def setup_log_panel(window, src_window=None):
+def setup_log_panel(window, history=False):
     """
-    Set up an output panel for logging into the provided window. When a source
-    window is provided, the content of the panel in that window will be copied
-    into the newly created panel to syncrhonize them.
+    Set up an output panel for logging into the provided window. When history
+    is set, the panel starts out with the most recent lines of the log that
+    have already been displayed in other windows.
     """
-    view = window.create_output_panel("YouTubeEditor Log")
+    view = window.create_output_panel(_LOG_PANEL)
     view.set_read_only(True)
     view.settings().set("gutter", False)
     view.settings().set("rulers", [])
     view.settings().set("word_wrap", False)
     view.settings().set("context_menu", "YouTubeLog.sublime-menu")
 
-    if src_window:
-        src_view = src_window.find_output_panel("YouTubeEditor Log")
-        if src_view:
-            text = src_view.substr(sublime.Region(0, len(src_view)))
+    if history:
+        # Lines that are still pending will be appended at the next flush, so
+        # they're not part of the history yet.
+        state = log.state
+        with state["lock"]:
+            lines = list(state["buffer"])
+            if state["pending"]:
+                del lines[-len(state["pending"]):]
+
+        if lines:
             view.run_command("append", {
-                "characters": text,
+                "characters": "".join(line + "\n" for line in lines),
                 "force": True,
                 "scroll_to_end": True
             })
@@ -105,7 +195,7 @@ def display_output_panel():
     that the panel is desired.
     """
     window = sublime.active_window()
-    if window.active_panel() == 'output.YouTubeEditor Log':
+    if window.active_panel() == 'output.' + _LOG_PANEL:
         return
 
     # True for always, False for Never, number for Always (but autoclose);
@@ -116,7 +206,7 @@ def display_output_panel():
         return
 
     # Show the panel, and if desired autoclose it.
-    window.run_command("show_panel", {"panel": "output.YouTubeEditor Log"})
+    window.run_command("show_panel", {"panel": "output." + _LOG_PANEL})
     if isinstance(show_panel, bool) == False and isinstance(show_panel, int):
         close_panel_after_delay(window, show_panel * 1000)
 
@@ -1,10 +1,12 @@
 from .logging import log
 from .networking import NetworkThread, stored_credentials_path
+from .handoff import expect_hand_off
 
 from threading import Event, Lock
 import queue
 
 import os
+import time
 
 
 ###----------------------------------------------------------------------------
@@ -41,11 +43,18 @@ class NetworkManager():
         Shut down the networking system; this shuts down any background threads
         that may be running. This should be called from plugin_unloaded() to do
         cleanup before we go away.
+
+        On the way out the thread hands off its state to the thread of the next
+        generation of the modules, in case this is a reload. The thread only
+        stops once any request it's in the middle of is finished, so rather
+        than waiting for that here, the hand off is marked as expected; the
+        thread of the next generation waits for it when it starts.
         """
         if self.net_thread.is_alive():
             log("PKG: Terminating YouTube thread")
+            expect_hand_off("network", self.net_thread)
             self.thr_event.set()
-            self.net_thread.join(0.25)
+            self.net_thread.join(1.0)
 
     def has_credentials(self):
         """
@@ -95,9 +104,23 @@ class NetworkManager():
 
         self.request_queue.put({
             "request": request,
-            "callback": lambda s, r: self.callback(request, callback, s, r)
+            "callback": lambda s, r: self.callback(request, callback, s, r),
+            "queued": time.time()
         })
 
+    def latency_report(self):
+        """
+        Return back a list of lines that break down how long recent requests
+        took to handle, by request type and by the parts of handling them.
+        """
+        return self.net_thread.traces.latency_report()
+
+    def export_traces(self, filename):
+        """
+        Write the traces of recent requests to the given file as JSON lines.
+        """
+        self.net_thread.traces.export(filename)
+
 
 
 ###----------------------------------------------------------------------------
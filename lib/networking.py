@@ -3,26 +3,32 @@ import sublime
 from .logging import log
 from .request import Request
 from . import dotty
-from .utils import yte_setting, BusySpinner
-
-from threading import Thread
+from .utils import yte_setting, BusySpinner, get_table_of_contents, clone_data
+from .utils import cache_table_of_contents
+from .utils import bump_cache_generation
+from .indexes import TagIndex, SearchIndex
+from .stats import VideoStats
+from .query import compile_query
+from .bulk import UpdateQueue, UpdatesHalted
+from .tracing import Trace, TraceStore, begin_trace, end_trace
+from .tracing import trace_span, trace_event
+from .handoff import hand_off, hand_off_pending, take_over
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from threading import Thread, local
 import queue
 
 import os
 import json
+import time
+import calendar
+import datetime
 import traceback
 
-# A compatible version of this is available in hashlib in more recent builds of
-# Python, but it takes keyword only arguments. You can swap to that one by
-# modifying the call site as appropriate.
-from pyscrypt import hash as scrypt
-import pyaes
-
-import google.oauth2.credentials
-import google_auth_oauthlib.flow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-from google_auth_oauthlib.flow import InstalledAppFlow
+# The Google API client libraries and the encryption libraries take a long time
+# to import, which would slow down the loading of the plugin; they are instead
+# imported by the functions that use them, the first time that they are needed
+# (which is in the network thread).
 
 # TODO: Fields in request results (for example 'tags') don't seem to be
 #       mandatory, so we should probably be smarter about that.
@@ -41,9 +47,10 @@ API_VERSION = 'v3'
 # The PBKDF Salt value; it needs to be in bytes.
 _PBKDF_Salt = "YouTubeEditorSaltValue".encode()
 
-# The encoded password; later the user will be prompted for this on the fly,
-# but for expediency in testing the password is currently hard coded.
-_PBKDF_Key = scrypt("password".encode(), _PBKDF_Salt, 1024, 1, 1, 32)
+# The encoded password is derived from this; later the user will be prompted
+# for this on the fly, but for expediency in testing the password is currently
+# hard coded. See _pbkdf_key().
+_PBKDF_Password = "password".encode()
 
 # When using the set_video_details request, new video details need to be
 # provided for the update. The request itself allows you to provide a full
@@ -85,6 +92,35 @@ _set_video_keys = {
 }
 
 
+# The version of the layout of the request cache; this needs to be bumped
+# whenever the structure of the cache changes in an incompatible way, so that
+# data that was cached by an older version is not used.
+_CACHE_VERSION = 2
+
+# The version of the layout of the state that the network thread hands off to
+# the next generation of the package's modules when the plugin is reloaded;
+# this needs to be bumped whenever what is handed off changes, so that state
+# handed off by an older version of the thread is not used.
+_HANDOFF_VERSION = 1
+
+# The parts of the video details that are fetched when obtaining the contents
+# of a playlist and when obtaining the full details of videos, respectively.
+_PLAYLIST_VIDEO_PARTS = "id,snippet,status,statistics"
+_FULL_VIDEO_PARTS = "snippet,contentDetails,status,statistics"
+
+# Access tokens last for an hour; while the thread is idle, a token that will
+# expire within this many seconds is refreshed, so that the next request does
+# not have to wait for it to be refreshed. If refreshing fails, it's tried
+# again after the second number of seconds.
+_TOKEN_REFRESH_MARGIN = 300
+_TOKEN_REFRESH_RETRY = 60
+
+# The reasons that YouTube gives in an error response when an update could not
+# be made because of the API quota or rate limits; bulk updates stop when they
+# see one of these, since every update after it would fail the same way.
+_HALT_REASONS = {"quotaExceeded", "rateLimitExceeded", "userRateLimitExceeded"}
+
+
 ###----------------------------------------------------------------------------
 
 
@@ -103,6 +139,24 @@ class DottyEncoder(json.JSONEncoder):
 ###----------------------------------------------------------------------------
 
 
+def _pbkdf_key():
+    """
+    Return back the key used to encrypt the cached data and credentials.
+    Deriving the key from the password takes some time, so it's only done the
+    first time the key is needed.
+    """
+    if _pbkdf_key.key is None:
+        # A compatible version of this is available in hashlib in more recent
+        # builds of Python, but it takes keyword only arguments. You can swap
+        # to that one by modifying the call site as appropriate.
+        from pyscrypt import hash as scrypt
+        _pbkdf_key.key = scrypt(_PBKDF_Password, _PBKDF_Salt, 1024, 1, 1, 32)
+
+    return _pbkdf_key.key
+
+_pbkdf_key.key = None
+
+
 def filter_new_video_details(details):
     """
     Given a video data dictionary as might be provided by a request for video
@@ -130,6 +184,38 @@ def filter_new_video_details(details):
     return new_details
 
 
+def changed_video_parts(old_details, new_details):
+    """
+    Given the details of a video as YouTube currently has them and a version
+    of those details that has been edited, return back a sorted list of the
+    parts (such as snippet or status) whose updatable fields differ between
+    the two. Only those parts need to be sent in a set_video_details request,
+    and if the list is empty there is nothing to update at all.
+
+    Fields that are missing and fields that are empty are considered to be the
+    same, since YouTube leaves empty fields out of the data it returns.
+    """
+    def normalize(value):
+        if isinstance(value, dict):
+            return {k: v for k, v in value.items() if v not in ("", [], {}, None)}
+        return value
+
+    old = filter_new_video_details(clone_data(old_details))
+    new = filter_new_video_details(clone_data(new_details))
+
+    return sorted(part for part in set(old) | set(new) if part != "id" and
+                  normalize(old.get(part)) != normalize(new.get(part)))
+
+
+def _split_parts(part):
+    """
+    Given a part string as used in a video request, return back a set of the
+    distinct parts that it contains. The id part is always returned in video
+    details, so it is not included.
+    """
+    return {p.strip() for p in part.split(",") if p.strip() not in ("", "id")}
+
+
 ###----------------------------------------------------------------------------
 
 
@@ -178,6 +264,21 @@ def stored_cache_path():
     return stored_cache_path.path
 
 
+def stored_update_queue_path():
+    """
+    Obtain the path of the file that holds the video updates that have not
+    been sent to YouTube yet, which is stored in the Cache folder of the
+    User's configuration information.
+    """
+    if hasattr(stored_update_queue_path, "path"):
+        return stored_update_queue_path.path
+
+    path = os.path.join(sublime.cache_path(), "YouTubeEditorUpdateQueue.json")
+    stored_update_queue_path.path = os.path.normpath(path)
+
+    return stored_update_queue_path.path
+
+
 def load_cached_request_data():
     """
     Decrypt and return back a dict that represents saved cache data from a
@@ -195,7 +296,8 @@ def load_cached_request_data():
                 raw_data = handle.read()
 
                 if yte_setting('encrypt_cache'):
-                    aes = pyaes.AESModeOfOperationCTR(_PBKDF_Key)
+                    import pyaes
+                    aes = pyaes.AESModeOfOperationCTR(_pbkdf_key())
                     cache_data = aes.decrypt(raw_data).decode("utf-8")
                 else:
                     cache_data = raw_data.decode("utf-8")
@@ -215,11 +317,12 @@ def save_cached_request_data(cache_data):
         return
 
     # Encrypt the cache data using our key and write it out as bytes.
-    with BusySpinner('Updating data cache', time=True):
+    with BusySpinner('Updating data cache', time=True), trace_span("cache persist"):
         json_data = json.dumps(cache_data, cls=DottyEncoder)
 
         if yte_setting('encrypt_cache'):
-            aes = pyaes.AESModeOfOperationCTR(_PBKDF_Key)
+            import pyaes
+            aes = pyaes.AESModeOfOperationCTR(_pbkdf_key())
             cache_data = aes.encrypt(json_data)
         else:
             cache_data = json_data.encode("utf-8")
@@ -236,11 +339,17 @@ def cache_credentials(credentials):
     cache_data = {
         "token": credentials.token,
         "refresh_token": credentials.refresh_token,
-        "id_token": credentials.id_token
+        "id_token": credentials.id_token,
+
+        # The time the token expires, as a UTC timestamp.
+        "expiry": (None if credentials.expiry is None else
+                   calendar.timegm(credentials.expiry.utctimetuple()))
     }
 
+    import pyaes
+
     # Encrypt the cache data using our key and write it out as bytes.
-    aes = pyaes.AESModeOfOperationCTR(_PBKDF_Key)
+    aes = pyaes.AESModeOfOperationCTR(_pbkdf_key())
     cache_data = aes.encrypt(json.dumps(cache_data))
 
     with open(stored_credentials_path(), "wb") as handle:
@@ -253,10 +362,13 @@ def get_cached_credentials():
     None if there is currently no cached credentials. This will currently
     raise an exception if the file is broken (so don't break it).
     """
+    import pyaes
+    import google.oauth2.credentials
+
     try:
         # Decrypt the data with the key and convert it back to JSON.
         with open(stored_credentials_path(), "rb") as handle:
-            aes = pyaes.AESModeOfOperationCTR(_PBKDF_Key)
+            aes = pyaes.AESModeOfOperationCTR(_pbkdf_key())
             cache_data = aes.decrypt(handle.read()).decode("utf-8")
 
             cached = json.loads(cache_data)
@@ -264,6 +376,13 @@ def get_cached_credentials():
     except FileNotFoundError:
         return None
 
+    # Credentials cached by older versions don't know when the token expires;
+    # the credentials expect the expiry as a naive UTC time.
+    expiry = cached.get("expiry")
+    if expiry is not None:
+        expiry = datetime.datetime.fromtimestamp(
+            expiry, datetime.timezone.utc).replace(tzinfo=None)
+
     client_config = app_client_config()
     return google.oauth2.credentials.Credentials(
         cached["token"],
@@ -272,24 +391,53 @@ def get_cached_credentials():
         client_config["installed"]["token_uri"],
         client_config["installed"]["client_id"],
         client_config["installed"]["client_secret"],
-        SCOPES
+        SCOPES,
+        expiry=expiry
     )
 
 
-# Authorize the request and store authorization credentials.
-def get_authenticated_service():
+def refresh_credentials(credentials):
     """
-    This builds the appropriate endpoint object to talk to the YouTube data
-    API, using a combination of the client secrets file and either cached
-    credentials or asking the user to log in first.
+    Given a credentials object, use its refresh token to obtain a new access
+    token, and cache the refreshed credentials.
+    """
+    import google_auth_httplib2
+    import httplib2
 
-    If there is no cached credentials, or if they are not valid, then the user
-    is asked to log in again before this returns.
+    credentials.refresh(google_auth_httplib2.Request(httplib2.Http()))
+    cache_credentials(credentials)
 
-    The result is an object that can be used to make requests to the API.
-    This fetches the authenticated service for use
+
+def token_lifetime(credentials):
+    """
+    Given a credentials object, return back how many seconds are left before
+    its access token expires, or None if that is not known.
+    """
+    if credentials is None or credentials.expiry is None:
+        return None
+
+    return calendar.timegm(credentials.expiry.utctimetuple()) - time.time()
+
+
+def get_authenticated_credentials():
     """
+    Obtain the credentials to use to talk to the YouTube data API, using a
+    combination of the client secrets file and either cached credentials or
+    asking the user to log in first.
+
+    If the cached credentials have expired, they're refreshed. If there are no
+    cached credentials, or if they can't be refreshed, then the user is asked
+    to log in again before this returns.
+    """
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
     credentials = get_cached_credentials()
+    if credentials is not None and not credentials.valid and credentials.refresh_token:
+        try:
+            refresh_credentials(credentials)
+        except Exception as err:
+            log("THR: Unable to refresh the access token: {0}", err)
+
     if credentials is None or not credentials.valid:
         # TODO: This can raise exceptions, AccessDeniedError
         flow = InstalledAppFlow.from_client_config(app_client_config(), SCOPES)
@@ -299,6 +447,31 @@ def get_authenticated_service():
 
         cache_credentials(credentials)
 
+    return credentials
+
+
+# Authorize the request and store authorization credentials.
+def get_authenticated_service(credentials=None):
+    """
+    This builds the appropriate endpoint object to talk to the YouTube data
+    API, using the credentials provided or, if there are none, the credentials
+    from get_authenticated_credentials().
+
+    The result is an object that can be used to make requests to the API.
+    This fetches the authenticated service for use
+
+    When the api_endpoint setting is set, the service instead talks to the
+    stand in API at that endpoint without authenticating.
+    """
+    from googleapiclient.discovery import build
+    import httplib2
+
+    endpoint = yte_setting("api_endpoint")
+    if endpoint:
+        return build(API_SERVICE_NAME, API_VERSION, http=httplib2.Http(),
+                     client_options={"api_endpoint": endpoint.rstrip("/") + "/"})
+
+    credentials = credentials or get_authenticated_credentials()
     return build(API_SERVICE_NAME, API_VERSION, credentials=credentials)
 
 
@@ -318,6 +491,7 @@ class NetworkThread(Thread):
         self.event = event
         self.requests = queue
         self.youtube = None
+        self.credentials = None
 
         # Set up the cache data structure when the thread launches, since the
         # load of the cached data can actually take a fair bit of time and we
@@ -325,6 +499,46 @@ class NetworkThread(Thread):
         # thread.
         self.cache = None
 
+        # The tag indexes for the videos in playlists whose tags have been
+        # browsed; this is keyed on playlist ID's and is kept up to date as
+        # videos enter and leave the cache. These are not saved with the cache
+        # and are created the first time each one is needed.
+        self.tag_indexes = {}
+
+        # The full text search index over all of the videos in the video store;
+        # like the tag indexes this is not saved with the cache, and is created
+        # the first time a search is done.
+        self.search_index = None
+
+        # The column store of the statistics of all of the videos in the video
+        # store, used to filter and sort them; like the search index this is
+        # not saved with the cache, and is created the first time it's used.
+        self.video_stats = None
+
+        # The video updates that are waiting to be sent to YouTube. All
+        # updates are queued here first, and any that could not be sent are
+        # sent in the background later; the queue is saved to disk so that
+        # they survive a restart. The queue is loaded when the thread starts.
+        self.update_queue = None
+        self.update_retry_time = 0
+
+        # When refreshing the access token in the background last failed, the
+        # time at which it can be tried again.
+        self.token_retry_time = 0
+
+        # The HTTP objects used by requests that are made from threads other
+        # than this one (such as the workers that send updates or fetch the
+        # contents of channels); see _thread_http().
+        self.thread_http = local()
+
+        # The traces of the most recently handled requests, which record how
+        # long each part of handling them took.
+        self.traces = TraceStore()
+
+        # The status bar spinner for the request currently being handled (or
+        # the updates being sent in the background), used to show progress.
+        self.spinner = None
+
         # The requests that we know how to service, and what method invokes
         # them.
         self.request_map = {
@@ -333,10 +547,14 @@ class NetworkThread(Thread):
             "flush_cache": self.flush_cache,
             "channel_details": self.channel_details,
             "channel_list": self.channel_list,
+            "channel_contents": self.channel_contents,
             "playlist_contents": self.playlist_contents,
             "playlist_list": self.playlist_list,
+            "playlist_tags": self.playlist_tags,
             "video_details": self.video_details,
-            "set_video_details": self.set_video_details
+            "search_videos": self.search_videos,
+            "set_video_details": self.set_video_details,
+            "bulk_update": self.bulk_update
         }
 
     # def __del__(self):
@@ -351,7 +569,11 @@ class NetworkThread(Thread):
         # during this session; requests that ask for data already in the cache
         # will retreive that data immediately with no further requests being
         # made unless they request a refresh.
-        self.cache = load_cached_request_data() or dotty.dotty({
+        defaults = {
+            # The version of the layout of this structure; cache data that was
+            # saved with a different version is discarded on load.
+            "version": _CACHE_VERSION,
+
             # The information on fetched channel information; this is a list of
             # all channels associated with the currently authenticated user.
             "channel_list": [],
@@ -367,58 +589,395 @@ class NetworkThread(Thread):
             "playlist_list": dotty.dotty({}),
 
             # The information on the contents of fetched playlists; this object
-            # is keyed on playlist ID's, with the value being a list of the
-            # playlist contents.
+            # is keyed on playlist ID's, with the value being the list of video
+            # ID's that were in that playlist the last time its contents were
+            # fetched. The details of the videos are in the video store.
             "playlist_contents": dotty.dotty({}),
 
-            # The information on videos stored in playlists. This object is
-            # keyed on video ID, with the values being the information on that
-            # video. This is only data considered relevant for the purposes of
-            # displaying the playlist (i.e. it is not guaranteed to be full
-            # video details).
-            "playlist_videos": dotty.dotty({}),
+            # The reverse of the above; this object is keyed on video ID's, with
+            # the value being a list of the ID's of all playlists that the video
+            # is known to appear in.
+            "video_playlists": dotty.dotty({}),
+
+            # The video store; this object is keyed on video ID's, with the
+            # value being the details of that particular video. Different
+            # requests ask for different parts of the video information, and
+            # all of the parts fetched for a video are merged together here.
+            "videos": dotty.dotty({}),
+
+            # The parts held for each video in the video store; this object is
+            # keyed on video ID's, with the value being an object whose keys
+            # are the parts that are present for that video and whose values
+            # are the time at which that part was last fetched.
+            "video_parts": dotty.dotty({}),
+
+            # The parsed table of contents of each video in the video store;
+            # this object is keyed on video ID's, with the value being the
+            # hash of the description that the table of contents came from
+            # and the entries that were parsed from it.
+            "video_toc": dotty.dotty({})
+        }
+
+        # Cache data saved by an older version of the package has a different
+        # layout, so throw it away rather than trying to convert it.
+        self.cache = load_cached_request_data()
+        if self.cache is not None and self.cache.get("version") != _CACHE_VERSION:
+            log("THR: Discarding cache data from an older version")
+            self.cache = None
+
+        self.cache = self.cache or dotty.dotty({})
+        for key, value in defaults.items():
+            self.cache.setdefault(key, value)
+
+        self.tag_indexes = {}
+        self.search_index = None
+        self.video_stats = None
 
-            # The information on fetched videos; this object is keys on video
-            # ID's, with the value being the details of that particular video.
-            "video_details": dotty.dotty({})
+        # Only this thread stores tables of contents (other threads only look
+        # them up), so parse any that the loaded cache is missing now.
+        get_table_of_contents.cache = self.cache["video_toc"]
+        for video_id, video in self.cache["videos"].items():
+            if video_id not in self.cache["video_toc"] and "snippet" in video:
+                cache_table_of_contents(video)
+
+        bump_cache_generation()
+
+    def _hand_off(self):
+        """
+        Hand off the cache, the service and the credentials to the network
+        thread of the next generation of the package's modules, so that when
+        the plugin is reloaded (such as when the package is updated) the new
+        thread can pick up where this one left off instead of loading the
+        cache from disk and authorizing again.
+
+        The indexes are not handed off, since their classes are reloaded; the
+        new thread creates them again when they're needed.
+        """
+        version = (_HANDOFF_VERSION, _CACHE_VERSION, dotty.Dotty)
+
+        # The new thread may be waiting for us, so always hand off something.
+        if self.cache is None and self.youtube is None:
+            return hand_off("network", version, None)
+
+        # The version includes the Dotty class, since the cache can only be
+        # used if it's made of instances of the class the new thread uses.
+        hand_off("network", version, {
+            "cache": self.cache,
+            "youtube": self.youtube,
+            "credentials": self.credentials,
+            "api_endpoint": yte_setting("api_endpoint")
         })
+        log("THR: Handed off the data cache and login for the next reload")
+
+    def _take_over(self):
+        """
+        Take over the state handed off by the network thread of the previous
+        generation of the package's modules, if any; see _hand_off(). State
+        from a version of the thread that is not compatible with this one is
+        thrown away, in which case the cache is loaded from disk and the user
+        is authorized again as normal.
+
+        If the previous thread was still busy with a request when the plugin
+        was reloaded, this waits for it to finish and hand off its state; until
+        then it is still using the cache and the update queue, so neither can
+        be loaded from disk here.
+        """
+        if hand_off_pending("network"):
+            log("THR: Waiting for the previous YouTube thread to finish")
+
+        state, version = take_over("network", (_HANDOFF_VERSION, _CACHE_VERSION, dotty.Dotty))
+        if state is None:
+            if version is not None:
+                log("THR: Discarding handed off state from an incompatible version")
+            return
+
+        # The service talks to a different endpoint if the setting changed.
+        if state["api_endpoint"] == yte_setting("api_endpoint"):
+            self.youtube = state["youtube"]
+            self.credentials = state["credentials"]
+
+        if state["cache"] is not None:
+            self.cache = state["cache"]
+            get_table_of_contents.cache = self.cache["video_toc"]
+            bump_cache_generation()
+
+        log("THR: Took over the {0} from the previous reload",
+            "data cache and login" if self.youtube is not None else "data cache")
+
+    def _index_playlist(self, playlist_id, video_ids):
+        """
+        Record that the playlist with the given ID contains the given list of
+        videos, replacing any information that was previously recorded for that
+        playlist.
+        """
+        self._unindex_playlist(playlist_id)
+        bump_cache_generation([("playlist", playlist_id)])
+
+        self.cache["playlist_contents"][playlist_id] = list(video_ids)
+        for video_id in video_ids:
+            playlists = self.cache["video_playlists"].setdefault(video_id, [])
+            if playlist_id not in playlists:
+                playlists.append(playlist_id)
+
+        # If there is a tag index for this playlist, add the videos to it.
+        tag_index = self.tag_indexes.get(playlist_id)
+        if tag_index is not None:
+            videos = self.cache["videos"]
+            for video_id in video_ids:
+                if video_id in videos:
+                    tag_index.add(videos[video_id])
+
+    def _unindex_playlist(self, playlist_id):
+        """
+        Remove the playlist with the given ID from the dependency index, and
+        its videos from the tag index for the playlist, if any. The return
+        value is the list of video ID's that the index said were contained in
+        that playlist, which may be empty.
+        """
+        video_ids = self.cache["playlist_contents"].pop(playlist_id, None) or []
+        tag_index = self.tag_indexes.get(playlist_id)
+        bump_cache_generation([("playlist", playlist_id)])
+
+        for video_id in video_ids:
+            if tag_index is not None:
+                tag_index.remove(video_id)
+
+            playlists = self.cache["video_playlists"].get(video_id, [])
+            if playlist_id in playlists:
+                playlists.remove(playlist_id)
+
+            if not playlists:
+                self.cache["video_playlists"].pop(video_id, None)
+
+        return video_ids
+
+    def _invalidate_playlist(self, playlist_id):
+        """
+        Drop the cached contents of the playlist with the given ID, and expire
+        the playlist related parts of only those videos that the dependency
+        index says appear in it; the contents of all other playlists remain
+        cached.
+        """
+        video_ids = self._unindex_playlist(playlist_id)
+        self._expire_video_parts(video_ids, _split_parts(_PLAYLIST_VIDEO_PARTS))
+
+        log("API: Expired {0} cached video(s) for playlist {1}",
+            len(video_ids), playlist_id)
+
+    def _video_has_parts(self, video_id, parts):
+        """
+        Check to see if the video store holds all of the given parts for the
+        video with the provided ID.
+        """
+        held = self.cache["video_parts"].get(video_id)
+        return held is not None and all(part in held for part in parts)
+
+    def _expire_video_parts(self, video_ids, parts):
+        """
+        Mark the given parts of all of the given videos as no longer being
+        held, so that the next request that needs them will fetch them again.
+        The video details themselves are left in place until that happens.
+        """
+        for video_id in video_ids:
+            held = self.cache["video_parts"].get(video_id)
+            if held is not None:
+                for part in parts:
+                    held.pop(part, None)
+
+    def _store_video(self, details, parts):
+        """
+        Merge the given video details into the video store. The parts are the
+        parts that were asked for when the details were obtained; the details
+        for those parts replace any that are already held for the video, in
+        place, and all other parts are left untouched.
+
+        The return value is the video as it appears in the store.
+        """
+        video_id = details['id']
+        fetched = time.time()
+
+        # Only what is derived from the playlists the video is in is affected;
+        # a playlist that it's added to is bumped when it's indexed.
+        bump_cache_generation([("playlist", playlist_id) for playlist_id
+                               in self.cache["video_playlists"].get(video_id, [])])
+
+        video = self.cache["videos"].get(video_id)
+        if video is None:
+            video = dotty.dotty({"id": video_id})
+            self.cache["videos"][video_id] = video
+
+        held = self.cache["video_parts"].setdefault(video_id, dotty.dotty({}))
+        for part in parts:
+            # A part can be missing from the response if there is nothing in
+            # it, in which case any previous value is no longer valid.
+            if part in details:
+                video[part] = details[part]
+            else:
+                video.pop(part, None)
+
+            held[part] = fetched
+
+        # When the snippet changes the description and tags might have as
+        # well, so update the table of contents, the tag indexes of all of the
+        # playlists the video is in, and the search index. The etag is kept so
+        # that cached thumbnails can tell when the video has changed.
+        if "snippet" in parts:
+            if "etag" in details:
+                video["etag"] = details["etag"]
+
+            cache_table_of_contents(video)
+
+            for playlist_id in self.cache["video_playlists"].get(video_id, []):
+                tag_index = self.tag_indexes.get(playlist_id)
+                if tag_index is not None:
+                    tag_index.update(video)
+
+            if self.search_index is not None:
+                self.search_index.add(video)
+
+        if self.video_stats is not None:
+            self.video_stats.add(video)
+
+        return video
+
+    def _progress(self, done, total=None, what=None):
+        """
+        Report how far along the current request is in the status bar; see
+        BusySpinner.progress().
+        """
+        if self.spinner is not None:
+            self.spinner.progress(done, total, what)
 
-    def _fetch_video_details(self, video_ids, part, cache_data):
+    def _thread_http(self):
         """
-        Fetch video details for the video(s) provided, and update the given
-        cache_data with the results. cache_data is a dictionary whose keys are
-        video ids and whose values are the details for those videos. In use
-        any videos submitted for lookup that appear in the cache already will
-        be skipped, and any that are looked up will be added to the cache.
+        Return back the HTTP object to use for requests made from the calling
+        thread. The HTTP object of the service is not safe to share between
+        threads, so requests made from any thread other than this one need to
+        pass the object returned here to execute(); each thread gets its own,
+        using our credentials.
+        """
+        if not hasattr(self.thread_http, "http"):
+            import google_auth_httplib2
+            import httplib2
+
+            self.thread_http.http = httplib2.Http()
+            if self.credentials is not None:
+                self.thread_http.http = google_auth_httplib2.AuthorizedHttp(
+                    self.credentials, http=self.thread_http.http)
+
+        return self.thread_http.http
+
+    def _fetch_pages(self, collection, http=None, **kwargs):
+        """
+        Execute a paged list request on the given collection of the service
+        (such as self.youtube.playlists()) with the given arguments, going
+        through the pages until all of the results are captured; the return
+        value is a list of all of the items, as dotty dictionaries.
+
+        When given, http is the HTTP object to execute the requests with; see
+        _thread_http().
+        """
+        results = []
+        list_request = collection.list(maxResults=50, **kwargs)
+        while list_request:
+            response = list_request.execute(http=http)
+            results.extend(dotty.dotty(item) for item in response['items'])
+            list_request = collection.list_next(list_request, response)
+
+        return results
+
+    def _missing_video_parts(self, video_ids, parts):
+        """
+        Given a list of video ID's and the parts of the videos that are
+        needed, return back a list of the ID's of the videos that the video
+        store doesn't hold all of those parts for, and the set of the parts
+        that at least one of them doesn't have.
+        """
+        missing_ids = [vid for vid in video_ids if not self._video_has_parts(vid, parts)]
+
+        needed = set()
+        for vid in missing_ids:
+            held = self.cache["video_parts"].get(vid) or {}
+            needed.update(p for p in parts if p not in held)
 
-        The provided video_ids can be either a single string video ID or a list
-        of ID's to look up. The given part is used to determine what
-        information gets looked up
+        return missing_ids, needed
+
+    def _fetch_video_details(self, video_ids, part):
+        """
+        Fetch video details for the video(s) provided, merging the results into
+        the video store. Any videos submitted for lookup for which the store
+        already holds all of the requested parts will be skipped, and only the
+        parts that are not already held are looked up for the rest.
+
+        The provided video_ids is a list of ID's to look up. The given part is
+        used to determine what information gets looked up, and is a comma
+        separated list of parts as the API expects.
 
         The returned value is a list of video details for each given video
         ID.
         """
-        missing_ids = [vid for vid in video_ids if vid not in cache_data]
+        missing_ids, needed = self._missing_video_parts(video_ids, _split_parts(part))
 
         log("API: Fetching video details ({0} cached, fetching {1} of {2})",
             len(video_ids) - len(missing_ids), len(missing_ids), len(video_ids));
+        trace_event("video cache", hits=len(video_ids) - len(missing_ids),
+                    misses=len(missing_ids))
+
+        part = ",".join(["id"] + sorted(needed))
 
         # This request seems to top out at 50 requested items, so chunk the list
         # so we can batch it, since it doesn't support native paging (since it
         # is not a traditional list query, one assumes).
         id_list = [missing_ids[i * 50:(i + 1) * 50] for i in range((len(missing_ids) + 50 - 1) // 50 )]
 
-        for sublist in id_list:
-            response = self.youtube.videos().list(
-                id=sublist,
-                part=part
-                ).execute()
+        for index, sublist in enumerate(id_list):
+            with trace_span("api chunk", items=len(sublist)):
+                response = self.youtube.videos().list(
+                    id=sublist,
+                    part=part
+                    ).execute()
 
             for v in response["items"]:
-                video = dotty.dotty(v)
-                cache_data[v['id']] = video
+                self._store_video(v, needed)
+
+            self._progress(min((index + 1) * 50, len(missing_ids)), len(missing_ids),
+                           "fetching video details")
+
+        videos = self.cache["videos"]
+        return [videos[vid] for vid in video_ids if vid in videos]
+
+    def _query_videos(self, request, video_ids, tag_index=None):
+        """
+        Given a request and a list of video ID's, return back the videos from
+        the video store with those ID's that pass the filters and the query in
+        the request, in the sort order and up to the limit given in the
+        request. If the request has none of these, the videos are returned in
+        the same order as the ID's.
+
+        Filters are lists of (column, operator, value) lists and the order is
+        a list of column names; see VideoStats for details. The query is the
+        text of a query as described in VideoQuery; when a tag index for the
+        videos is given, it's used for any tags in the query.
+        """
+        if not (request["filters"] or request["order"] or request["limit"] or
+                request["query"]):
+            videos = self.cache["videos"]
+            return [videos[vid] for vid in video_ids if vid in videos]
+
+        if self.video_stats is None:
+            self.video_stats = VideoStats(self.cache["videos"].values())
+
+        if request["query"]:
+            query = compile_query(request["query"])
+            if request["filters"]:
+                video_ids = [v['id'] for v in self.video_stats.query(
+                             request["filters"], None, None, video_ids)]
+
+            return query.run(self.video_stats, video_ids, request["order"],
+                             request["limit"], tag_index)
 
-        return [cache_data[vid] for vid in video_ids]
+        return self.video_stats.query(request["filters"], request["order"],
+                                      request["limit"], video_ids)
 
 
     def validate(self, request, required=None, any_of=None):
@@ -451,7 +1010,19 @@ class NetworkThread(Thread):
         or on user request.
         """
         log("THR: Requesting authorization")
-        self.youtube = get_authenticated_service()
+
+        # The service handed off from before a reload can be used as is.
+        if self.youtube is not None and (self.credentials is None or
+                                         self.credentials.valid):
+            return "Authenticated"
+
+        if yte_setting("api_endpoint"):
+            log("THR: Using the stand in API at {0}", yte_setting("api_endpoint"))
+            self.credentials = None
+        else:
+            self.credentials = get_authenticated_credentials()
+
+        self.youtube = get_authenticated_service(self.credentials)
         return "Authenticated"
 
     def deauthenticate(self, request):
@@ -463,6 +1034,7 @@ class NetworkThread(Thread):
         log("THR: Removing stored login credentials")
         try:
             self.youtube = None
+            self.credentials = None
 
             os.remove(stored_credentials_path())
             os.remove(stored_cache_path())
@@ -522,8 +1094,11 @@ class NetworkThread(Thread):
                 log("API: Dropping channel detail cache")
                 self.cache["channel_list"] = []
             else:
+                trace_event("cache hit")
                 return self.cache["channel_list"]
 
+        trace_event("cache miss")
+
         # Request breakdown is as follows. Note that snippet and
         # brandingSettings have overlap between them, but each has information
         # that the other does not.
@@ -534,10 +1109,11 @@ class NetworkThread(Thread):
         # contentDetails:   uploaded and liked video playlist ID's
         # statistics:       channel views, video counts, etc
         # status            privacy status, upload abilities, etc
-        response = self.youtube.channels().list(
-            mine=True,
-            part='id,snippet,brandingSettings,contentDetails,statistics,status'
-        ).execute()
+        with trace_span("api call"):
+            response = self.youtube.channels().list(
+                mine=True,
+                part='id,snippet,brandingSettings,contentDetails,statistics,status'
+            ).execute()
 
         if "items" not in response or not response["items"]:
             raise KeyError("No channels available for the current user")
@@ -570,8 +1146,11 @@ class NetworkThread(Thread):
                 log("API: Dropping playlists for channel from cache: {0}", channel_id)
                 del self.cache["playlist_list"][channel_id]
             else:
+                trace_event("cache hit")
                 return self.cache["playlist_list"][channel_id]
 
+        trace_event("cache miss")
+
         # Request breakdown is as follows.
         #
         # id:              the unique playlist ID
@@ -589,13 +1168,17 @@ class NetworkThread(Thread):
         # this piecemeal if needed.
         results = []
         while list_request:
-            response = list_request.execute()
+            with trace_span("api page"):
+                response = list_request.execute()
 
             # Grab information about each playlist.
             for playlist in response['items']:
                 results.append(dotty.dotty(playlist))
 
-            list_request = self.youtube.playlistItems().list_next(
+            self._progress(len(results), response.get("pageInfo", {}).get("totalResults"),
+                           "fetching playlists")
+
+            list_request = self.youtube.playlists().list_next(
                 list_request, response)
 
         log("API: Found {0} playlists", len(results))
@@ -611,6 +1194,10 @@ class NetworkThread(Thread):
         Obtain information on the contents of a specific playlist, given by
         ID. This returns a list of the videos in the playlist, complete with
         all of their details.
+
+        The request can optionally have filters, a query, an order and a
+        limit, in which case only the videos that pass the filters and match
+        the query are returned, in that order; see _query_videos() for details.
         """
         self.validate(request, {"playlist_id"})
         playlist_id = request["playlist_id"]
@@ -620,14 +1207,15 @@ class NetworkThread(Thread):
         if playlist_id in self.cache['playlist_contents']:
             if request["refresh"]:
                 log("API: Dropping playlist contents from cache: {0}", playlist_id)
-                del self.cache["playlist_contents"][playlist_id]
-
-                # TODO: This clobbers playlist video details for every possible
-                #       video; should it only clobber videos that appear in the
-                #       playlist we're re-fetching instead?
-                self.cache["playlist_videos"] = {}
+                self._invalidate_playlist(playlist_id)
             else:
-                return self.cache["playlist_contents"][playlist_id]
+                trace_event("cache hit")
+                video_ids = self.cache["playlist_contents"][playlist_id]
+                self._fetch_video_details(video_ids, _PLAYLIST_VIDEO_PARTS)
+                return self._query_videos(request, video_ids,
+                                          self.tag_indexes.get(playlist_id))
+
+        trace_event("cache miss")
 
         # Request breakdown is as follows. Note that snippet and contentDetails
         # have overlap between them, but each has information that the other
@@ -648,12 +1236,16 @@ class NetworkThread(Thread):
         # this piecemeal if needed.
         results = []
         while list_request:
-            response = list_request.execute()
+            with trace_span("api page"):
+                response = list_request.execute()
 
             # Grab information about each video.
             for playlist_item in response['items']:
                 results.append(dotty.dotty(playlist_item))
 
+            self._progress(len(results), response.get("pageInfo", {}).get("totalResults"),
+                           "fetching playlist")
+
             list_request = self.youtube.playlistItems().list_next(
                 list_request, response)
 
@@ -663,21 +1255,197 @@ class NetworkThread(Thread):
         # the data, updating the cache as we do. This is smart enough to not
         # re-request information it has previously retreived.
         ids = [v['contentDetails.videoId'] for v in results]
-        results = self._fetch_video_details(ids, 'id,snippet,status,statistics', self.cache["playlist_videos"])
+        self._fetch_video_details(ids, _PLAYLIST_VIDEO_PARTS)
 
-        # Cache the results for a future call
-        self.cache["playlist_contents"][playlist_id] = results
+        # Cache the contents for a future call, which also records which
+        # videos this playlist depends on so that a later refresh can be
+        # targeted.
+        self._index_playlist(playlist_id, ids)
 
         save_cached_request_data(self.cache)
 
-        return results
+        return self._query_videos(request, ids, self.tag_indexes.get(playlist_id))
+
+    def playlist_tags(self, request):
+        """
+        Obtain the tag index for the contents of a specific playlist, given by
+        ID. The contents of the playlist are fetched as they would be for the
+        playlist_contents request, and the result is a TagIndex for all of the
+        videos in that playlist.
+
+        If the request has a query or filters, the result is instead a new
+        TagIndex for only the videos in the playlist that match them.
+
+        The index kept here is updated as videos are stored, so the result is
+        always a copy; the caller uses it from another thread.
+        """
+        playlist_id = request["playlist_id"]
+        videos = self.playlist_contents(Request("playlist_contents",
+                                                playlist_id=playlist_id,
+                                                refresh=request["refresh"]))
+
+        tag_index = self.tag_indexes.get(playlist_id)
+        if tag_index is None:
+            tag_index = TagIndex(videos)
+            self.tag_indexes[playlist_id] = tag_index
+
+        if request["query"] or request["filters"]:
+            video_ids = self.cache["playlist_contents"][playlist_id]
+            return TagIndex(self._query_videos(request, video_ids, tag_index))
+
+        return tag_index.copy()
+
+    def _fetch_channel(self, channel, playlists, video_ids):
+        """
+        Fetch what is needed for the contents of the given channel; this is
+        invoked from the worker threads of the channel_contents request, and
+        so does not modify the cache. The playlists and video_ids are the list
+        of playlists for the channel and the ID's of the videos in its uploads
+        playlist, or None for either that needs to be fetched.
+
+        The return value is a tuple of the playlists, the video ID's, the
+        details of the videos that the video store was missing, the parts
+        that were fetched for them and the time the fetch took.
+        """
+        start = time.time()
+        http = self._thread_http()
+
+        if playlists is None:
+            playlists = self._fetch_pages(self.youtube.playlists(), http,
+                                          channelId=channel["id"],
+                                          part="id,snippet,contentDetails,status")
+
+        if video_ids is None:
+            items = self._fetch_pages(self.youtube.playlistItems(), http,
+                                      playlistId=channel['contentDetails.relatedPlaylists.uploads'],
+                                      part="contentDetails")
+            video_ids = [item['contentDetails.videoId'] for item in items]
+
+        missing_ids, needed = self._missing_video_parts(
+            video_ids, _split_parts(_PLAYLIST_VIDEO_PARTS))
+
+        videos = []
+        part = ",".join(["id"] + sorted(needed))
+        for index in range(0, len(missing_ids), 50):
+            response = self.youtube.videos().list(
+                id=missing_ids[index:index + 50],
+                part=part
+                ).execute(http=http)
+            videos.extend(response["items"])
+
+        return playlists, video_ids, videos, needed, time.time() - start
+
+    def channel_contents(self, request):
+        """
+        Obtain the playlists and the contents of the uploads playlist of each
+        of the channels with the ID's given in channel_ids, or of all of the
+        channels of the currently authenticated user if there are none. The
+        channels are fetched at the same time, using up to as many threads as
+        the channel_fetch_workers setting allows.
+
+        The result is a dictionary keyed on channel ID whose values are
+        dictionaries with the channel, its playlists and the videos in its
+        uploads playlist; the request can have a query, filters, an order and
+        a limit as for playlist_contents, which apply to the videos of each
+        channel.
+        """
+        channels = self.channel_list(Request("channel_list"))
+        if request["channel_ids"]:
+            channels = [c for c in channels if c["id"] in request["channel_ids"]]
+
+        log("API: Fetching contents of {0} channel(s)", len(channels))
+
+        # Any refresh is done here, since the workers can't modify the cache.
+        if request["refresh"]:
+            for channel in channels:
+                log("API: Dropping contents of channel from cache: {0}", channel["id"])
+                self.cache["playlist_list"].pop(channel["id"], None)
+                self._invalidate_playlist(channel['contentDetails.relatedPlaylists.uploads'])
+
+        workers = max(1, min(yte_setting("channel_fetch_workers"), len(channels)))
+        fetched = {}
+        error = None
+        with trace_span("api channels", channels=len(channels)):
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {}
+                for channel in channels:
+                    uploads = channel['contentDetails.relatedPlaylists.uploads']
+                    futures[executor.submit(self._fetch_channel, channel,
+                        self.cache["playlist_list"].get(channel["id"]),
+                        self.cache["playlist_contents"].get(uploads))] = channel
+
+                for future in as_completed(futures):
+                    channel = futures[future]
+                    try:
+                        fetched[channel["id"]] = future.result()
+                    except Exception as err:
+                        log("API: Fetching channel {0} failed: {1}", channel["id"], err)
+                        error = error or err
+
+                    self._progress(len(fetched), len(channels), "fetching channels")
+
+        # Merge what was fetched into the cache; this is done even if some of
+        # the channels failed, so that the work done for the others is kept.
+        for channel in channels:
+            if channel["id"] not in fetched:
+                continue
+
+            playlists, video_ids, videos, parts, elapsed = fetched[channel["id"]]
+            with trace_span("channel merge", channel=channel["id"], fetched=len(videos),
+                            fetch_time=elapsed):
+                self.cache["playlist_list"][channel["id"]] = playlists
+                for video in videos:
+                    self._store_video(video, parts)
+
+                uploads = channel['contentDetails.relatedPlaylists.uploads']
+                if self.cache["playlist_contents"].get(uploads) != video_ids:
+                    self._index_playlist(uploads, video_ids)
+
+        if fetched:
+            save_cached_request_data(self.cache)
+
+        if error is not None:
+            raise error
+
+        result = {}
+        for channel in channels:
+            playlists, video_ids = fetched[channel["id"]][:2]
+            uploads = channel['contentDetails.relatedPlaylists.uploads']
+            result[channel["id"]] = {
+                "channel": channel,
+                "playlists": playlists,
+                "videos": self._query_videos(request, video_ids,
+                                             self.tag_indexes.get(uploads))
+            }
+
+        return result
+
+    def search_videos(self, request):
+        """
+        Search the titles, descriptions, tags and tables of contents of all of
+        the videos in the video store for the words in the given search text.
+        This never makes any API calls, so only videos that have previously
+        been fetched can be found.
+
+        The result is a list of videos ranked by how well they match.
+        """
+        self.validate(request, {"search"})
+
+        if self.search_index is None:
+            videos = [video for video_id, video in self.cache["videos"].items()
+                      if "snippet" in self.cache["video_parts"].get(video_id, {})]
+
+            log("THR: Indexing {0} video(s) for search", len(videos))
+            self.search_index = SearchIndex(videos, toc=get_table_of_contents)
+
+        return self.search_index.search(request["search"], request["limit"] or 50)
 
     def video_details(self, request):
         """
         Given one or more video ID's for a video, fetch the details for those
-        videos. The results of this are cached separately from the cache used
-        for playlist video details, since each fetches a different portion of
-        the data available.
+        videos. The results of this share the video store with the playlist
+        video details, with only the parts that are not already held being
+        fetched.
 
         This can handle one or more video lookups, so the result is an array
         of video information as a result.
@@ -691,23 +1459,139 @@ class NetworkThread(Thread):
 
         log("API: Fetching video details for: {0}", video_ids)
 
-        # If we are asked to refresh, we need to delete from the cache all
-        # video IDs we were asked to request that were previously requested.
-        # All other caching happens below, in the request and subsequent
-        # handling.
+        # If we are asked to refresh, we need to expire the parts we need for
+        # all of the video IDs we were asked to request. All other caching
+        # happens below, in the request and subsequent handling.
         if request["refresh"]:
-            for video in video_ids:
-                if video in self.cache["video_details"]:
-                    log("API: Dropping video from cache: {0}", video)
-                    del self.cache["video_details"][video]
+            log("API: Expiring {0} video(s) in the cache", len(video_ids))
+            self._expire_video_parts(video_ids, _split_parts(_FULL_VIDEO_PARTS))
 
         # Fetch the details for all requested videos; this will use the cache
         # to only return what's needed.
-        result = self._fetch_video_details(video_ids, 'snippet,contentDetails,status,statistics', self.cache["video_details"])
+        result = self._fetch_video_details(video_ids, _FULL_VIDEO_PARTS)
         save_cached_request_data(self.cache)
 
         return result
 
+    def _send_update(self, part, body):
+        """
+        Send a single video update to YouTube, returning back the response.
+        This is invoked from the worker threads of the update queue, so it
+        uses the HTTP object of the calling thread; see _thread_http().
+
+        Errors that mean that no update can be sent right now raise
+        UpdatesHalted, so that the update stays queued.
+        """
+        from googleapiclient.errors import HttpError
+        import httplib2
+
+        try:
+            return self.youtube.videos().update(part=part, body=body
+                ).execute(http=self._thread_http())
+
+        except HttpError as err:
+            reasons = {e.get("reason") for e in err.error_details or []
+                       if isinstance(e, dict)}
+            if err.resp.status >= 500 or reasons & _HALT_REASONS:
+                raise UpdatesHalted(str(err))
+            raise
+
+        except (OSError, httplib2.HttpLib2Error) as err:
+            raise UpdatesHalted(str(err))
+
+    def _drain_updates(self, limit=None, only=None, interrupt=None):
+        """
+        Send updates from the update queue to YouTube, storing the new details
+        of each updated video in the video store. The limit, only and interrupt
+        arguments are as for UpdateQueue.drain().
+
+        The result is a dictionary with the ID's of the videos updated, the
+        list of updates that failed along with the exception raised, the number of
+        updates that are still waiting to be sent, and whether sending was
+        halted. When it was halted, no updates are sent in the background
+        until the update_retry_interval setting has passed.
+        """
+        # The parts that each update sends are the parts of the response.
+        sent_parts = {video_id: part for video_id, (part, body)
+                      in self.update_queue.pending.items()}
+
+        result = {"updated": [], "failed": [], "pending": 0, "halted": False}
+        def on_result(video_id, success, response):
+            if success:
+                self._store_video(response, _split_parts(sent_parts[video_id]))
+                result["updated"].append(video_id)
+            elif not isinstance(response, UpdatesHalted):
+                result["failed"].append((video_id, response))
+
+            done = len(result["updated"]) + len(result["failed"])
+            self._progress(done, len(sent_parts), "sending updates")
+
+            if not success:
+                log("API: Update of video {0} failed: {1}", video_id, response)
+
+        with trace_span("api updates") as span:
+            result["halted"] = self.update_queue.drain(self._send_update, on_result,
+                                    workers=yte_setting("bulk_update_workers"),
+                                    rate=yte_setting("bulk_update_rate"),
+                                    limit=limit, only=only, interrupt=interrupt)
+            span["updated"] = len(result["updated"])
+
+        if result["halted"]:
+            self.update_retry_time = time.time() + yte_setting("update_retry_interval")
+
+        if result["updated"]:
+            save_cached_request_data(self.cache)
+
+        result["pending"] = len(self.update_queue)
+        return result
+
+    def _drain_updates_in_background(self):
+        """
+        Invoked while the thread is idle; if there are updates waiting in the
+        update queue and we're able to send them, send a few of them. Only a
+        few are sent at a time, and no more are started once a new request
+        arrives or the thread is told to stop, so that neither is held up for
+        longer than the updates already being sent take.
+        """
+        if (not self.update_queue or self.youtube is None or self.cache is None
+                or time.time() < self.update_retry_time):
+            return
+
+        try:
+            with BusySpinner("Sending queued video updates") as self.spinner:
+                result = self._drain_updates(limit=yte_setting("bulk_update_workers"),
+                    interrupt=lambda: self.event.is_set() or not self.requests.empty())
+        except Exception:
+            self.update_retry_time = time.time() + yte_setting("update_retry_interval")
+            print(traceback.format_exc())
+            return
+
+        if result["updated"]:
+            log("API: Sent {0} queued video update(s); {1} still queued",
+                len(result["updated"]), result["pending"])
+
+    def _refresh_token_in_background(self):
+        """
+        Invoked while the thread is idle; if the access token is about to
+        expire, refresh it now, so that the next request doesn't have to wait
+        for it to be refreshed first. The refreshed credentials are cached, so
+        that they're also used the next time the plugin loads.
+        """
+        lifetime = token_lifetime(self.credentials)
+        if (lifetime is None or lifetime > _TOKEN_REFRESH_MARGIN or
+                not self.credentials.refresh_token or time.time() < self.token_retry_time):
+            return
+
+        try:
+            with BusySpinner("Refreshing YouTube login"):
+                refresh_credentials(self.credentials)
+        except Exception as err:
+            self.token_retry_time = time.time() + _TOKEN_REFRESH_RETRY
+            log("THR: Unable to refresh the access token: {0}", err)
+            return
+
+        log("THR: Refreshed the access token")
+
     def set_video_details(self, request):
         """
         Given video details, dispatch a request to the YouTube Data API to
@@ -720,8 +1604,15 @@ class NetworkThread(Thread):
         Not all properties are mutable; it's safe to provide immutable data
         items and they'll be ignored for the update.
 
-        The result of this request is a video_details result that contains the
-        new video data.
+        The update is added to the update queue before it is sent, so if it
+        can't be sent right now (for example because the network is down) it
+        is sent later in the background instead, after a restart if need be;
+        if there is already an update queued for the video, the two are sent
+        together. In that case the request is marked as queued, and the result
+        is the video details as they will be once the update is sent.
+
+        Otherwise, the result of this request is a video_details result that
+        contains the new video data.
 
         NOTE: Any video information that you don't provide here will be deleted
               from the video on YouTube if it exists; so ensure that what you
@@ -731,33 +1622,88 @@ class NetworkThread(Thread):
 
         part = request["part"]
         video_details = filter_new_video_details(request["video_details"])
+        video_id = video_details["id"]
 
-        log("API: Update video details for: {0}", video_details["id"])
+        log("API: Update video details for: {0}", video_id)
 
-        response = self.youtube.videos().update(
-            part=part,
-            body=video_details
-            ).execute()
+        self.update_queue.add(video_id, part, video_details)
+        result = self._drain_updates(only={video_id})
 
-        new_details = dotty.dotty(response)
-        self.cache["video_details"][new_details['id']] = new_details
+        for failed_id, err in result["failed"]:
+            raise err
 
-        save_cached_request_data(self.cache)
+        if video_id in self.update_queue:
+            log("API: Update for {0} queued; it will be sent when possible", video_id)
+            request["queued"] = True
+
+            part, body = self.update_queue.pending[video_id]
+            details = clone_data(self.cache["videos"].get(video_id, {}))
+            details.update(clone_data(body))
+            return dotty.dotty(details)
+
+        return self.cache["videos"][video_id]
 
-        return new_details
+    def bulk_update(self, request):
+        """
+        Given a list of (video ID, video details) tuples, add an update for
+        each video to the update queue and then send all of the updates in the
+        queue to YouTube. Only the parts of each video that differ from the
+        video store are sent, as in set_video_details; videos with no changes
+        are skipped. With no updates, this resumes sending the updates that
+        are still in the queue from a previous request.
+
+        Updates are sent by several threads at once, but no faster than the
+        rate in the bulk_update_rate setting. If the API quota runs out or the
+        network fails, the updates that were not sent stay in the queue.
+
+        The result is a dictionary with the number of videos updated, the
+        list of updates that failed along with the reason, and the number of
+        updates that are still waiting to be sent.
+        """
+        videos = self.cache["videos"]
+        for video_id, details in request["updates"] or []:
+            details = filter_new_video_details(details)
+            parts = changed_video_parts(videos.get(video_id, {"id": video_id}), details)
+            if parts:
+                update = {part: details[part] for part in parts}
+                update["id"] = video_id
+                self.update_queue.add(video_id, ",".join(parts), update)
+
+        total = len(self.update_queue)
+        log("API: Sending {0} queued video update(s)", total)
+
+        result = self._drain_updates()
+        result["updated"] = len(result["updated"])
+        result["failed"] = [(video_id, str(err)) for video_id, err in result["failed"]]
+
+        log("API: Updated {0} of {1} video(s); {2} failed, {3} still queued",
+            result["updated"], total, len(result["failed"]), result["pending"])
+
+        return dotty.dotty(result)
 
     def handle_request(self, request_obj):
         """
         Handle the asked for request, dispatching an appropriate callback when
         the request is complete (depending on whether it worked or not).
         """
+        from googleapiclient.errors import HttpError
+
         request = request_obj["request"]
         callback = request_obj["callback"]
 
         success = False
         result = None
 
-        with BusySpinner(request.reason):
+        # Spans for the request are recorded from here until the callback is
+        # handed to the main thread; the time the request spent waiting in the
+        # queue is known up front.
+        trace = Trace(request.name, request.reason)
+        queued = request_obj.get("queued")
+        if queued is not None:
+            trace.add_span("queue wait", queued, trace.start - queued)
+        begin_trace(trace)
+
+        with BusySpinner(request.reason) as self.spinner:
             try:
                 handler = self.request_map.get(request.name, None)
                 if handler is None:
@@ -770,7 +1716,8 @@ class NetworkThread(Thread):
                     # it in if we're just going to clobber it away.
                     if request.name not in ('authorize', 'deauthorize', 'flush_cache'):
                         log("THR: Initializing the data cache")
-                        self._init_cache()
+                        with trace_span("cache load"):
+                            self._init_cache()
 
                 result = handler(request)
                 success = True
@@ -784,7 +1731,22 @@ class NetworkThread(Thread):
                 # Display the trace to the console for diagnostic purposes.
                 print(traceback.format_exc())
 
-        sublime.set_timeout(lambda: callback(success, result))
+        end_trace()
+        trace.finish(success)
+        self.traces.add(trace)
+
+        # The delivery of the result is timed as the wait for the main thread
+        # to get to it and the time the callback takes.
+        def deliver(sent):
+            start = time.time()
+            trace.add_span("callback wait", sent, start - sent)
+            try:
+                callback(success, result)
+            finally:
+                trace.add_span("callback", start, time.time() - start)
+
+        sent = time.time()
+        sublime.set_timeout(lambda: deliver(sent))
         self.requests.task_done()
 
     def run(self):
@@ -799,13 +1761,31 @@ class NetworkThread(Thread):
         """
         # log("== Entering network loop")
 
-        while not self.event.is_set():
-            try:
-                request = self.requests.get(block=True, timeout=0.25)
-                self.handle_request(request)
+        # Pick up the cache and login from before the plugin was reloaded, if
+        # any.
+        self._take_over()
+
+        # Load any updates that were still waiting to be sent when we last
+        # shut down; they will be sent once we're authorized.
+        self.update_queue = UpdateQueue(stored_update_queue_path())
+        if self.update_queue:
+            log("THR: {0} video update(s) are waiting to be sent", len(self.update_queue))
 
-            except queue.Empty:
-                pass
+        try:
+            while not self.event.is_set():
+                try:
+                    request = self.requests.get(block=True, timeout=0.25)
+                    self.handle_request(request)
+
+                except queue.Empty:
+                    self._refresh_token_in_background()
+                    self._drain_updates_in_background()
+
+        # This is only reached once the request being handled when we were told
+        # to stop is finished, which could be after the plugin has been loaded
+        # again; the new thread waits for this.
+        finally:
+            self._hand_off()
 
         log("THR: YouTube thread has terminated")
 
@@ -0,0 +1,216 @@
+from collections import OrderedDict
+
+import re
+
+from .stats import column_value
+from .utils import get_table_of_contents
+
+
+###----------------------------------------------------------------------------
+
+
+# A regex that matches a single term in a query; an optional "-" to negate the
+# term, an optional field name and comparison, and a value which can be quoted
+# to include spaces.
+_term_regex = re.compile(r'''
+    (?P<negate>-)?
+    (?:(?P<field>[a-z]+)(?P<op><=|>=|!=|<|>|=|:))?
+    (?:"(?P<quoted>[^"]*)"?|(?P<value>\S+))
+    ''', re.VERBOSE)
+
+# A regex that matches a term that is only a field name and comparison, with
+# no value; _term_regex matches these as a bare word instead.
+_empty_term_regex = re.compile(r'^-?[a-z]+(?:<=|>=|!=|<|>|=|:)$')
+
+# The fields that are held in the statistics column store, and so can be
+# compared with any operator.
+_column_fields = {"views", "likes", "comments", "published", "duration", "privacy"}
+
+# Operators as they appear in a query, and what they are in a column filter;
+# ":" is the same as "=".
+_query_operators = {
+    ":": "==",
+    "=": "==",
+    "!=": "!=",
+    "<": "<",
+    "<=": "<=",
+    ">": ">",
+    ">=": ">="
+}
+
+# The operator that has the opposite meaning of each column filter operator,
+# used to negate a term.
+_negated_operators = {
+    "==": "!=",
+    "!=": "==",
+    "<": ">=",
+    "<=": ">",
+    ">": "<=",
+    ">=": "<"
+}
+
+# The things that can be checked for with has:; each is a function that takes
+# a video and returns True if the video has it.
+_has_checks = {
+    "toc": lambda v: bool(get_table_of_contents(v)),
+    "tags": lambda v: bool(v.get('snippet.tags')),
+    "description": lambda v: bool(v.get('snippet.description', '').strip())
+}
+
+# The number of compiled queries that compile_query() keeps.
+_QUERY_CACHE_SIZE = 32
+
+
+###----------------------------------------------------------------------------
+
+
+class VideoQuery():
+    """
+    A compiled video query. A query is a list of terms separated by spaces, all
+    of which have to match for a video to match; any term can be prefixed with
+    "-" to match videos that don't match it instead. Values that contain spaces
+    can be quoted. The terms are:
+
+        views<1000          compare a statistic (views, likes, comments,
+                            published, duration) with <, <=, >, >=, =, != or :
+        privacy:unlisted    the privacy status of the video
+        tag:"sublime text"  the video has the tag (case insensitive)
+        has:toc             the video has a table of contents, tags or a
+                            description (toc, tags, description)
+        title:word, word    the title contains the word (case insensitive)
+
+    Statistics are compared using the VideoStats column store, and tags using
+    a TagIndex when one is available; only the other terms need to look at the
+    video details.
+    """
+    def __init__(self, text):
+        self.text = text
+
+        # Column filters for VideoStats, tags (and whether they're negated),
+        # and predicates that take a video and return True if it matches.
+        self.filters = []
+        self.tags = []
+        self.predicates = []
+
+        for match in _term_regex.finditer(text):
+            self._compile_term(match)
+
+    def _compile_term(self, match):
+        negate = match.group("negate") is not None
+        field = match.group("field")
+        op = match.group("op")
+        value = match.group("quoted")
+        if value is None:
+            value = match.group("value")
+
+        if field is None:
+            if match.group("value") is not None and _empty_term_regex.match(value):
+                raise ValueError("'{0}' needs a value".format(value.lstrip("-")))
+            field, op = "title", ":"
+
+        elif not value:
+            raise ValueError("'{0}{1}' needs a value".format(field, op))
+
+        if field in _column_fields:
+            op = _query_operators[op]
+            if negate:
+                op = _negated_operators[op]
+
+            # Convert the value now, so that errors are found when the query
+            # is compiled rather than when it's run.
+            self.filters.append((field, op, column_value(field, value)))
+            return
+
+        if op != ":":
+            raise ValueError("'{0}' can only be used as {0}:value".format(field))
+
+        if field == "tag":
+            self.tags.append((value.lower(), negate))
+
+        elif field == "has":
+            if value not in _has_checks:
+                raise ValueError("unknown has:{0}; expected one of {1}".format(
+                                 value, ", ".join(sorted(_has_checks))))
+            self._add_predicate(_has_checks[value], negate)
+
+        elif field == "title":
+            word = value.lower()
+            self._add_predicate(lambda v: word in v.get('snippet.title', '').lower(),
+                                negate)
+
+        else:
+            raise ValueError("unknown query field '{0}'".format(field))
+
+    def _add_predicate(self, check, negate):
+        self.predicates.append((lambda v: not check(v)) if negate else check)
+
+    def run(self, stats, video_ids, order=None, limit=None, tag_index=None):
+        """
+        Run the query over the videos with the given ID's, using the given
+        VideoStats column store, and return back the list of videos that
+        match in the given order, up to the given limit.
+
+        If a TagIndex over the videos is given, it is used to narrow down the
+        videos that have to be looked at for tag terms; otherwise the tags of
+        each video are checked directly.
+        """
+        tags = self.tags
+        if tag_index is not None and tags:
+            video_ids = self._match_tags(tag_index, video_ids)
+            tags = []
+
+        videos = stats.query(self.filters, order, None, video_ids)
+
+        for tag, negate in tags:
+            videos = [v for v in videos if negate !=
+                      (tag in (t.lower() for t in v.get('snippet.tags', [])))]
+
+        for predicate in self.predicates:
+            videos = [v for v in videos if predicate(v)]
+
+        return videos[:limit]
+
+    def _match_tags(self, tag_index, video_ids):
+        """
+        Narrow down the given list of video ID's to those that match all of the
+        tag terms of the query, according to the given tag index.
+        """
+        lowered = {}
+        for name in tag_index.tags():
+            lowered.setdefault(name.lower(), []).append(name)
+
+        for tag, negate in self.tags:
+            with_tag = set()
+            for name in lowered.get(tag, ()):
+                with_tag.update(video['id'] for video in tag_index[name])
+
+            video_ids = [vid for vid in video_ids if negate != (vid in with_tag)]
+
+        return video_ids
+
+
+###----------------------------------------------------------------------------
+
+
+def compile_query(text):
+    """
+    Compile the given query text into a VideoQuery, raising ValueError if the
+    query is not valid. Compiled queries are cached, so compiling the same
+    query again is free.
+    """
+    cache = compile_query.cache
+    query = cache.get(text)
+    if query is None:
+        query = VideoQuery(text)
+        cache[text] = query
+
+        while len(cache) > _QUERY_CACHE_SIZE:
+            cache.popitem(last=False)
+
+    cache.move_to_end(text)
+    return query
+
+compile_query.cache = OrderedDict()
+
+
+###----------------------------------------------------------------------------
@@ -0,0 +1,67 @@
+###----------------------------------------------------------------------------
+
+
+# The state that is associated with views and windows; the keys are view and
+# window ID's, and the values are dictionaries of state for that view or
+# window.
+#
+# This module is left out of the list of modules that are reloaded when the
+# plugin is reloaded (see lib/__init__.py), so that the state of the views and
+# windows that are already open survives the reload. The state is not saved
+# with the session, though; views and windows that Sublime restores when it
+# starts have none.
+_view_state = {}
+_window_state = {}
+
+
+###----------------------------------------------------------------------------
+
+
+def view_state(view, create=True):
+    """
+    Return back the dictionary that holds the plugin state for the given view.
+    When create is False and there is no state for the view, None is returned
+    instead of creating new state.
+
+    State is held here rather than in the view settings so that large values
+    (such as video details) can be stored as references to the cached data
+    instead of being copied into and out of the settings object every time
+    they are accessed. The state is discarded when the view is closed.
+    """
+    state = _view_state.get(view.id())
+    if state is None and create:
+        state = _view_state[view.id()] = {}
+
+    return state
+
+
+def window_state(window, create=True):
+    """
+    Return back the dictionary that holds the plugin state for the given
+    window. When create is False and there is no state for the window, None is
+    returned instead of creating new state.
+
+    This works the same as view_state(), but for windows instead.
+    """
+    state = _window_state.get(window.id())
+    if state is None and create:
+        state = _window_state[window.id()] = {}
+
+    return state
+
+
+def discard_view_state(view_id):
+    """
+    Throw away any plugin state associated with the view with the given ID.
+    """
+    _view_state.pop(view_id, None)
+
+
+def discard_window_state(window_id):
+    """
+    Throw away any plugin state associated with the window with the given ID.
+    """
+    _window_state.pop(window_id, None)
+
+
+###----------------------------------------------------------------------------
@@ -0,0 +1,230 @@
+from array import array
+
+import calendar
+import operator
+import re
+import time
+
+
+###----------------------------------------------------------------------------
+
+
+# The columns in the statistics index. The key is the name of the column as
+# used in filters and sort orders, and the value is the typecode of the array
+# that holds it and a function that gets the value of the column from a video.
+# Values that a video doesn't have (for example the duration of a video whose
+# contentDetails have not been fetched) are -1.
+_columns = {
+    "views": ("q", lambda v: _to_int(v.get('statistics.viewCount'))),
+    "likes": ("q", lambda v: _to_int(v.get('statistics.likeCount'))),
+    "comments": ("q", lambda v: _to_int(v.get('statistics.commentCount'))),
+    "published": ("d", lambda v: _to_timestamp(v.get('snippet.publishedAt'))),
+    "privacy": ("b", lambda v: _privacy_codes.get(v.get('status.privacyStatus'), -1)),
+    "duration": ("l", lambda v: _to_seconds(v.get('contentDetails.duration')))
+}
+
+# The codes that are stored in the privacy column for each privacy status.
+_privacy_codes = {
+    "public": 0,
+    "unlisted": 1,
+    "private": 2
+}
+
+# The comparison operators that can be used in filters.
+_operators = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne
+}
+
+# A regex that matches an ISO 8601 duration as used by YouTube, such as
+# PT1H2M3S; days are used for very long videos.
+_duration_regex = re.compile(r'P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+
+
+###----------------------------------------------------------------------------
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+
+def _to_timestamp(value):
+    """
+    Convert an ISO 8601 UTC time as used by YouTube (for example
+    2021-01-01T12:00:00Z) or a plain date (2021-01-01) into seconds since the
+    epoch.
+    """
+    try:
+        if len(value) == 10:
+            value += "T00:00:00"
+        return float(calendar.timegm(time.strptime(value[:19], "%Y-%m-%dT%H:%M:%S")))
+    except (TypeError, ValueError):
+        return -1.0
+
+
+def _to_seconds(value):
+    """
+    Convert an ISO 8601 duration as used by YouTube into a number of seconds.
+    """
+    match = _duration_regex.match(value or "")
+    if not match or not value:
+        return -1
+
+    days, hours, minutes, seconds = (int(g or 0) for g in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def column_value(column, value):
+    """
+    Convert a value given in a filter into the value that is stored in the
+    given column, so that the two can be compared. Privacy can be given as a
+    status name, publish times as an ISO 8601 time or date and durations as either a
+    number of seconds or an ISO 8601 duration.
+
+    This raises ValueError if the column is not known or the value can't be
+    converted.
+    """
+    if column not in _columns:
+        raise ValueError("unknown column '{0}'".format(column))
+
+    if isinstance(value, str):
+        if column == "privacy":
+            if value not in _privacy_codes:
+                raise ValueError("unknown privacy status '{0}'".format(value))
+            return _privacy_codes[value]
+
+        if column == "published":
+            result = _to_timestamp(value)
+        elif column == "duration" and value.startswith("P"):
+            result = _to_seconds(value)
+        else:
+            result = _to_int(value)
+
+        if result == -1:
+            raise ValueError("invalid value '{0}' for column '{1}'".format(value, column))
+        return result
+
+    return value
+
+
+###----------------------------------------------------------------------------
+
+
+class VideoStats():
+    """
+    A column store over the statistics of a set of videos, with each column
+    held in an array so that filtering and sorting on them doesn't need to look
+    anything up in the video details. Like the other indexes, this is kept up
+    to date incrementally as videos are added, removed or changed.
+
+    Filters are lists of (column, operator, value) tuples that must all hold,
+    and sort orders are lists of column names, each of which can be prefixed
+    with "-" to sort that column in descending order.
+    """
+    def __init__(self, videos=None):
+        self._data = {name: array(code) for name, (code, get) in _columns.items()}
+
+        # The videos in the store, the row of each video by ID, and the title
+        # of each video, which is used to break ties when sorting.
+        self._videos = []
+        self._rows = {}
+        self._titles = []
+
+        for video in videos or []:
+            self.add(video)
+
+    def __len__(self):
+        return len(self._videos)
+
+    def __contains__(self, video_id):
+        return video_id in self._rows
+
+    def add(self, video):
+        """
+        Add the given video to the index; if the video is already in the index,
+        its row is updated to reflect its current statistics instead.
+        """
+        row = self._rows.get(video['id'])
+        if row is None:
+            row = len(self._videos)
+            self._rows[video['id']] = row
+            self._videos.append(video)
+            self._titles.append(None)
+            for name, (code, get) in _columns.items():
+                self._data[name].append(get(video))
+        else:
+            self._videos[row] = video
+            for name, (code, get) in _columns.items():
+                self._data[name][row] = get(video)
+
+        self._titles[row] = video.get('snippet.title', '').lower()
+
+    def remove(self, video_id):
+        """
+        Remove the video with the given ID from the index, if it's present. The
+        last row is moved into the place of the removed row so that the columns
+        stay packed.
+        """
+        row = self._rows.pop(video_id, None)
+        if row is None:
+            return
+
+        last = len(self._videos) - 1
+        if row != last:
+            self._videos[row] = self._videos[last]
+            self._titles[row] = self._titles[last]
+            self._rows[self._videos[row]['id']] = row
+            for column in self._data.values():
+                column[row] = column[last]
+
+        self._videos.pop()
+        self._titles.pop()
+        for column in self._data.values():
+            column.pop()
+
+    def query(self, filters=None, order=None, limit=None, video_ids=None):
+        """
+        Return back a list of the videos that pass all of the given filters,
+        sorted in the given order and limited to at most limit videos. When
+        video_ids is given, only the videos with those ID's are considered.
+
+        This raises ValueError if a filter or sort order is not valid.
+        """
+        if video_ids is None:
+            rows = list(range(len(self._videos)))
+        else:
+            rows = [self._rows[vid] for vid in video_ids if vid in self._rows]
+
+        for column, op, value in filters or []:
+            if op not in _operators:
+                raise ValueError("unknown operator '{0}'".format(op))
+
+            value = column_value(column, value)
+            data = self._data[column]
+            test = _operators[op]
+            rows = [row for row in rows if test(data[row], value)]
+
+        if order:
+            # Python sorts are stable, so sorting on each key from the least
+            # significant to the most significant gives a multi-key sort; the
+            # title is the least significant key of all.
+            rows.sort(key=self._titles.__getitem__)
+            for key in reversed(order):
+                column = key.lstrip("-")
+                if column not in self._data:
+                    raise ValueError("unknown column '{0}'".format(column))
+
+                rows.sort(key=self._data[column].__getitem__,
+                          reverse=key.startswith("-"))
+
+        return [self._videos[row] for row in rows[:limit]]
+
+
+###----------------------------------------------------------------------------
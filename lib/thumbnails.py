@@ -0,0 +1,270 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from threading import Lock
+
+import base64
+import hashlib
+import os
+
+from .logging import log
+
+
+###----------------------------------------------------------------------------
+
+
+# The thumbnail sizes to use, in order of preference; not every video has every
+# size of thumbnail.
+_THUMBNAIL_SIZES = ("standard", "high", "medium", "default")
+
+# The extension used for the files in the cache; each file holds a data URI
+# that can be used directly in HTML content.
+_FILE_EXTENSION = ".uri"
+
+
+###----------------------------------------------------------------------------
+
+
+def thumbnail_url(video):
+    """
+    Return back the URL of the thumbnail image to use for the given video, or
+    None if the video has no thumbnails.
+    """
+    for size in _THUMBNAIL_SIZES:
+        url = video.get('snippet.thumbnails.{0}.url'.format(size))
+        if url:
+            return url
+
+    return None
+
+
+def _thumbnail_version(video):
+    """
+    Return back a short string that identifies the version of the thumbnail of
+    the given video; this changes whenever YouTube reports that the video has
+    changed.
+    """
+    etag = video.get('etag') or thumbnail_url(video) or ''
+    return hashlib.sha1(etag.encode("utf-8")).hexdigest()[:16]
+
+
+###----------------------------------------------------------------------------
+
+
+class ThumbnailCache():
+    """
+    A size bounded cache of video thumbnails, kept on disk in the given folder
+    so that it persists between sessions. Thumbnails are keyed by video ID and
+    the etag of the video, and when the cache grows larger than the given
+    number of bytes the least recently used thumbnails are removed.
+
+    Thumbnails are downloaded using a single pooled HTTP session, either on
+    demand or by prefetching them in the background with a small pool of
+    worker threads.
+
+    There should be a single global instance of this class, so that the HTTP
+    session and the cache are shared.
+    """
+    def __init__(self, path, max_size, workers=2):
+        self.path = path
+        self.max_size = max_size
+
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.session = None
+        self.lock = Lock()
+
+        # Keys are video ID's, values are a tuple of the version of the
+        # thumbnail held and the size of its file; the order is the order of
+        # use, least recently used first.
+        self.entries = OrderedDict()
+        self.size = 0
+
+        # The video ID's whose thumbnails are currently being fetched.
+        self.in_flight = set()
+
+        self._scan()
+
+    def shutdown(self):
+        """
+        Shut down the worker pool and HTTP session; this should be called when
+        the plugin is unloaded.
+        """
+        self.executor.shutdown(wait=False)
+        if self.session is not None:
+            self.session.close()
+
+    def _scan(self):
+        """
+        Populate the index of cached thumbnails from the files in the cache
+        folder, ordering them by the last time that they were used.
+        """
+        os.makedirs(self.path, exist_ok=True)
+
+        found = []
+        for entry in os.scandir(self.path):
+            name, ext = os.path.splitext(entry.name)
+            if ext != _FILE_EXTENSION or "-" not in name:
+                continue
+
+            video_id, version = name.rsplit("-", 1)
+            stat = entry.stat()
+            found.append((stat.st_mtime, video_id, version, stat.st_size))
+
+        for mtime, video_id, version, size in sorted(found):
+            self.entries[video_id] = (version, size)
+            self.size += size
+
+    def _file_name(self, video_id, version):
+        return os.path.join(self.path, "{0}-{1}{2}".format(
+                            video_id, version, _FILE_EXTENSION))
+
+    def is_current(self, video):
+        """
+        Check to see if the cache holds the current thumbnail for the given
+        video.
+        """
+        with self.lock:
+            entry = self.entries.get(video['id'])
+            return entry is not None and entry[0] == _thumbnail_version(video)
+
+    def get(self, video):
+        """
+        Return back the cached thumbnail of the given video as a data URI, or
+        None if there isn't one. This never downloads anything, and may return
+        an older version of the thumbnail if that's all that is cached.
+        """
+        video_id = video['id']
+        with self.lock:
+            entry = self.entries.get(video_id)
+            if entry is None:
+                return None
+
+            self.entries.move_to_end(video_id)
+            file_name = self._file_name(video_id, entry[0])
+
+        try:
+            with open(file_name, "r", encoding="utf-8") as handle:
+                data = handle.read()
+            os.utime(file_name)
+            return data
+
+        except OSError:
+            with self.lock:
+                if self.entries.get(video_id) == entry:
+                    del self.entries[video_id]
+                    self.size -= entry[1]
+            return None
+
+    def thumbnail(self, video):
+        """
+        Return back the current thumbnail of the given video as a data URI,
+        downloading it first if it is not already cached; this blocks while
+        the download happens. The result is None if the thumbnail could not be
+        obtained.
+        """
+        if self.is_current(video):
+            data = self.get(video)
+            if data is not None:
+                return data
+
+        return self._fetch(video)
+
+    def prefetch(self, videos, callback=None):
+        """
+        Download the thumbnails for the given videos in the background, for
+        any that are not already cached or being downloaded. When given, the
+        callback is invoked from a worker thread with the video and the data
+        URI of its thumbnail (or None if it could not be downloaded) as each
+        download finishes.
+        """
+        for video in videos:
+            if self.is_current(video):
+                continue
+
+            with self.lock:
+                if video['id'] in self.in_flight:
+                    continue
+                self.in_flight.add(video['id'])
+
+            future = self.executor.submit(self._fetch, video)
+            if callback is not None:
+                future.add_done_callback(
+                    lambda f, video=video: callback(video, f.result()))
+
+    def _get_session(self):
+        """
+        Return back the HTTP session used to download thumbnails, creating it
+        the first time it's needed; requests takes a while to import, so this
+        keeps it from slowing down the loading of the plugin.
+        """
+        with self.lock:
+            if self.session is None:
+                import requests
+                self.session = requests.Session()
+
+            return self.session
+
+    def _fetch(self, video):
+        """
+        Download the thumbnail for the given video and add it to the cache,
+        replacing any older version; the result is the data URI of the
+        thumbnail or None if it could not be downloaded.
+        """
+        video_id = video['id']
+        version = _thumbnail_version(video)
+
+        try:
+            url = thumbnail_url(video)
+            if url is None:
+                return None
+
+            response = self._get_session().get(url, timeout=10)
+            response.raise_for_status()
+
+            data = ("data:" + response.headers.get('Content-Type', 'image/jpeg') +
+                    ";base64," + base64.b64encode(response.content).decode("utf-8"))
+
+            file_name = self._file_name(video_id, version)
+            with open(file_name + ".tmp", "w", encoding="utf-8") as handle:
+                handle.write(data)
+            os.replace(file_name + ".tmp", file_name)
+
+            self._add(video_id, version, os.path.getsize(file_name))
+            return data
+
+        except Exception as err:
+            log("PKG: Unable to fetch thumbnail for {0}: {1}", video_id, err)
+            return None
+
+        finally:
+            with self.lock:
+                self.in_flight.discard(video_id)
+
+    def _add(self, video_id, version, size):
+        """
+        Record that a new version of the thumbnail for the given video has been
+        saved, removing the old version (if any) and then as many of the least
+        recently used thumbnails as are needed to fit in the maximum size.
+        """
+        with self.lock:
+            old = self.entries.pop(video_id, None)
+            if old is not None:
+                self.size -= old[1]
+                if old[0] != version:
+                    self._remove_file(video_id, old[0])
+
+            self.entries[video_id] = (version, size)
+            self.size += size
+
+            while self.size > self.max_size and len(self.entries) > 1:
+                old_id, (old_version, old_size) = self.entries.popitem(last=False)
+                self.size -= old_size
+                self._remove_file(old_id, old_version)
+
+    def _remove_file(self, video_id, version):
+        try:
+            os.remove(self._file_name(video_id, version))
+        except OSError:
+            pass
+
+
+###----------------------------------------------------------------------------
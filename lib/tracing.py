@@ -0,0 +1,189 @@
+from collections import deque
+from contextlib import contextmanager
+from threading import Lock, local
+
+import json
+import time
+
+
+###----------------------------------------------------------------------------
+
+
+# How many of the most recent request traces are kept.
+_TRACE_STORE_SIZE = 500
+
+# The trace of the request that is currently being handled, per thread.
+_current = local()
+
+
+###----------------------------------------------------------------------------
+
+
+class Trace():
+    """
+    The timing of a single request as it was handled; the spans are the parts
+    of the request that were timed, each of which has a name, a start time
+    (relative to the start of the trace) and a duration in seconds, along with
+    any extra details that were given for it.
+    """
+    def __init__(self, name, reason, start=None):
+        self.name = name
+        self.reason = reason
+        self.start = time.time() if start is None else start
+        self.duration = None
+        self.success = None
+        self.spans = []
+
+    def add_span(self, name, start, duration, **details):
+        """
+        Add a span that started at the given time and took the given number
+        of seconds to the trace.
+        """
+        span = dict(details)
+        span["name"] = name
+        span["start"] = start - self.start
+        span["duration"] = duration
+        self.spans.append(span)
+
+    def finish(self, success):
+        """
+        Mark the trace as finished, recording if the request succeeded.
+        """
+        self.duration = time.time() - self.start
+        self.success = success
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "reason": self.reason,
+            "start": self.start,
+            "duration": self.duration,
+            "success": self.success,
+            "spans": list(self.spans)
+        }
+
+
+###----------------------------------------------------------------------------
+
+
+def begin_trace(trace):
+    """
+    Make the given trace the one that spans in this thread are added to, until
+    end_trace() is called.
+    """
+    _current.trace = trace
+
+
+def end_trace():
+    """
+    Stop adding spans in this thread to the current trace, returning it.
+    """
+    trace = getattr(_current, "trace", None)
+    _current.trace = None
+    return trace
+
+
+@contextmanager
+def trace_span(name, **details):
+    """
+    Time the body of the with statement as a span with the given name in the
+    trace of the request being handled by this thread, if there is one. The
+    value of the with statement is the dict of details for the span, which the
+    body can add to.
+    """
+    trace = getattr(_current, "trace", None)
+    start = time.time()
+    try:
+        yield details
+    finally:
+        if trace is not None:
+            trace.add_span(name, start, time.time() - start, **details)
+
+
+def trace_event(name, **details):
+    """
+    Add a span that takes no time with the given name and details to the trace
+    of the request being handled by this thread, if there is one; this is for
+    recording things such as cache hits.
+    """
+    trace = getattr(_current, "trace", None)
+    if trace is not None:
+        trace.add_span(name, time.time(), 0.0, **details)
+
+
+###----------------------------------------------------------------------------
+
+
+def _percentile(values, percent):
+    """
+    Return the given percentile of a sorted list of values, using the nearest
+    rank.
+    """
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+
+class TraceStore():
+    """
+    A bounded store of the traces of the most recently handled requests; once
+    the store is full, the oldest traces are dropped as new ones are added.
+    """
+    def __init__(self, size=_TRACE_STORE_SIZE):
+        self._traces = deque(maxlen=size)
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._traces)
+
+    def add(self, trace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def traces(self):
+        """
+        Return back a list of the traces in the store, oldest first.
+        """
+        with self._lock:
+            return list(self._traces)
+
+    def latency_report(self):
+        """
+        Return back a list of lines that break down the latency of the traced
+        requests by request type; for each type, the total time and the time
+        of each kind of span are given as a count, p50 and p95 in milliseconds.
+        """
+        by_name = {}
+        for trace in self.traces():
+            if trace.duration is None:
+                continue
+
+            timings = by_name.setdefault(trace.name, {"total": []})
+            timings["total"].append(trace.duration)
+            for span in list(trace.spans):
+                timings.setdefault(span["name"], []).append(span["duration"])
+
+        lines = []
+        for name in sorted(by_name):
+            lines.append(name)
+            timings = by_name[name]
+            for span in ["total"] + sorted(s for s in timings if s != "total"):
+                values = sorted(timings[span])
+                lines.append("  {0:<20} {1:>6}  p50 {2:>9.1f}ms  p95 {3:>9.1f}ms".format(
+                    span, len(values),
+                    _percentile(values, 50) * 1000,
+                    _percentile(values, 95) * 1000))
+            lines.append("")
+
+        return lines
+
+    def export(self, filename):
+        """
+        Write all of the traces in the store to the given file as JSON lines,
+        one trace per line.
+        """
+        with open(filename, "w") as handle:
+            for trace in self.traces():
+                handle.write(json.dumps(trace.as_dict()) + "\n")
+
+
+###----------------------------------------------------------------------------
@@ -2,13 +2,16 @@ import sublime
 import sublime_plugin
 
 from sublime import QuickPanelItem
-from uuid import uuid4
+from collections import OrderedDict
+from threading import Lock
 
 import re
+import hashlib
 
 from timeit import default_timer as timer
 
 from . import dotty
+from .indexes import TagIndex
 
 
 ###----------------------------------------------------------------------------
@@ -44,6 +47,11 @@ _kind_map = {
 # is the chapter title in the table of contents.
 _toc_regex = re.compile(r'(?m)^\s*((?:\d{1,2}:)?\d{1,2}:\d{2})\s+(.*$)')
 
+# The number of sorted video lists and quick panel item lists that are kept
+# by memoize_panel_data(); each playlist or tag that the user browses uses one
+# or two entries.
+_PANEL_CACHE_SIZE = 32
+
 
 ###----------------------------------------------------------------------------
 
@@ -63,16 +71,95 @@ def yte_setting(key):
     return yte_setting.obj.get(key, default)
 
 
-def video_sort(videos, key,  keyType=str, reverse=False):
+def video_sort(videos, key,  keyType=str, reverse=False, cache_key=None):
     """
     Given a list of video records that are dotty dictionaries return back a
     sorted version that is sorted based on the provided key. The keys will be
     converted using the given key type during the sort for comparison purposes.
 
-    This is a very simple wrapper on a standard function, but the plan is to
-    also implement filtering at some point in the future as well.
+    When a cache_key is given, the sorted list is memoized under that key
+    (see memoize_panel_data()), and the same list is returned until the cached
+    data changes; it should not be modified.
+
+    This is a very simple wrapper on a standard function; to filter videos or
+    sort them on several keys, use a VideoStats column store instead.
+    """
+    return memoize_panel_data(("sort", key, reverse), cache_key,
+        lambda: sorted(videos, key=lambda k: keyType(k[key]), reverse=reverse))
+
+
+def cache_generation(source):
+    """
+    Return back the current generation of the cached data for the given
+    source, which is a tuple of the kind and ID of something in the cache,
+    such as ("playlist", playlist_id). The generation changes every time that
+    the cached data for that source changes, so anything that is derived from
+    the data is out of date if it was derived in an older generation.
+    """
+    return (cache_generation.value, cache_generation.sources.get(source, 0))
+
+# The generation of all of the cached data, and the generations of the cached
+# data for each source, keyed by source.
+cache_generation.value = 0
+cache_generation.sources = {}
+
+
+def bump_cache_generation(sources=None):
     """
-    return sorted(videos, key=lambda k: keyType(k[key]), reverse=reverse)
+    Signal that the cached data for the given list of sources (see
+    cache_generation()) has changed, making anything derived from it in an
+    earlier generation out of date. With no sources, all of the cached data is
+    taken to have changed, such as when it's loaded.
+    """
+    if sources is None:
+        cache_generation.value += 1
+        return
+
+    for source in sources:
+        cache_generation.sources[source] = cache_generation.sources.get(source, 0) + 1
+
+
+def memoize_panel_data(kind, cache_key, build):
+    """
+    Return back the data of the given kind that is memoized under the given
+    cache key, which is a tuple that identifies what the data is derived from;
+    it starts with the source of the data (see cache_generation()), such as a
+    playlist, followed by anything that further narrows it down, such as a
+    query or a tag. If there is no such data, or it was memoized in an earlier
+    generation of its source, build is invoked to create it and the result is
+    memoized and returned.
+
+    If cache_key is None, the data is built and returned without being
+    memoized. Only the most recently used entries are kept.
+    """
+    if cache_key is None:
+        return build()
+
+    key = (kind, cache_key)
+    generation = cache_generation(cache_key[:2])
+    entry = memoize_panel_data.cache.get(key)
+    if entry is not None and entry[0] == generation:
+        memoize_panel_data.cache.move_to_end(key)
+        return entry[1]
+
+    data = build()
+    memoize_panel_data.cache[key] = (generation, data)
+    memoize_panel_data.cache.move_to_end(key)
+
+    while len(memoize_panel_data.cache) > _PANEL_CACHE_SIZE:
+        memoize_panel_data.cache.popitem(last=False)
+
+    return data
+
+memoize_panel_data.cache = OrderedDict()
+
+
+def content_digest(text):
+    """
+    Return back a digest of the given text, for quickly telling whether or not
+    some text has changed without having to keep a copy of it around.
+    """
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
 
 
 def __convert_timecode(timecode):
@@ -165,6 +252,25 @@ def get_window_link(view, window=None, event=None):
     return make_video_link(video_id, timecode)
 
 
+def select_channel(channels, callback, placeholder=None):
+    """
+    Given a list of channels, prompt the user with a quick panel to choose a
+    channel. The callback will be invoked with a single parameter; None if the
+    user cancelled the selection, or the channel the user selected.
+    """
+    placeholder = placeholder or "Select a channel"
+    items = [QuickPanelItem(
+               c.get('brandingSettings.channel.title') or c['snippet.title'],
+               "",
+               "{0} videos".format(c.get('statistics.videoCount', '???')),
+               _kind_map.get(c['status.privacyStatus'], KIND_PRIVATE)
+             ) for c in channels]
+
+    sublime.active_window().show_quick_panel(items,
+        lambda i: callback(None if i == -1 else channels[i]),
+        placeholder=placeholder)
+
+
 def select_playlist(playlists, callback, show_back=False, placeholder=None):
     """
     Given a list of playlists, prompt the user with a quick panel to choose a
@@ -199,7 +305,8 @@ def select_playlist(playlists, callback, show_back=False, placeholder=None):
     sublime.active_window().show_quick_panel(items, pick, placeholder=placeholder)
 
 
-def select_tag(videos, callback, show_back=False, tag_list=None, placeholder=None):
+def select_tag(videos, callback, show_back=False, tag_list=None, placeholder=None,
+               cache_key=None):
     """
     Given a list of videos OR a dictionary of tags (see below), prompt the user
     with  a quick panel to choose a tag. The callback will be invoked with two
@@ -213,29 +320,28 @@ def select_tag(videos, callback, show_back=False, tag_list=None, placeholder=Non
     the special sentinel tag "_back".
 
     The function can be given either a list of video dictionaries in videos, OR
-    a dictionary of tags in tag_list. If a tag_list is provided, it is used
-    directly, and will also be passed back in the callback. If tag_list is
-    None, the list of videos is used to construct the tag dictionary.
+    a TagIndex in tag_list. If a tag_list is provided, it is used directly, and
+    will also be passed back in the callback. If tag_list is None, the list of
+    videos is used to construct the tag index.
 
-    tag_list (when provided or passed to a callback) is a dictionary where the
-    key is the text of a tag and the value is an array of all videos that
-    contain that tag.
+    tag_list (when provided or passed to a callback) is a TagIndex, which can be
+    indexed by the text of a tag to get an array of all videos that contain
+    that tag.
+
+    When a cache_key is given, the quick panel items are memoized under that
+    key (see memoize_panel_data()), so they are only built again once the
+    cached data changes.
     """
     if tag_list is None:
-        tag_list = {}
-        for video in videos:
-            tags = video.get('snippet.tags', [])
-            for tag in tags:
-                if tag not in tag_list:
-                    tag_list[tag] = []
-                tag_list[tag].append(video)
+        tag_list = TagIndex(videos)
 
     placeholder = placeholder or "Browse by tag"
-    items = [QuickPanelItem(tag, "", "{} videos".format(len(tag_list[tag])), KIND_TAG)
-                for tag in sorted(tag_list.keys())]
+    items = memoize_panel_data("tag_items", cache_key,
+        lambda: [QuickPanelItem(tag, "", "{} videos".format(tag_list.count(tag)), KIND_TAG)
+                 for tag in tag_list.tags()])
 
     if show_back:
-        items.insert(0, QuickPanelItem("..", "", "Go back", KIND_BACK))
+        items = [QuickPanelItem("..", "", "Go back", KIND_BACK)] + items
 
     def pick(i):
         if i == -1:
@@ -249,7 +355,8 @@ def select_tag(videos, callback, show_back=False, tag_list=None, placeholder=Non
     sublime.active_window().show_quick_panel(items, pick, placeholder=placeholder)
 
 
-def select_video(videos, callback, show_back=False, placeholder=None):
+def select_video(videos, callback, show_back=False, placeholder=None,
+                 on_highlight=None, cache_key=None):
     """
     Given a list of video records, prompt the user with a quick panel to choose
     a video. The callback will be invoked with a single parameter; None if the
@@ -258,9 +365,18 @@ def select_video(videos, callback, show_back=False, placeholder=None):
     If show_back is True, an extra item is added to the list to allow the user
     to go back to a previous panel; in this case the callback returns a video
     with the special sentinel id of "_back".
+
+    If on_highlight is given, it is invoked with the list of videos and the
+    index of the video in it as each video is highlighted in the panel.
+
+    When a cache_key is given, the quick panel items are memoized under that
+    key (see memoize_panel_data()), so they are only built again once the
+    cached data changes; the list of videos must be the same every time that
+    the same key is used in the same cache generation.
     """
     placeholder = placeholder or "Select a video"
-    items = [QuickPanelItem(
+    items = memoize_panel_data("video_items", cache_key,
+        lambda: [QuickPanelItem(
                v['snippet.title'],
                "",
                "{0} views ✔:{1} ✘:{2}".format(
@@ -268,10 +384,10 @@ def select_video(videos, callback, show_back=False, placeholder=None):
                     v['statistics.likeCount'],
                     v['statistics.dislikeCount']),
                _kind_map.get(v['status.privacyStatus'], KIND_PUBLIC)
-             ) for v in videos]
+             ) for v in videos])
 
     if show_back:
-        items.insert(0, QuickPanelItem("..", "", "Go back", KIND_BACK))
+        items = [QuickPanelItem("..", "", "Go back", KIND_BACK)] + items
 
     def pick(i):
         if i == -1:
@@ -283,18 +399,72 @@ def select_video(videos, callback, show_back=False, placeholder=None):
 
         callback(videos[i])
 
-    sublime.active_window().show_quick_panel(items, pick, placeholder=placeholder)
+    def highlight(i):
+        if show_back:
+            i -= 1
+
+        if on_highlight is not None and i >= 0:
+            on_highlight(videos, i)
+
+    sublime.active_window().show_quick_panel(items, pick, on_highlight=highlight,
+                                             placeholder=placeholder)
 
 
 def get_table_of_contents(video):
     """
     Given a video dictionary, return back the table of contents of that video,
     if any. The return is a list which contains tuples that provide a timecode
-    value and the text associated with that timecode.
+    value, the text associated with that timecode, and the timecode as a
+    number of seconds.
 
     For videos with no table of contents, this returns an empty list.
+
+    The parsed table of contents is looked up in the cache kept by the network
+    thread (see cache_table_of_contents()), and the description is only parsed
+    if the cache doesn't have it. This never modifies the cache, so it's safe
+    to call from any thread.
     """
-    return _toc_regex.findall(video['snippet.description'])
+    description = video['snippet.description']
+
+    cached = get_table_of_contents.cache.get(video['id'])
+    if cached is not None and cached["hash"] == content_digest(description):
+        return cached["entries"]
+
+    return _parse_table_of_contents(description)
+
+# The cache of parsed tables of contents; the network thread replaces this with
+# the one stored in its request cache so that it persists between sessions.
+get_table_of_contents.cache = {}
+
+
+def cache_table_of_contents(video):
+    """
+    Parse the table of contents of the given video and store it in the cache
+    used by get_table_of_contents(), along with a hash of the description it
+    came from, returning back the entries.
+
+    The cache is saved along with the rest of the request cache, so this must
+    only be called from the network thread.
+    """
+    description = video['snippet.description']
+    digest = content_digest(description)
+
+    cached = get_table_of_contents.cache.get(video['id'])
+    if cached is not None and cached["hash"] == digest:
+        return cached["entries"]
+
+    entries = _parse_table_of_contents(description)
+    get_table_of_contents.cache[video['id']] = {
+        "hash": digest,
+        "entries": entries
+    }
+
+    return entries
+
+
+def _parse_table_of_contents(description):
+    return [(timecode, text, __convert_timecode(timecode))
+            for timecode, text in _toc_regex.findall(description)]
 
 
 def select_timecode(video, callback, show_back=False, placeholder=None):
@@ -403,29 +573,63 @@ def undotty_data(data):
     return data
 
 
+def clone_data(data):
+    """
+    Given any piece of data, return back a deep copy of it in which any Dotty
+    dictionaries that the data might contain have been unwrapped. Unlike
+    undotty_data(), the data provided is not modified.
+    """
+    if isinstance(data, dotty.Dotty):
+        data = data.to_dict()
+
+    if isinstance(data, dict):
+        return {key: clone_data(value) for key, value in data.items()}
+
+    if isinstance(data, list):
+        return [clone_data(value) for value in data]
+
+    return data
+
+
 ## ----------------------------------------------------------------------------
 
 
 class BusySpinner():
     """
-    A simple busy spinner in the status bar of a window. It follows the active
-    view in the provided window, so you can move around and still track status.
+    A simple busy spinner in the status bar. It follows the active view, so you
+    can move around and still track status.
 
     The spinner can be started and stopped explicitly or used as a context
-    manager.
+    manager; while it's running, progress() can be used to say how far along
+    the operation is, which is displayed as counts next to the spinner.
+
+    All running spinners share a single entry in the status bar that a single
+    timer keeps up to date, so that several operations in flight at once don't
+    fight over the status bar.
     """
     width = 5
 
-    def __init__(self, prefix, window=None, time=False):
-        self.window = window or sublime.active_window()
+    # The status key that all spinners share.
+    key = "__youtube_editor_busy"
+
+    # The spinners that are currently running in the order they started, and
+    # the state of the shared timer that displays them.
+    running_spinners = []
+    lock = Lock()
+    ticking = False
+    tick_view = None
+
+    def __init__(self, prefix, time=False):
         self.prefix = prefix
-        self.key = "__%s" % uuid4()
-        self.tick_view = None
         self.running = False
         self.time = time
+        self.done = None
+        self.total = None
+        self.what = None
 
     def __enter__(self):
         self.start()
+        return self
 
     def __exit__(self, type, value, traceback):
         self.stop()
@@ -437,44 +641,82 @@ class BusySpinner():
         self.running = True
         if self.time:
             self.start_time = timer()
-        sublime.set_timeout(lambda: self.update(0), 100)
+
+        with BusySpinner.lock:
+            BusySpinner.running_spinners.append(self)
+            if not BusySpinner.ticking:
+                BusySpinner.ticking = True
+                sublime.set_timeout(lambda: BusySpinner.update(0), 100)
 
     def stop(self):
         self.running = False
 
+        with BusySpinner.lock:
+            if self in BusySpinner.running_spinners:
+                BusySpinner.running_spinners.remove(self)
+
         if self.time:
             from . import log
 
             stop = timer()
             log("DBG: {0} took {1:.3f}s", self.prefix, stop - self.start_time)
 
-    def update(self, tick):
-        current_view = self.window.active_view()
-
-        if self.tick_view is not None and current_view != self.tick_view:
-            self.tick_view.erase_status(self.key)
-            self.tick_view = None
-
-        if not self.running:
-            current_view.erase_status(self.key)
-            return
+    def progress(self, done, total=None, what=None):
+        """
+        Say how far along the operation is; done is how many things have been
+        done out of total (if it's known), and what optionally says what the
+        things are.
+        """
+        self.done = done
+        self.total = total
+        self.what = what
+
+    def status_text(self):
+        text = self.prefix
+        if self.what is not None:
+            text += ": " + self.what
+
+        if self.done is not None:
+            text += " {0}".format(self.done)
+            if self.total is not None:
+                text += "/{0}".format(self.total)
+
+        return text
+
+    @classmethod
+    def update(cls, tick):
+        window = sublime.active_window()
+        current_view = window.active_view() if window is not None else None
+
+        if cls.tick_view is not None and current_view != cls.tick_view:
+            cls.tick_view.erase_status(cls.key)
+            cls.tick_view = None
+
+        with cls.lock:
+            spinners = list(cls.running_spinners)
+            if not spinners:
+                cls.ticking = False
+                if current_view is not None:
+                    current_view.erase_status(cls.key)
+                return
 
         # We need twice as many ticks as the width due to oscillation
-        tick = tick % (2 * self.width)
+        tick = tick % (2 * cls.width)
 
         # Space to the left and right; once we hit half the width, go back the
         # other way.
-        left = min(tick, (2 * self.width - tick))
-        right = self.width - left
+        left = min(tick, (2 * cls.width - tick))
+        right = cls.width - left
 
-        # print(tick, left, right)
-        text = "{} [{}={}]".format(self.prefix, " " * left, " " * right)
+        text = "{} [{}={}]".format(", ".join(s.status_text() for s in spinners),
+                                   " " * left, " " * right)
 
-        current_view.set_status(self.key, text)
-        if self.tick_view is None:
-            self.tick_view = current_view
+        if current_view is not None:
+            current_view.set_status(cls.key, text)
+            if cls.tick_view is None:
+                cls.tick_view = current_view
 
-        sublime.set_timeout(lambda: self.update(tick + 1), 100)
+        sublime.set_timeout(lambda: cls.update(tick + 1), 100)
 
 
 ## ----------------------------------------------------------------------------
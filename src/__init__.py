@@ -31,11 +31,19 @@ __all__ = [
     "YoutubeEditorClearLogCommand",
     "YoutubeEditorFlushCacheCommand",
     "YoutubeEditorMissingContentsCommand",
+    "YoutubeEditorFindVideoCommand",
+    "YoutubeEditorAuditVideosCommand",
+    "YoutubeEditorBulkEditCommand",
+    "YoutubeEditorResumeUpdatesCommand",
+    "YoutubeEditorRequestLatencyCommand",
+    "YoutubeEditorSelectChannelCommand",
+    "YoutubeEditorLoadTimeCommand",
 
     # Events
     "YoutubeTitleEventListener",
     "YoutubeBodyEventListener",
     "YoutubeTagsEventListener",
+    "YoutubeTextChangeListener",
     "YouTubeVideoReportEventListener",
     "GlobalYouTubeEventListener"
 ]
\ No newline at end of file
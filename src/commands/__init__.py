@@ -5,7 +5,9 @@ reload("src.commands", ["authorize", "logout", "get_video_link",
                         "get_camtasia_toc", "copy_video_link", "edit_in_studio",
                         "view_video_link", "clear_log", "flush_cache",
                         "missing_toc_util", "commit_video_details",
-                        "open_url"])
+                        "open_url", "find_video", "audit_videos",
+                        "bulk_edit", "request_latency", "select_channel",
+                        "load_time"])
 
 from .authorize import YoutubeEditorAuthorizeCommand
 from .logout import YoutubeEditorLogoutCommand
@@ -22,6 +24,13 @@ from .open_url import YoutubeEditorOpenUrlCommand
 from .clear_log import YoutubeEditorClearLogCommand
 from .flush_cache import YoutubeEditorFlushCacheCommand
 from .missing_toc_util import YoutubeEditorMissingContentsCommand
+from .find_video import YoutubeEditorFindVideoCommand
+from .audit_videos import YoutubeEditorAuditVideosCommand
+from .bulk_edit import YoutubeEditorBulkEditCommand
+from .bulk_edit import YoutubeEditorResumeUpdatesCommand
+from .request_latency import YoutubeEditorRequestLatencyCommand
+from .select_channel import YoutubeEditorSelectChannelCommand
+from .load_time import YoutubeEditorLoadTimeCommand
 
 __all__ = [
     # Authorize and Deauthorize the plugin for YouTube
@@ -35,6 +44,16 @@ __all__ = [
     "YoutubeEditorCommitDetailsCommand",
     "YoutubeEditorOpenUrlCommand",
 
+    # Choose the channel to work with, when there is more than one
+    "YoutubeEditorSelectChannelCommand",
+
+    # Search the cached videos and act on one of them
+    "YoutubeEditorFindVideoCommand",
+
+    # Change many videos at once
+    "YoutubeEditorBulkEditCommand",
+    "YoutubeEditorResumeUpdatesCommand",
+
     # Open a new window with video details
     "YoutubeEditorNewWindowCommand",
 
@@ -58,4 +77,7 @@ __all__ = [
 
     # Utility commands
     "YoutubeEditorMissingContentsCommand",
+    "YoutubeEditorAuditVideosCommand",
+    "YoutubeEditorRequestLatencyCommand",
+    "YoutubeEditorLoadTimeCommand",
 ]
\ No newline at end of file
@@ -0,0 +1,75 @@
+import sublime
+import sublime_plugin
+
+from timeit import default_timer as timer
+
+from .. import core
+from ..core import YoutubeRequest
+from ...lib import log, yte_syntax, get_report_view, add_report_text
+from ...lib import video_sort, view_state
+
+
+###----------------------------------------------------------------------------
+
+
+class YoutubeEditorAuditVideosCommand(YoutubeRequest, sublime_plugin.ApplicationCommand):
+    """
+    This command will run all of the audit rules over every video on the
+    channel, and display the videos that break any of the rules along with the
+    problems into a report so that they can be fixed up.
+
+    The report fills in as the audit progresses; auditing the same videos a
+    second time only needs to check the videos that changed in between. The
+    query argument limits the audit to the videos that match a video query;
+    an empty query prompts for one. With the all_channels argument, the
+    audit covers the videos of all of the channels of the user.
+    """
+    def _authorized(self, request, result):
+        self.request_uploads()
+
+    def _playlist_contents(self, request, result):
+        self.window = sublime.active_window()
+        self.view = get_report_view(self.window, "Video Audit",
+                                    yte_syntax("YouTubeAudit"))
+        add_report_text(["Video Audit Findings",
+                         "--------------------\n"], view=self.view, window=self.window)
+
+        self.video_ids = []
+        self.video_info = {}
+        self.start_time = timer()
+
+        core.auditEngine.audit(video_sort(result, 'snippet.title'),
+            lambda r: sublime.set_timeout(lambda: self.add_findings(r)),
+            lambda t, a: sublime.set_timeout(lambda: self.audit_done(t, a)))
+
+    def add_findings(self, results):
+        content = []
+        for video, findings in results:
+            content.append(video['snippet.title'])
+            content.extend("  - [{0}] {1}".format(rule, problem)
+                           for rule, problem in findings)
+
+            self.video_ids.append(video['id'])
+            self.video_info[video['id']] = video
+
+        if content:
+            add_report_text(content + [""], view=self.view, window=self.window)
+
+    def audit_done(self, total, audited):
+        # Include information on the video ID's and a lookup table for videos
+        # that are contained in the report, so that we can look them up later.
+        state = view_state(self.view)
+        state["video_ids"] = self.video_ids
+        state["videos"] = self.video_info
+
+        self.view.settings().set("_yte_video_ids", self.video_ids)
+
+        log("PKG: Audited {0} videos ({1} checked, {2} unchanged) in {3:.3f}s; {4} have problems",
+            total, audited, total - audited, timer() - self.start_time,
+            len(self.video_ids))
+
+        if not self.video_ids:
+            sublime.message_dialog("All videos passed the audit!")
+
+
+###----------------------------------------------------------------------------
@@ -0,0 +1,158 @@
+import sublime
+import sublime_plugin
+
+from .. import core
+from ..core import YoutubeRequest
+from ...lib import log, get_report_view, add_report_text, video_sort
+from ...lib import bulk_edit_fields, make_bulk_transform, make_bulk_details
+
+
+###----------------------------------------------------------------------------
+
+
+# The syntax used to display the preview of a bulk edit.
+_DIFF_SYNTAX = "Packages/Diff/Diff.sublime-syntax"
+
+
+###----------------------------------------------------------------------------
+
+
+class YoutubeEditorBulkEditCommand(YoutubeRequest, sublime_plugin.ApplicationCommand):
+    """
+    This command changes one field (the title, description or tags) of every
+    video on the channel at once, either by replacing every match of a regular
+    expression or by generating new text from a template.
+
+    The videos that would change are shown in a report along with a diff of
+    each change, and the updates are only sent to YouTube once they have been
+    approved. Any that can't be sent (for example when the API quota runs out)
+    can be sent later via youtube_editor_resume_updates.
+
+    The query argument limits the edit to the videos that match a video
+    query, and the all_channels and channel_id arguments choose the channels
+    whose videos are edited; see YoutubeRequest.request_uploads(). Any of the
+    other arguments that are not given are prompted for.
+    """
+    def run(self, field=None, find=None, replace=None, template=None, query=None,
+            **kwargs):
+        if field is None:
+            fields = bulk_edit_fields()
+            return sublime.active_window().show_quick_panel(fields,
+                lambda idx: idx >= 0 and self.run(fields[idx], find, replace,
+                                                  template, query, **kwargs),
+                placeholder="Field to bulk edit")
+
+        if find is None and template is None:
+            return sublime.active_window().show_input_panel(
+                "Find (regex; leave empty to use a template):", "",
+                lambda text: self.get_replacement(field, text, query, **kwargs),
+                None, None)
+
+        try:
+            self.transform = make_bulk_transform(field, find, replace, template)
+        except ValueError as err:
+            return log("Err: bulk edit: {0}", err, display=True)
+
+        self.field = field
+        super().run(query=query, **kwargs)
+
+    def get_replacement(self, field, find, query, **kwargs):
+        if find:
+            sublime.active_window().show_input_panel("Replace with:", "",
+                lambda text: self.run(field, find, text, query=query, **kwargs),
+                None, None)
+        else:
+            sublime.active_window().show_input_panel(
+                "Template ({value}, {id}, {title}, {description}, {tags}):",
+                "{value}", lambda text: self.run(field, template=text, query=query,
+                                                 **kwargs),
+                None, None)
+
+    def _authorized(self, request, result):
+        self.request_uploads()
+
+    def _playlist_contents(self, request, result):
+        self.window = sublime.active_window()
+        self.view = get_report_view(self.window, "Bulk Edit Preview", _DIFF_SYNTAX)
+        add_report_text(["Bulk Edit Preview ({0})".format(self.field),
+                         "-----------------\n"], view=self.view, window=self.window)
+
+        self.changes = []
+
+        core.bulkPlanner.plan(video_sort(result, 'snippet.title'), self.field,
+            self.transform,
+            lambda c: sublime.set_timeout(lambda: self.add_changes(c)),
+            lambda e: sublime.set_timeout(lambda: self.plan_done(e)))
+
+    def add_changes(self, changes):
+        content = []
+        for video, new_text, diff in changes:
+            content.append("{0} ({1})".format(video['snippet.title'], video['id']))
+            content.extend(diff)
+            content.append("")
+
+            self.changes.append((video, new_text))
+
+        if content:
+            add_report_text(content, view=self.view, window=self.window)
+
+    def plan_done(self, errors):
+        if errors:
+            add_report_text(["Errors:"] + ["  - {0}: {1}".format(video['id'], err)
+                            for video, err in errors], view=self.view, window=self.window)
+
+        log("PKG: Bulk edit would change {0} video(s); {1} error(s)",
+            len(self.changes), len(errors))
+
+        if not self.changes:
+            return sublime.message_dialog("The bulk edit does not change any videos")
+
+        msg = "Update the {0} of {1} video(s) as shown in the preview?".format(
+            self.field, len(self.changes))
+        if not sublime.ok_cancel_dialog(msg, "Update Videos"):
+            return
+
+        updates = [(video['id'], make_bulk_details(video, self.field, new_text))
+                   for video, new_text in self.changes]
+        self.request("bulk_update", reason="Update videos", updates=updates)
+
+    def _bulk_update(self, request, result):
+        report_bulk_update(result)
+
+
+###----------------------------------------------------------------------------
+
+
+class YoutubeEditorResumeUpdatesCommand(YoutubeRequest, sublime_plugin.ApplicationCommand):
+    """
+    This command sends any video updates from a previous bulk edit that could
+    not be sent at the time, for example because the API quota ran out.
+    """
+    def _authorized(self, request, result):
+        self.request("bulk_update", reason="Update videos")
+
+    def _bulk_update(self, request, result):
+        report_bulk_update(result)
+
+
+###----------------------------------------------------------------------------
+
+
+def report_bulk_update(result):
+    """
+    Tell the user the outcome of a bulk_update request.
+    """
+    for video_id, err in result["failed"]:
+        log("Err: Could not update video {0}: {1}", video_id, err)
+
+    msg = "Updated {0} video(s); {1} failed".format(result["updated"],
+                                                      len(result["failed"]))
+    if result["pending"]:
+        msg += "; {0} could not be sent yet and can be resumed later".format(
+            result["pending"])
+
+    log("PKG: {0}", msg, display=bool(result["failed"] or result["pending"]))
+    sublime.status_message(msg)
+
+
+###----------------------------------------------------------------------------
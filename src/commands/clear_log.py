@@ -1,7 +1,6 @@
-import sublime
 import sublime_plugin
 
-from ...lib import setup_log_panel
+from ...lib import clear_log
 
 
 ###----------------------------------------------------------------------------
@@ -12,8 +11,7 @@ class YoutubeEditorClearLogCommand(sublime_plugin.ApplicationCommand):
     Clear the contents out of the YouTube log panel in all available windows.
     """
     def run(self):
-        for window in sublime.windows():
-            setup_log_panel(window)
+        clear_log()
 
 
 ###----------------------------------------------------------------------------
@@ -2,7 +2,16 @@ import sublime
 import sublime_plugin
 
 from ..core import YoutubeRequest
-from ...lib import log, undotty_data
+from ...lib import log, clone_data, view_state, window_state, content_digest
+from ...lib import changed_video_parts
+
+
+## ----------------------------------------------------------------------------
+
+
+# The number of API quota units that a video update costs; this is the same no
+# matter how many parts are being updated.
+_UPDATE_QUOTA_COST = 50
 
 
 ## ----------------------------------------------------------------------------
@@ -15,13 +24,16 @@ def _groups_have_changes(window, groups):
 
     This requires that the tracking variables that we use to know about changes
     in our scratch YouTubeEditor buffers have been set up.
+
+    This is called every time the commit command decides if it is enabled, so
+    the content of a view is only examined once for each change count.
     """
     if not isinstance(groups, list):
         groups = [groups]
 
     for group in groups:
         view = window.views_in_group(group)[0]
-        settings = view.settings()
+        state = view_state(view)
 
         # Never allow an empty view to count as changes, so we don't clobber
         # data with nothing.
@@ -29,20 +41,48 @@ def _groups_have_changes(window, groups):
             return False
 
         # If the change count is the same, we're good.
-        if view.change_count() == settings.get("_yte_change_count", -1):
+        change_count = view.change_count()
+        if change_count == state.get("change_count", -1):
             continue
 
-        # If the content is the same, we're good (but update the stored change
-        # count so we don't need to do this next time).
-        elif view.substr(sublime.Region(0, len(view))) == settings.get("_yte_content"):
-            settings.set("_yte_change_count", view.change_count())
-            continue
+        # If we already compared the content at this change count, use that
+        # result; otherwise compare the digest of the content against the one
+        # for the last committed content and remember the result.
+        checked = state.get("checked")
+        if checked is None or checked[0] != change_count:
+            content = view.substr(sublime.Region(0, len(view)))
+            checked = (change_count, content_digest(content) != state.get("digest"))
+            state["checked"] = checked
 
-        return True
+        if checked[1]:
+            return True
 
     return False
 
 
+def _restore_window_state(window, details):
+    """
+    Rebuild the state of the given YouTube editor window from the details of
+    the video it is editing, treating those details as what was last committed.
+
+    The state is not saved with the session, so windows that Sublime restores
+    when it starts have only the video ID in their settings to go on.
+    """
+    window_state(window)["details"] = details
+
+    bodies = [details['snippet.title'],
+              details['snippet.description'],
+              ','.join(details.get('snippet.tags', []))]
+
+    for group, body in enumerate(bodies):
+        view = window.views_in_group(group)[0]
+
+        state = view_state(view)
+        state["digest"] = content_digest(body)
+        state.pop("change_count", None)
+        state.pop("checked", None)
+
+
 ###----------------------------------------------------------------------------
 
 
@@ -51,22 +91,64 @@ class YoutubeEditorCommitDetailsCommand(YoutubeRequest,sublime_plugin.WindowComm
     This command is active only in a window that is a YouTube editor window
     that also has an associated video id and video details. It will attempt to
     shuttle changes made in this view up to YouTube.
-    """
-    part = "snippet,contentDetails,status,statistics"
 
+    Only the parts of the video details that were actually changed are sent;
+    if nothing changed compared to the details YouTube last gave us, no update
+    is made at all. If YouTube can't be reached, the changes are queued and
+    sent later in the background.
+    """
     def _authorized(self, request, result):
+        # Windows restored with the session have no state; get the details of
+        # the video again to rebuild it before trying to commit anything.
+        if window_state(self.window).get("details") is None:
+            return self.request("video_details", "_restored_details",
+                                video_id=self.window.settings().get("_yte_video_id"),
+                                refresh=True, reason="Get video details for restored window")
+
+        details = self.get_edited_details()
+        parts = changed_video_parts(window_state(self.window)["details"], details)
+
+        if not parts:
+            log("PKG: No changes to video details; skipped update (saved {0} quota units)",
+                _UPDATE_QUOTA_COST)
+            sublime.status_message("Video details are unchanged; nothing to update")
+            return self.update_stored_data(window_state(self.window)["details"])
+
+        log("PKG: Updating changed video details: {0}", ", ".join(parts))
+
+        update = {part: details[part] for part in parts}
+        update["id"] = details["id"]
+
         self.request("set_video_details",
-                     part=self.part,
-                     video_details=self.get_edited_details())
+                     part=",".join(parts),
+                     video_details=update)
+
+    def _restored_details(self, request, result):
+        # Videos that were deleted or made inaccessible aren't returned.
+        if not result:
+            return log("Err: video '{0}' no longer exists; unable to commit changes",
+                       request["video_id"], display=True)
+
+        _restore_window_state(self.window, result[0])
+
+        if not _groups_have_changes(self.window, [0, 1, 2]):
+            return sublime.status_message("Video details are unchanged; nothing to update")
+
+        self._authorized(request, result)
 
     def _set_video_details(self, request, result):
         self.update_stored_data(result)
 
+        if request["queued"]:
+            log("PKG: YouTube is unavailable; video details will be sent later")
+            return sublime.status_message("Video details queued; they will be sent when possible")
+
         log("PKG: Video details saved!")
         sublime.status_message("Video details successfully updated!")
 
     def get_edited_details(self):
-        details = self.window.settings().get("_yte_video_details")
+        # The stored details are the cached video data, so edit a copy.
+        details = clone_data(window_state(self.window)["details"])
 
         details['snippet']['title'] = self.get_new_data(0)
         details['snippet']['description'] = self.get_new_data(1)
@@ -77,12 +159,15 @@ class YoutubeEditorCommitDetailsCommand(YoutubeRequest,sublime_plugin.WindowComm
         return details
 
     def update_stored_data(self, result):
-        self.window.settings().set("_yte_video_details", undotty_data(result))
+        window_state(self.window)["details"] = result
 
         for group in range(3):
             view = self.window.views_in_group(group)[0]
-            view.settings().set("_yte_change_count", view.change_count())
-            view.settings().set("_yte_content", view.substr(sublime.Region(0, len(view))))
+
+            state = view_state(view)
+            state["change_count"] = view.change_count()
+            state["digest"] = content_digest(view.substr(sublime.Region(0, len(view))))
+            state.pop("checked", None)
 
     def get_new_data(self, group):
         view = self.window.views_in_group(group)[0]
@@ -90,10 +175,13 @@ class YoutubeEditorCommitDetailsCommand(YoutubeRequest,sublime_plugin.WindowComm
 
     def is_enabled(self):
         s = self.window.settings()
+        # Without any state, whether there are changes can't be known until
+        # the state is restored; see _authorized().
+        state = window_state(self.window, create=False)
         return (s.get("_yte_youtube_window", False) and
                 s.get("_yte_video_id") is not None and
-                s.get("_yte_video_details") is not None and
-                _groups_have_changes(self.window, [0, 1, 2]))
+                (state is None or state.get("details") is None or
+                 _groups_have_changes(self.window, [0, 1, 2])))
 
 
 ## ----------------------------------------------------------------------------
@@ -1,11 +1,9 @@
 import sublime
 import sublime_plugin
 
-import base64
-import requests
-
+from .. import core
 from ..core import YouTubeVideoSelect
-from ...lib import select_video, undotty_data
+from ...lib import select_video, window_state
 
 
 ###----------------------------------------------------------------------------
@@ -18,7 +16,8 @@ class YoutubeEditorEditVideoDetailsCommand(YouTubeVideoSelect, sublime_plugin.Ap
 
     The arguments by_tags and by_playlists control how the browse works; if
     provided, each one adds an extra layer of lookup to help drill down and
-    find the desired video.
+    find the desired video. The query argument limits the videos offered to
+    those that match a video query; an empty query prompts for one.
     """
     playlist_placeholder = "Edit Details: Select a playlist"
     tag_placeholder = "Edit Details: Browse by tag"
@@ -33,6 +32,7 @@ class YoutubeEditorEditVideoDetailsCommand(YouTubeVideoSelect, sublime_plugin.Ap
 
         self.use_tags = self.run_args.get("by_tags", False)
         self.use_playlists = self.run_args.get("by_playlists", False)
+        self.query = self.run_args.get("query")
 
         if self.video_id:
             self.request("video_details", video_id=self.video_id,
@@ -51,24 +51,23 @@ class YoutubeEditorEditVideoDetailsCommand(YouTubeVideoSelect, sublime_plugin.Ap
             'video_id': video["id"],
             'title': video["snippet.title"],
             'description': video["snippet.description"],
-            'tags': video.get("snippet.tags", []),
-            'details': undotty_data(video)
+            'tags': video.get("snippet.tags", [])
             })
 
-        img_uri = video['snippet.thumbnails.standard.url']
-        sublime.set_timeout_async(lambda: self.load_thumbnail(sublime.active_window(), img_uri))
+        # The new window is active once the command returns; keep a reference
+        # to the cached video details in its state.
+        window_state(sublime.active_window())["details"] = video
+
+        sublime.set_timeout_async(lambda: self.load_thumbnail(sublime.active_window(), video))
 
-    def load_thumbnail(self, window, img_uri):
-        try:
-            request = requests.get(img_uri, stream=True)
-            data_uri = ("data:" + request.headers['Content-Type'] + ";" +
-                "base64," + base64.b64encode(request.content).decode("utf-8"))
+    def load_thumbnail(self, window, video):
+        data_uri = core.thumbnailCache.thumbnail(video)
+        if data_uri is None:
+            return
 
-            prev_group = window.active_group()
-            window.new_html_sheet('Video Thumbnail', '<img src="%s" />' % data_uri, group=3)
-            window.focus_group(prev_group)
-        except:
-            pass
+        prev_group = window.active_group()
+        window.new_html_sheet('Video Thumbnail', '<img src="%s" />' % data_uri, group=3)
+        window.focus_group(prev_group)
 
 
 ###----------------------------------------------------------------------------
@@ -0,0 +1,82 @@
+import sublime
+import sublime_plugin
+
+from ..core import YoutubeRequest, prefetch_thumbnails
+from ...lib import log, select_video
+
+
+###----------------------------------------------------------------------------
+
+
+# The commands that can be run on the video that the user picks; the key is
+# the value of the action argument and the value is the command to run, which
+# is given the ID of the chosen video.
+_actions = {
+    "edit": "youtube_editor_edit_video_details",
+    "link": "youtube_editor_get_video_link",
+    "watch": "youtube_editor_view_video_link",
+    "studio": "youtube_editor_edit_in_studio"
+}
+
+
+###----------------------------------------------------------------------------
+
+
+class YoutubeEditorFindVideoCommand(YoutubeRequest, sublime_plugin.ApplicationCommand):
+    """
+    Prompt the user for some search text, and then display a list of all of
+    the cached videos whose title, description, tags or table of contents
+    match it. Choosing a video from the list performs the given action on it.
+
+    The search is performed entirely against the locally cached video data,
+    so no API calls are made and only videos that have previously been fetched
+    can be found.
+
+    The search argument is the text to search for; the user is prompted for
+    it when it's not given.
+    """
+    last_search = ""
+
+    def run(self, search=None, action="edit"):
+        # Searching doesn't need to talk to YouTube, so there's no need to
+        # authorize first.
+        self.run_args = {"search": search, "action": action}
+        self._authorized(None, None)
+
+    def _authorized(self, request, result):
+        search = self.run_args.get("search")
+        if search is not None:
+            return self.search(search)
+
+        sublime.active_window().show_input_panel("Find video:",
+            YoutubeEditorFindVideoCommand.last_search, self.search, None, None)
+
+    def search(self, search):
+        YoutubeEditorFindVideoCommand.last_search = search
+        self.request("search_videos", search=search, reason="Search videos")
+
+    def _search_videos(self, request, result):
+        if not result:
+            return sublime.status_message("No cached videos match '%s'" % request["search"])
+
+        select_video(result, self.pick_video,
+                     placeholder="Find Video: matches for '%s'" % request["search"],
+                     on_highlight=prefetch_thumbnails)
+
+    def pick_video(self, video):
+        if video is None:
+            return
+
+        action = self.run_args.get("action")
+        command = _actions.get(action)
+        if command is None:
+            return log("Err: unknown find video action '{0}'", action, display=True)
+
+        args = {"video_id": video['id']}
+        if action == "watch":
+            sublime.active_window().active_view().run_command(command, args)
+        else:
+            sublime.run_command(command, args)
+
+
+###----------------------------------------------------------------------------
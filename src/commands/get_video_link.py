@@ -16,7 +16,8 @@ class YoutubeEditorGetVideoLinkCommand(YouTubeVideoSelect, sublime_plugin.Applic
 
     The arguments by_tags and by_playlists control how the browse works; if
     provided, each one adds an extra layer of lookup to help drill down and
-    find the desired video.
+    find the desired video. The query argument limits the videos offered to
+    those that match a video query; an empty query prompts for one.
     """
     playlist_placeholder = "Get Link: Select a playlist"
     tag_placeholder = "Get Link: Browse by tag"
@@ -0,0 +1,45 @@
+import sublime_plugin
+
+from ...editor import reload
+from ...lib import add_report_text
+
+
+###----------------------------------------------------------------------------
+
+
+def _load_time_report(times):
+    """
+    Return back a list of lines that break down how long each of the modules
+    of the package took to load, given the load times that were recorded
+    while loading them (see reload() in editor.py). Modules are listed in the
+    order they were loaded, indented under the module that loaded them.
+    """
+    total = sum(seconds or 0 for module, depth, seconds in times if depth == 0)
+
+    lines = ["Package loaded in {0:.1f}ms".format(total * 1000), ""]
+
+    for module, depth, seconds in times:
+        lines.append("{0:<52} {1:>9}".format("  " * depth + module,
+            "?" if seconds is None else "{0:.1f}ms".format(seconds * 1000)))
+
+    return lines
+
+
+###----------------------------------------------------------------------------
+
+
+class YoutubeEditorLoadTimeCommand(sublime_plugin.ApplicationCommand):
+    """
+    Display a report that breaks down how long each of the modules of the
+    package took to load the last time the plugin was loaded or reloaded, so
+    that the cost of loading the package is visible. Loading that takes too
+    long is also logged when the package loads.
+    """
+    def run(self):
+        add_report_text(["Package Load Time",
+                         "-----------------\n"] +
+                        _load_time_report(reload.times),
+                        caption="Package Load Time")
+
+
+###----------------------------------------------------------------------------
@@ -3,7 +3,7 @@ import sublime_plugin
 
 from ..core import YoutubeRequest
 from ...lib import yte_syntax, add_report_text, get_table_of_contents
-from ...lib import video_sort, make_studio_edit_link, undotty_data
+from ...lib import video_sort, make_studio_edit_link, view_state
 
 
 ###----------------------------------------------------------------------------
@@ -14,14 +14,13 @@ class YoutubeEditorMissingContentsCommand(YoutubeRequest,sublime_plugin.Applicat
     This command will determine which videos on the channel don't have any
     table of contents in them and display them into a report so that they can
     be edited and have contents added to them.
+
+    The query argument limits the report to the videos that match a video
+    query; an empty query prompts for one. With the all_channels argument, the
+    report covers the videos of all of the channels of the user.
     """
     def _authorized(self, request, result):
-        self.request("channel_list", reason="Get Channel Info")
-
-    def _channel_list(self, request, result):
-        self.channel = result[0]
-        self.request("playlist_contents", reason="Get uploaded videos",
-                    playlist_id=self.channel['contentDetails.relatedPlaylists.uploads'])
+        self.request_uploads()
 
     def _playlist_contents(self, request, result):
         missing = [v for v in video_sort(result, 'snippet.title') if not get_table_of_contents(v)]
@@ -39,8 +38,11 @@ class YoutubeEditorMissingContentsCommand(YoutubeRequest,sublime_plugin.Applicat
 
         # Include information on the video ID's and a lookup table for videos
         # that are contained in the report, so that we can look them up later.
-        panel.settings().set("_yte_video_ids", [v['id'] for v in missing])
-        panel.settings().set("_yte_video_info", {v['id']: undotty_data(v) for v in missing})
+        state = view_state(panel)
+        state["video_ids"] = [v['id'] for v in missing]
+        state["videos"] = {v['id']: v for v in missing}
+
+        panel.settings().set("_yte_video_ids", state["video_ids"])
 
 
 ###----------------------------------------------------------------------------
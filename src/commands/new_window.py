@@ -2,7 +2,8 @@ import sublime
 import sublime_plugin
 
 from ..core import YoutubeRequest
-from ...lib import yte_syntax
+from ..events import track_changes
+from ...lib import yte_syntax, view_state, window_state, content_digest
 
 
 ###----------------------------------------------------------------------------
@@ -31,6 +32,10 @@ class YoutubeEditorNewWindowCommand(sublime_plugin.WindowCommand):
 
     The command can optionally also pre-populate the information for any of the
     views, and will mark itself with the video ID as well if one is given.
+
+    Video details passed in the arguments are stored in the window state;
+    callers that already have the details should leave them out and store them
+    in the window state of the new window directly, to avoid copying them.
     """
     def run(self, video_id=None, title='', description='', tags=[], details=None):
         if isinstance(tags, str):
@@ -47,7 +52,7 @@ class YoutubeEditorNewWindowCommand(sublime_plugin.WindowCommand):
             new_window.settings().set("_yte_video_id", video_id)
 
         if details is not None:
-            new_window.settings().set("_yte_video_details", details)
+            window_state(new_window)["details"] = details
 
         details = [
             {
@@ -79,13 +84,20 @@ class YoutubeEditorNewWindowCommand(sublime_plugin.WindowCommand):
             view.set_scratch(True)
             view.set_name(info["name"])
 
-            view.run_command('append', {'characters': info["body"]})
-
+            # Apply the settings before adding the content, so the listeners
+            # for the view are attached and validate it as it is populated.
             view.settings().set(info["setting"], True)
             view.settings().set("context_menu", info["menu"])
             view.settings().set('youtube_view', True)
-            view.settings().set("_yte_content", info["body"])
-            view.settings().set("_yte_change_count", view.change_count())
+
+            if info["setting"] != '_yte_video_title':
+                track_changes(view)
+
+            view.run_command('append', {'characters': info["body"]})
+
+            state = view_state(view)
+            state["digest"] = content_digest(info["body"])
+            state["change_count"] = view.change_count()
 
 
 
@@ -18,8 +18,11 @@ class YoutubeEditorOpenUrlCommand(YoutubeRequest, sublime_plugin.ApplicationComm
         self.request("channel_list")
 
     def _channel_list(self, request, result):
+        self.select_channel(result, self.open_channel_url)
+
+    def open_channel_url(self, channel):
         variables = {
-            "channel_id": result[0]['id']
+            "channel_id": channel['id']
         }
         url = sublime.expand_variables(self.run_args.get("url", ""), variables)
         if url:
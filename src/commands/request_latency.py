@@ -0,0 +1,38 @@
+import sublime
+import sublime_plugin
+
+import os
+
+from .. import core
+from ...lib import log, add_report_text
+
+
+###----------------------------------------------------------------------------
+
+
+class YoutubeEditorRequestLatencyCommand(sublime_plugin.ApplicationCommand):
+    """
+    Display a report that breaks down how long the most recent requests to the
+    network thread took, by request type and by each part of handling them
+    (waiting in the queue, cache lookups and loads, API calls, saving the
+    cache and delivering the result); each is given as a count, p50 and p95.
+
+    When export is set, the traces are also written as JSON lines to a file
+    in the Sublime cache folder, which is opened.
+    """
+    def run(self, export=False):
+        lines = core.netManager.latency_report()
+        if not lines:
+            return sublime.message_dialog("No requests have been traced yet")
+
+        add_report_text(["Request Latency",
+                         "---------------\n"] + lines, caption="Request Latency")
+
+        if export:
+            filename = os.path.join(sublime.cache_path(), "YouTubeEditorTraces.jsonl")
+            core.netManager.export_traces(filename)
+            log("PKG: Exported request traces to {0}", filename)
+            sublime.active_window().open_file(filename)
+
+
+###----------------------------------------------------------------------------
@@ -0,0 +1,32 @@
+import sublime_plugin
+
+from .. import core
+from ..core import YoutubeRequest
+from ...lib import log, select_channel
+
+
+###----------------------------------------------------------------------------
+
+
+class YoutubeEditorSelectChannelCommand(YoutubeRequest, sublime_plugin.ApplicationCommand):
+    """
+    Prompt the user to choose which of their channels the other commands work
+    on, for users that have more than one; the choice lasts until Sublime is
+    restarted or another channel is chosen.
+    """
+    def _authorized(self, request, result):
+        self.request("channel_list", reason="Get Channel Info", refresh=True)
+
+    def _channel_list(self, request, result):
+        select_channel(result, self.pick_channel,
+                       placeholder="Select the channel to work with")
+
+    def pick_channel(self, channel):
+        if channel is not None:
+            core.selectedChannel = channel['id']
+            log("PKG: Working with channel '{0}' ({1})",
+                channel.get('brandingSettings.channel.title') or channel['snippet.title'],
+                channel['id'], display=True)
+
+
+###----------------------------------------------------------------------------
@@ -5,15 +5,21 @@ import os
 
 from ..lib import log, setup_log_panel, yte_setting, dotty
 from ..lib import select_video, select_playlist, select_tag, select_timecode
+from ..lib import select_channel
 from ..lib import Request, NetworkManager, stored_credentials_path, video_sort
+from ..lib import AuditEngine, BulkEditPlanner, ThumbnailCache
+from ..editor import reload
 
-# TODO:
-#  - Hit the keyword in the first few lines and 2-3 times total
+# TODO: The following are enforced by the rules in lib/audit.py, except where
+#       noted:
+#  - Hit the keyword in the first few lines and 2-3 times total (only the
+#    first few lines are currently checked)
 #  - The first few lines (how much?) are shown above the fold
 #  - Tags is 500 characters long, no more than 30 characters per tag
 #  - Tags with spaces may count as having a length + 2 because internally
 #    they're wrapped in quotes and that counts against the length
 #  - Tags should include brand related and channel tags for more relvance
+#    (not checked)
 #  - Chapters: first must be at 0:00; there has to be at least 3 in ascending
 #    order, and the minimum length of a chapter is 10 seconds. There is no
 #    official doc on what the text should look like, but observably it seems to
@@ -28,6 +34,28 @@ from ..lib import Request, NetworkManager, stored_credentials_path, video_sort
 # Our global network manager object
 netManager = None
 
+# Our global video audit engine object
+auditEngine = None
+
+# Our global bulk edit planner object
+bulkPlanner = None
+
+# Our global video thumbnail cache object
+thumbnailCache = None
+
+# The ID of the channel that the user last chose to work with, if they have
+# more than one; commands use this channel without asking again.
+selectedChannel = None
+
+# How many videos past the one that is highlighted in a list of videos have
+# their thumbnails prefetched, on the assumption they might be opened next.
+_PREFETCH_COUNT = 5
+
+# How long in seconds the modules of the package should take to load; when
+# loading takes longer than this, a warning is logged. Anything that is slow to
+# import should be imported when it's first needed instead.
+_LOAD_TIME_BUDGET = 0.1
+
 
 ###----------------------------------------------------------------------------
 
@@ -64,11 +92,18 @@ def loaded():
     Initialize our plugin state on load.
     """
     global netManager
+    global auditEngine
+    global bulkPlanner
+    global thumbnailCache
 
     for window in sublime.windows():
         setup_log_panel(window)
 
-    log("PKG: YouTubeEditor loaded")
+    load_time = sum(seconds or 0 for module, depth, seconds in reload.times if depth == 0)
+    log("PKG: YouTubeEditor loaded in {0:.1f}ms", load_time * 1000)
+    if load_time > _LOAD_TIME_BUDGET:
+        log("PKG: Loading took longer than {0:.0f}ms; see the Package Load Time Report",
+            _LOAD_TIME_BUDGET * 1000)
 
     yte_setting.obj = sublime.load_settings("YouTubeEditor.sublime-settings")
     yte_setting.default = {
@@ -80,6 +115,16 @@ def loaded():
         "cache_downloaded_data": True,
         "encrypt_cache": False,
 
+        "bulk_update_workers": 4,
+        "bulk_update_rate": 5,
+        "update_retry_interval": 60,
+
+        "channel_fetch_workers": 4,
+
+        "thumbnail_cache_size": 50,
+
+        "api_endpoint": "",
+
         "client_id": "",
         "client_secret": "",
         "auth_uri": "",
@@ -87,6 +132,11 @@ def loaded():
     }
 
     netManager = NetworkManager()
+    auditEngine = AuditEngine()
+    bulkPlanner = BulkEditPlanner()
+    thumbnailCache = ThumbnailCache(
+        os.path.join(sublime.cache_path(), "YouTubeEditorThumbnails"),
+        yte_setting("thumbnail_cache_size") * 1024 * 1024)
 
 
 def unloaded():
@@ -94,11 +144,26 @@ def unloaded():
     Clean up plugin state on unload.
     """
     global netManager
+    global auditEngine
+    global bulkPlanner
+    global thumbnailCache
 
     if netManager is not None:
         netManager.shutdown()
         netManager = None
 
+    if auditEngine is not None:
+        auditEngine.shutdown()
+        auditEngine = None
+
+    if bulkPlanner is not None:
+        bulkPlanner.shutdown()
+        bulkPlanner = None
+
+    if thumbnailCache is not None:
+        thumbnailCache.shutdown()
+        thumbnailCache = None
+
 
 def youtube_has_credentials():
     """
@@ -119,6 +184,16 @@ def youtube_is_authorized():
     return netManager.is_authorized()
 
 
+def prefetch_thumbnails(videos, index=0):
+    """
+    Prefetch the thumbnails of the video at the given index in the list of
+    videos and the few that follow it, since those are the videos that the
+    user is most likely to open next.
+    """
+    if thumbnailCache is not None:
+        thumbnailCache.prefetch(videos[index:index + _PREFETCH_COUNT + 1])
+
+
 def youtube_request(request, handler, reason, callback, **kwargs):
     """
     Dispatch a request to collect data from YouTube, invoking the given
@@ -139,6 +214,12 @@ class YoutubeRequest():
     A request can be made via the `request()` method, and the result will
     be automatically directed to a method in the class. The default handler
     is the name of the request preceeded by an underscore.
+
+    Commands that take a video query (see VideoQuery) in a query argument
+    prompt the user for one if the argument is an empty string.
+
+    Commands that work on a channel use select_channel() to pick which one;
+    this uses the channel_id argument of the command, if any.
     """
     auth_req = None
     auth_resp = None
@@ -146,6 +227,11 @@ class YoutubeRequest():
     run_args = None
 
     def run(self, **kwargs):
+        if kwargs.get("query") == "":
+            return sublime.active_window().show_input_panel("Video query:", "",
+                lambda text: YoutubeRequest.run(self, **dict(kwargs, query=text or None)),
+                None, None)
+
         self.run_args = kwargs
 
         if not youtube_is_authorized():
@@ -170,6 +256,57 @@ class YoutubeRequest():
         handler = getattr(self, attr)
         handler(request, result)
 
+    def select_channel(self, channels, callback):
+        """
+        Given the list of channels from a channel_list request, invoke the
+        callback with the one that the command should work on; this is the
+        channel given in the channel_id argument of the command, or the only
+        channel if there is only one, or the channel the user last chose.
+        Otherwise, the user is prompted to choose one, and the callback is not
+        invoked if they cancel.
+        """
+        channel_id = self.run_args.get("channel_id") or selectedChannel
+        channel = next((c for c in channels if c['id'] == channel_id), None)
+        if len(channels) == 1 or channel is not None:
+            return callback(channel or channels[0])
+
+        def pick(channel):
+            global selectedChannel
+            if channel is not None:
+                selectedChannel = channel['id']
+                callback(channel)
+
+        select_channel(channels, pick)
+
+    def request_uploads(self):
+        """
+        Request the videos uploaded to the channel that the command works on
+        (see select_channel()), or to all of the channels of the user if the
+        all_channels argument of the command is set. Either way the result is
+        handled by the _playlist_contents() handler, and any query argument
+        of the command is applied to the videos.
+        """
+        if self.run_args.get("all_channels"):
+            return self.request("channel_contents", "_all_uploads",
+                                reason="Get uploaded videos for all channels",
+                                query=self.run_args.get("query"))
+
+        self.request("channel_list", "_uploads_channel", reason="Get Channel Info")
+
+    def _uploads_channel(self, request, result):
+        def pick(channel):
+            self.channel = channel
+            self.request("playlist_contents", reason="Get uploaded videos",
+                         playlist_id=channel['contentDetails.relatedPlaylists.uploads'],
+                         query=self.run_args.get("query"))
+
+        self.select_channel(result, pick)
+
+    def _all_uploads(self, request, result):
+        self.channel = None
+        self._playlist_contents(request, [video for contents in result.values()
+                                          for video in contents["videos"]])
+
     def _error(self, request, result):
         log("Err: in '{0}': {2} (code={1})", request.name,
             result['error.code'], result['error.message'], display=True)
@@ -190,9 +327,10 @@ class YouTubeVideoSelect(YoutubeRequest):
     that the ultimate goal is to have the user select a video for some purpose.
 
     The sequence of items here is:
-        - Gather channel information
+        - Gather channel information and select a channel (if there are many)
         - Gather list of playlists and prompt (or; assume uploads playlist)
         - Gather contents of selected playlist
+        - Narrow the videos to those matching a query (optional based on args)
         - Prompt by tags on videos in the playlist (optional based on args)
         - Prompt for a video (either in the tags or in the playlist)
         - Prompt for a timecode in the video (if any)
@@ -215,13 +353,25 @@ class YouTubeVideoSelect(YoutubeRequest):
     video_tag_placeholder = None
     timecode_placeholder = None
 
+    # The key that sorted video lists and quick panel items for the playlist
+    # being browsed are memoized under; None if they are not memoized.
+    playlist_key = None
+
+    # The query that videos have to match to be offered, if any; this comes
+    # from the query argument of the command.
+    query = None
+
     def _authorized(self, request, result):
         self.use_tags = self.run_args.get("by_tags", False)
         self.use_playlists = self.run_args.get("by_playlists", False)
+        self.query = self.run_args.get("query")
         self.request("channel_list", reason="Get Channel Info")
 
     def _channel_list(self, request, result):
-        self.channel = result[0]
+        self.select_channel(result, self.pick_channel)
+
+    def pick_channel(self, channel):
+        self.channel = channel
 
         # Make a fake playlist from a template; populate it with the public
         # video count. The count will be adjusted later if/when the user
@@ -244,28 +394,40 @@ class YouTubeVideoSelect(YoutubeRequest):
                         placeholder=self.playlist_placeholder)
 
     def _playlist_contents(self, request, result):
-        if self.use_tags:
-            select_tag(result, self.pick_tag, show_back=self.use_playlists,
-                       placeholder=self.tag_placeholder)
-        else:
-            # If this is the uploads playlist, update the video count to
-            # include non-public videos.
-            if request["playlist_id"] == self.uploads_playlist['id']:
-                self.uploads_playlist['contentDetails.itemCount'] = len(result)
-
-            # Pass the video list as the tag_list to the lambda so it can be
-            # picked up and used again if the user goes back while editing the
-            # timecode.
-            videos = video_sort(result, "statistics.viewCount", int, True)
-            select_video(videos, lambda vid: self.select_video(vid, None, videos),
-                         show_back=self.use_playlists,
-                         placeholder=self.video_placeholder)
+        # If this is the uploads playlist, update the video count to include
+        # non-public videos.
+        if request["playlist_id"] == self.uploads_playlist['id']:
+            self.uploads_playlist['contentDetails.itemCount'] = len(result)
+
+        # Pass the video list as the tag_list to the lambda so it can be
+        # picked up and used again if the user goes back while editing the
+        # timecode.
+        # The network thread returns the videos sorted by view count.
+        videos = result
+        select_video(videos, lambda vid: self.select_video(vid, None, videos),
+                     show_back=self.use_playlists,
+                     placeholder=self.video_placeholder,
+                     on_highlight=prefetch_thumbnails,
+                     cache_key=self.playlist_key)
+
+    def _playlist_tags(self, request, result):
+        select_tag(None, self.pick_tag, show_back=self.use_playlists,
+                   tag_list=result, placeholder=self.tag_placeholder,
+                   cache_key=self.playlist_key)
 
     def pick_playlist(self, playlist):
         if playlist != None:
-            self.request("playlist_contents",
+            # Sorted video lists and quick panel items are memoized by the
+            # playlist (and tag) they came from.
+            self.playlist_key = ("playlist", playlist['id'], self.query)
+
+            # When browsing by tags, the network thread hands us back the tag
+            # index for the playlist instead of the contents.
+            self.request("playlist_tags" if self.use_tags else "playlist_contents",
                           reason="Get playlist contents",
-                          playlist_id=playlist['id'])
+                          playlist_id=playlist['id'],
+                          query=self.query,
+                          order=["-views"])
 
     def pick_tag(self, tag, tag_list):
         if tag is not None:
@@ -274,7 +436,9 @@ class YouTubeVideoSelect(YoutubeRequest):
                     return select_playlist(self.playlists, self.pick_playlist,
                                            placeholder=self.playlist_placeholder)
 
-            videos = video_sort(tag_list[tag], "statistics.viewCount", int, True)
+            tag_key = self.playlist_key and self.playlist_key + ("tag", tag)
+            videos = video_sort(tag_list[tag], "statistics.viewCount", int, True,
+                                cache_key=tag_key)
 
             # Use the default, unless we have a specific placeholder for this.
             placeholder = (None if not self.video_tag_placeholder else
@@ -283,7 +447,8 @@ class YouTubeVideoSelect(YoutubeRequest):
             # Video ID is in contentDetails.videoId for short results or id for
             # full details (due to it being a different type of request)
             select_video(videos, lambda vid: self.select_video(vid, tag, tag_list),
-                         show_back=True, placeholder=placeholder)
+                         show_back=True, placeholder=placeholder,
+                         on_highlight=prefetch_thumbnails, cache_key=tag_key)
 
     def select_video(self, video, tag, tag_list):
         if video is None:
@@ -294,7 +459,8 @@ class YouTubeVideoSelect(YoutubeRequest):
             # us back to tags first and from there to playlists.
             if self.use_tags:
                 return select_tag(None, self.pick_tag, self.use_playlists, tag_list,
-                                  placeholder=self.tag_placeholder)
+                                  placeholder=self.tag_placeholder,
+                                  cache_key=self.playlist_key)
 
             return select_playlist(self.playlists, self.pick_playlist,
                                    placeholder=self.playlist_placeholder)
@@ -310,7 +476,9 @@ class YouTubeVideoSelect(YoutubeRequest):
                 else:
                     return select_video(tag_list, lambda vid: self.select_video(vid, None, None),
                                         show_back=self.use_playlists,
-                                        placeholder=self.video_placeholder)
+                                        placeholder=self.video_placeholder,
+                                        on_highlight=prefetch_thumbnails,
+                                        cache_key=self.playlist_key)
 
             self.picked_toc(timecode, text, video)
 
@@ -1,7 +1,8 @@
 import sublime
 import sublime_plugin
 
-from ..lib import log, setup_log_panel, dotty
+from ..lib import log, setup_log_panel
+from ..lib import view_state, discard_view_state, discard_window_state
 from .video_popup import show_video_popup
 
 from bisect import bisect_left
@@ -17,6 +18,161 @@ def check_length(view, max_length, key, scope):
     else:
         view.erase_regions(key)
 
+
+def mark_dirty(view, regions):
+    """
+    Mark the given regions of the given view as needing to be validated the
+    next time that the view is validated.
+
+    The regions are recorded in the view state along with the change they were
+    marked at, and are only moved to where they are now once they're taken by
+    take_dirty_lines(), so marking costs the same no matter how much is
+    already marked.
+    """
+    view_state(view).setdefault("dirty", []).append((view.change_id(), regions))
+
+
+def take_dirty_lines(view):
+    """
+    Return back a list of the full lines of the given view that have been
+    modified since the last call, and clear the record of modifications.
+    """
+    dirty = sorted(view.transform_region_from(region, change_id)
+                   for change_id, regions in view_state(view).pop("dirty", [])
+                   for region in regions)
+
+    lines = []
+    for region in dirty:
+        line = view.full_line(region)
+        if lines and lines[-1].end() >= line.begin():
+            lines[-1] = lines[-1].cover(line)
+        else:
+            lines.append(line)
+
+    return lines
+
+
+def update_regions(view, key, lines, selector, scope, flags=0, check=None):
+    """
+    Update the regions stored in the given key of the view for only the given
+    lines; regions in those lines are discarded and replaced with the tokens
+    in those lines that match the given selector (and, if given, the check
+    function), while all others are left alone.
+
+    Sublime moves existing regions around as the buffer is modified, so only
+    the lines that changed need to be scanned.
+    """
+    regions = [r for r in view.get_regions(key)
+               if not any(r.intersects(line) or line.contains(r) for line in lines)]
+
+    for line in lines:
+        for region, token_scope in view.extract_tokens_with_scopes(line):
+            if (sublime.score_selector(token_scope, selector) and
+                    (check is None or check(region))):
+                regions.append(region)
+
+    if regions:
+        view.add_regions(key, sorted(regions), scope, flags=flags)
+    else:
+        view.erase_regions(key)
+
+
+###----------------------------------------------------------------------------
+
+
+class ValidatingEventListener(sublime_plugin.ViewEventListener):
+    """
+    The base for event listeners that validate the content of a view. Rather
+    than validating on every keystroke, validation happens once the user stops
+    typing for a moment, and only covers the lines that were modified in the
+    meantime; subclasses implement validate() to do the actual work.
+    """
+    # How long to wait after the last modification before validating.
+    delay = 250
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.pending = 0
+
+        # The change count and size of the view as of the last modification.
+        self.change_count = view.change_count()
+        self.size = len(view)
+
+        # Validate the whole view when we first start listening to it, since
+        # it was populated before we were.
+        mark_dirty(view, [sublime.Region(0, len(view))])
+        self.schedule()
+
+    def on_modified(self):
+        # The text change listener tracks exactly what changed; if it's not
+        # attached, mark what could have changed instead. That is the text
+        # before each cursor that could account for the growth of the buffer,
+        # or the whole buffer if several changes were made at once.
+        change_count, size = self.view.change_count(), len(self.view)
+
+        if not view_state(self.view).get("text_listener", False):
+            if change_count - self.change_count > 1:
+                regions = [sublime.Region(0, size)]
+            else:
+                grown = max(0, size - self.size)
+                regions = [sublime.Region(max(0, r.begin() - grown), r.end())
+                           for r in self.view.sel()]
+
+            mark_dirty(self.view, regions)
+
+        self.change_count, self.size = change_count, size
+        self.schedule()
+
+    def schedule(self):
+        self.pending += 1
+        sublime.set_timeout(self.debounce, self.delay)
+
+    def debounce(self):
+        # Only the last call scheduled is allowed to validate.
+        self.pending -= 1
+        if self.pending == 0 and self.view.is_valid():
+            self.validate(take_dirty_lines(self.view))
+
+    def validate(self, lines):
+        pass
+
+
+###----------------------------------------------------------------------------
+
+
+class YoutubeTextChangeListener(sublime_plugin.TextChangeListener):
+    """
+    Track the parts of YouTube description and tag buffers that are modified,
+    so that validation only needs to look at those parts.
+    """
+    @classmethod
+    def is_applicable(cls, buffer):
+        settings = buffer.primary_view().settings()
+        return (settings.get("_yte_video_body", False) or
+                settings.get("_yte_video_tags", False))
+
+    def on_text_changed(self, changes):
+        view = self.buffer.primary_view()
+
+        # Tell the validating listeners they don't need to guess what changed.
+        view_state(view)["text_listener"] = True
+        mark_dirty(view, [sublime.Region(c.a.pt, c.a.pt + len(c.str))
+                          for c in changes])
+
+
+def track_changes(view):
+    """
+    Start tracking the modifications made to the buffer of the given view.
+
+    Whether a text change listener applies to a buffer is only checked when
+    the buffer is created, which is before the settings that identify it as a
+    description or tags buffer can be applied; views created by the package
+    need to call this once those settings are set.
+    """
+    YoutubeTextChangeListener().attach(view.buffer())
+    view_state(view)["text_listener"] = True
+
+
 ###----------------------------------------------------------------------------
 
 
@@ -26,9 +182,13 @@ class GlobalYouTubeEventListener(sublime_plugin.EventListener):
     views.
     """
     def on_new_window(self, window):
-        for existing in sublime.windows():
-            if existing.id() != window.id():
-                return setup_log_panel(window, existing)
+        setup_log_panel(window, history=True)
+
+    def on_close(self, view):
+        discard_view_state(view.id())
+
+    def on_pre_close_window(self, window):
+        discard_window_state(window.id())
 
 
 ###----------------------------------------------------------------------------
@@ -46,40 +206,33 @@ class YoutubeTitleEventListener(sublime_plugin.ViewEventListener):
 ###----------------------------------------------------------------------------
 
 
-class YoutubeBodyEventListener(sublime_plugin.ViewEventListener):
+class YoutubeBodyEventListener(ValidatingEventListener):
     @classmethod
     def is_applicable(cls, settings):
         return settings.get("_yte_video_body", False)
 
-    def on_modified(self):
+    def validate(self, lines):
         check_length(self.view, 5000, '_yt_body_len', 'region.redish')
 
-        timecodes = self.view.find_by_selector('constant.numeric.timecode')
-        self.view.add_regions('timecodes', timecodes, 'constant.numeric',
+        update_regions(self.view, 'timecodes', lines,
+            'constant.numeric.timecode', 'constant.numeric',
             flags=sublime.DRAW_STIPPLED_UNDERLINE | sublime.DRAW_NO_FILL | sublime.DRAW_NO_OUTLINE)
 
 
 ###----------------------------------------------------------------------------
 
 
-class YoutubeTagsEventListener(sublime_plugin.ViewEventListener):
+class YoutubeTagsEventListener(ValidatingEventListener):
     @classmethod
     def is_applicable(cls, settings):
         return settings.get("_yte_video_tags", False)
 
-    def on_modified(self):
+    def validate(self, lines):
         check_length(self.view, 500, '_yt_tags_len', 'region.redish')
 
-        errs = []
-        for r in self.view.find_by_selector('variable.function.tags'):
-            if len(r) > 28:
-                errs.append(r)
-
-        if errs:
-            self.view.add_regions('_yt_tag_body', errs, 'region.redish',
-                flags=sublime.DRAW_NO_FILL)
-        else:
-            self.view.erase_regions('_yt_tag_body')
+        update_regions(self.view, '_yt_tag_body', lines,
+            'variable.function.tags', 'region.redish',
+            flags=sublime.DRAW_NO_FILL, check=lambda r: len(r) > 28)
 
 
 ###----------------------------------------------------------------------------
@@ -87,8 +240,8 @@ class YoutubeTagsEventListener(sublime_plugin.ViewEventListener):
 
 class YouTubeVideoReportEventListener(sublime_plugin.EventListener):
     def on_hover(self, view, point, hover_zone):
-        s = view.settings()
-        if not (s.get("_yte_video_ids") and s.get("_yte_video_info")):
+        state = view_state(view, create=False)
+        if not (state and state.get("video_ids") and state.get("videos")):
             return
 
         if (hover_zone != sublime.HOVER_TEXT or
@@ -100,8 +253,9 @@ class YouTubeVideoReportEventListener(sublime_plugin.EventListener):
             show_video_popup(view, point, video_info)
 
     def _get_video_info(self, view, point):
-        ids = view.settings().get("_yte_video_ids")
-        info = view.settings().get("_yte_video_info")
+        state = view_state(view)
+        ids = state["video_ids"]
+        info = state["videos"]
 
         try:
             title_region = view.extract_scope(point)
@@ -109,8 +263,7 @@ class YouTubeVideoReportEventListener(sublime_plugin.EventListener):
             idx = bisect_left(titles, title_region)
 
             if idx != len(titles) and titles[idx] == title_region:
-                video_id = ids[idx]
-                return dotty.Dotty(info[video_id])
+                return info[ids[idx]]
         except:
             pass
 
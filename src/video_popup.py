@@ -1,6 +1,9 @@
 import sublime
 import sublime_plugin
 
+from . import core
+from ..lib import view_state
+
 
 ###----------------------------------------------------------------------------
 
@@ -62,6 +65,9 @@ _video_popup = """
             color: color(var(--greenish) alpha(0.7));
             font-size: 0.9rem;
         }}
+        .thumbnail {{
+            margin-top: 0.5rem;
+        }}
         .commands {{
             width: 40rem;
             margin: 0;
@@ -75,6 +81,10 @@ _video_popup = """
 </body>
 """
 
+_thumbnail = """
+<div class="thumbnail"><img src="{uri}" width="320" height="180"></div>
+"""
+
 _body = """
 <h1>{title} <span class="{vis_class}">({visibility})</span></h1>
 <div class="statistics">
@@ -82,6 +92,7 @@ _body = """
     <span class="likes">✔:{likes}</span>
     <span class="dislikes">✘:{dislikes}</span>
 </div>
+{thumbnail}
 <p class="description">{description}</p>
 <div class="tags">{tags}</div>
 <div class="commands">
@@ -96,16 +107,13 @@ _body = """
 ###----------------------------------------------------------------------------
 
 
-def show_video_popup(view, point, video):
+def _popup_content(video, thumbnail):
     """
-    At the given point in the given view, display a hover popup for the video
-    whose information is provided.
-
-    The hover popup will contain the key information for the video, and also
-    contain some links that will trigger commands that can be taken on the
-    video as well.
+    Return back the HTML content of the hover popup for the given video; the
+    thumbnail is the data URI of the thumbnail image, or None if there isn't
+    one yet.
     """
-    content = _video_popup.format(
+    return _video_popup.format(
         body=_body.format(
             title=video['snippet.title'],
             vis_class=video['status.privacyStatus'],
@@ -113,6 +121,7 @@ def show_video_popup(view, point, video):
             views=video['statistics.viewCount'],
             likes=video['statistics.likeCount'],
             dislikes=video['statistics.dislikeCount'],
+            thumbnail=_thumbnail.format(uri=thumbnail) if thumbnail else "",
             description=video['snippet.description'].split('\n', 1)[0],
             tags=", ".join(video.get("snippet.tags", [])),
             video_id=video['id']
@@ -120,12 +129,45 @@ def show_video_popup(view, point, video):
     )
 
 
-    view.show_popup(content,
+def show_video_popup(view, point, video):
+    """
+    At the given point in the given view, display a hover popup for the video
+    whose information is provided.
+
+    The hover popup will contain the key information for the video, and also
+    contain some links that will trigger commands that can be taken on the
+    video as well.
+
+    The thumbnail of the video is included if it has been cached; if not, it
+    is fetched in the background and added to the popup once it arrives.
+    """
+    cache = core.thumbnailCache
+    thumbnail = cache.get(video) if cache is not None else None
+
+    # Remember which video the popup in this view is for, so that a thumbnail
+    # that arrives late only updates the popup if it's still showing the same
+    # video.
+    view_state(view)["popup_video"] = video['id']
+
+    view.show_popup(_popup_content(video, thumbnail),
         flags=sublime.HIDE_ON_MOUSE_MOVE_AWAY,
         location=point,
         max_width=1024,
         max_height=1024)
 
+    def update(video, thumbnail):
+        state = view_state(view, create=False)
+        if (view.is_popup_visible() and state is not None and
+                state.get("popup_video") == video['id']):
+            view.update_popup(_popup_content(video, thumbnail))
+
+    def fetched(video, thumbnail):
+        if thumbnail is not None:
+            sublime.set_timeout(lambda: update(video, thumbnail))
+
+    if cache is not None and not cache.is_current(video):
+        cache.prefetch([video], fetched)
+
 
 ###----------------------------------------------------------------------------
 